@@ -0,0 +1,107 @@
+"""Append-only activity log written off the request path.
+
+Routes call ``ActivityLogWriter.log`` after their own commit. Entries are
+buffered in memory and a background thread inserts them in one multi-row
+INSERT every ``flush_interval`` seconds, or sooner once ``max_batch`` entries
+are waiting, so a request never waits on the log. Entries still buffered when
+the process is killed are lost; a clean exit flushes them.
+"""
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from models import db, ActivityLog
+
+logger = logging.getLogger(__name__)
+
+USER_REGISTERED = 'user_registered'
+JOB_POSTED = 'job_posted'
+JOB_CONFIRMED = 'job_confirmed'
+JOB_APPLIED = 'job_applied'
+EVENT_CREATED = 'event_created'
+EVENT_REGISTERED = 'event_registered'
+POST_CREATED = 'post_created'
+
+ACTIVITY_LABELS = {
+    USER_REGISTERED: 'Người dùng mới',
+    JOB_POSTED: 'Tin tuyển dụng mới',
+    JOB_CONFIRMED: 'Duyệt tin tuyển dụng',
+    JOB_APPLIED: 'Đơn ứng tuyển mới',
+    EVENT_CREATED: 'Sự kiện mới',
+    EVENT_REGISTERED: 'Đăng ký sự kiện',
+    POST_CREATED: 'Bài viết mới',
+}
+
+# Entries kept after failed flushes before the oldest are dropped
+MAX_BUFFERED = 10000
+
+
+class ActivityLogWriter:
+    def __init__(self, app, flush_interval=2.0, max_batch=200):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        atexit.register(self.flush)
+
+    def log(self, kind, actor=None, target_type=None, target_id=None, summary=None):
+        """Queue one entry. ``actor`` is a User or None for system actions."""
+        entry = {
+            'kind': kind,
+            'actor_id': actor.id if actor is not None else None,
+            'actor_name': actor.name if actor is not None else None,
+            'target_type': target_type,
+            'target_id': target_id,
+            'summary': (summary or '')[:255],
+            'created_at': datetime.utcnow(),
+        }
+        with self._lock:
+            self._buffer.append(entry)
+            pending = len(self._buffer)
+        self._ensure_thread()
+        if pending >= self.max_batch:
+            self._wake.set()
+
+    def flush(self):
+        """Write every buffered entry now. Returns the number written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            try:
+                with self.app.app_context():
+                    db.session.execute(insert(ActivityLog), batch)
+                    db.session.commit()
+            except Exception as e:
+                logger.error(f"Activity log flush of {len(batch)} entries failed: {e}")
+                with self._lock:
+                    self._buffer = (batch + self._buffer)[-MAX_BUFFERED:]
+                return 0
+            return len(batch)
+
+    def _ensure_thread(self):
+        # Started lazily so CLI commands and the reloader parent don't spawn it
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='activity-log-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+def activity_label(kind):
+    return ACTIVITY_LABELS.get(kind, kind)
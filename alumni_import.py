@@ -0,0 +1,282 @@
+"""Bulk import of alumni accounts from a CSV file.
+
+The file is read row by row and handled in chunks: each chunk is validated,
+checked against existing accounts with one query on ``lower(email)``, has its
+passwords hashed on a process pool, and is written with multi-row Core
+INSERTs for users and profiles, then committed. Hashing of the next chunk
+runs on the pool while the current one is being inserted.
+
+Rows without a password get a random one that is never shown to anyone.
+The alumnus is sent a one-time set-password link through the email outbox
+(``reminders.drain_outbox``), so no password is ever written to the outbox.
+
+Columns: ``email`` and ``name`` are required; ``password``, ``graduation_year``,
+``company``, ``position`` and ``phone`` are optional.
+"""
+import csv
+import logging
+import multiprocessing
+import re
+import secrets
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import insert, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from werkzeug.security import generate_password_hash
+
+from models import db, User, Profile, OutboxEmail
+from analytics import record_stat, NEW_USERS
+from password_tokens import make_set_password_token, TOKEN_MAX_AGE
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+REQUIRED_COLUMNS = ('email', 'name')
+OPTIONAL_COLUMNS = ('password', 'graduation_year', 'company', 'position', 'phone')
+KIND_ALUMNI_WELCOME = 'alumni_welcome'
+# Errors kept per import; the counters still cover every row
+MAX_ERRORS = 200
+
+_EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+def _hash_password(password):
+    # Runs in a worker process
+    return generate_password_hash(password)
+
+
+class ImportProgress:
+    """Counters of one import, readable while it runs."""
+
+    def __init__(self, filename=None):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.status = 'queued'  # queued, running, done, failed
+        self.rows = 0
+        self.created = 0
+        self.skipped = 0
+        self.errors = []
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def error(self, line, message):
+        with self._lock:
+            self.skipped += 1
+            if len(self.errors) < MAX_ERRORS:
+                self.errors.append({'line': line, 'error': message})
+
+    def fail(self, message):
+        with self._lock:
+            self.status = 'failed'
+            self.errors.append({'line': None, 'error': message})
+
+    def as_dict(self):
+        with self._lock:
+            end = self.finished_at or time.monotonic()
+            elapsed = end - self.started_at if self.started_at else 0
+            return {
+                'id': self.id,
+                'filename': self.filename,
+                'status': self.status,
+                'rows': self.rows,
+                'created': self.created,
+                'skipped': self.skipped,
+                'errors': list(self.errors),
+                'elapsed_seconds': round(elapsed, 2),
+                'rows_per_second': round(self.rows / elapsed, 1) if elapsed else 0,
+            }
+
+
+def _clean(row, line, seen, progress):
+    """Validate one CSV row. Returns a dict of values, or None after recording why not."""
+    email = (row.get('email') or '').strip().lower()
+    name = (row.get('name') or '').strip()
+    if not _EMAIL_RE.match(email) or len(email) > 120:
+        progress.error(line, f'Email không hợp lệ: {email}')
+        return None
+    if not name or len(name) > 100:
+        progress.error(line, 'Thiếu họ tên')
+        return None
+    if email in seen:
+        progress.error(line, f'Email bị trùng trong file: {email}')
+        return None
+
+    graduation_year = (row.get('graduation_year') or '').strip()
+    if graduation_year:
+        try:
+            graduation_year = int(graduation_year)
+        except ValueError:
+            progress.error(line, f'Năm tốt nghiệp không hợp lệ: {graduation_year}')
+            return None
+        if not 1950 <= graduation_year <= datetime.utcnow().year + 10:
+            progress.error(line, f'Năm tốt nghiệp không hợp lệ: {graduation_year}')
+            return None
+    seen.add(email)
+
+    password = (row.get('password') or '').strip()
+    return {
+        'line': line,
+        'email': email,
+        'name': name,
+        'password': password or secrets.token_urlsafe(32),
+        'generated_password': not password,
+        'graduation_year': graduation_year or None,
+        'company': (row.get('company') or '').strip()[:100] or None,
+        'position': (row.get('position') or '').strip()[:100] or None,
+        'phone': (row.get('phone') or '').strip()[:20] or None,
+    }
+
+
+def _drop_existing(rows, progress):
+    """Remove rows whose email already has an account, with one indexed query."""
+    if not rows:
+        return rows
+    existing = {email for (email,) in db.session.query(func.lower(User.email)).filter(
+        func.lower(User.email).in_([r['email'] for r in rows]))}
+    kept = []
+    for r in rows:
+        if r['email'] in existing:
+            progress.error(r['line'], f'Email đã tồn tại: {r["email"]}')
+        else:
+            kept.append(r)
+    return kept
+
+
+def _welcome_email(row, set_password_link):
+    subject = 'Tài khoản FIT Alumni của bạn đã được tạo'
+    body = (
+        f'Chào {row["name"]},\n\n'
+        f'Tài khoản cựu sinh viên của bạn trên FIT Alumni đã được tạo.\n\n'
+        f'Email đăng nhập: {row["email"]}\n'
+    )
+    if set_password_link:
+        body += (
+            f'Đặt mật khẩu để đăng nhập: {set_password_link}\n\n'
+            f'Liên kết chỉ dùng được một lần và hết hạn sau {TOKEN_MAX_AGE.days} ngày.\n'
+        )
+    else:
+        body += '\nVui lòng liên hệ quản trị viên để đặt mật khẩu.\n'
+    body += 'FIT Alumni'
+    return subject, body
+
+
+def _insert_chunk(rows, hashes, set_password_url, progress):
+    """Insert users, profiles and welcome emails for one validated chunk, then commit.
+
+    Returns the number of users created.
+    """
+    now = datetime.utcnow()
+    # An account created meanwhile (e.g. by /register) is skipped rather than failing the chunk
+    result = db.session.execute(
+        sqlite_insert(User).on_conflict_do_nothing(index_elements=['email']).returning(User.id, User.email),
+        [{'name': r['name'], 'email': r['email'], 'password': h, 'role': 'alumni',
+          'created_at': now, 'updated_at': now} for r, h in zip(rows, hashes)]
+    )
+    user_ids = {email: user_id for user_id, email in result}
+    for r in rows:
+        if r['email'] not in user_ids:
+            progress.error(r['line'], f'Email đã tồn tại: {r["email"]}')
+    hashes = {r['email']: h for r, h in zip(rows, hashes)}
+    rows = [r for r in rows if r['email'] in user_ids]
+    if not rows:
+        db.session.commit()
+        return 0
+    db.session.execute(insert(Profile), [
+        {'user_id': user_ids[r['email']], 'graduation_year': r['graduation_year'],
+         'company': r['company'], 'position': r['position'], 'phone': r['phone']}
+        for r in rows
+    ])
+
+    welcome = []
+    for r in rows:
+        if r['generated_password']:
+            user_id = user_ids[r['email']]
+            link = set_password_url(make_set_password_token(user_id, hashes[r['email']])) if set_password_url else None
+            subject, body = _welcome_email(r, link)
+            welcome.append({
+                'dedupe_key': f'{KIND_ALUMNI_WELCOME}:{user_id}',
+                'kind': KIND_ALUMNI_WELCOME,
+                'recipient': r['email'],
+                'subject': subject,
+                'body': body,
+                'status': 'pending',
+                'attempts': 0,
+                'next_attempt_at': now,
+                'created_at': now,
+            })
+    if welcome:
+        db.session.execute(sqlite_insert(OutboxEmail).on_conflict_do_nothing(index_elements=['dedupe_key']), welcome)
+    record_stat(NEW_USERS, 'alumni', delta=len(rows))
+    db.session.commit()
+    return len(rows)
+
+
+def _chunks(reader, progress, chunk_size):
+    seen = set()
+    chunk = []
+    # Line 1 is the header
+    for line, row in enumerate(reader, start=2):
+        progress.rows += 1
+        cleaned = _clean(row, line, seen, progress)
+        if cleaned is not None:
+            chunk.append(cleaned)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_alumni(stream, progress=None, workers=None, chunk_size=CHUNK_SIZE, set_password_url=None,
+                  on_chunk=None):
+    """Import alumni from a text stream of CSV. Returns the ImportProgress.
+
+    ``set_password_url(token)`` builds the link put in welcome emails.
+    ``on_chunk(progress)`` is called after every committed chunk.
+    """
+    progress = progress or ImportProgress()
+    progress.status = 'running'
+    progress.started_at = time.monotonic()
+
+    reader = csv.DictReader(stream)
+    headers = {(h or '').strip().lower() for h in reader.fieldnames or []}
+    missing = [c for c in REQUIRED_COLUMNS if c not in headers]
+    if missing:
+        progress.fail(f'Thiếu cột: {", ".join(missing)}')
+        progress.finished_at = time.monotonic()
+        return progress
+    reader.fieldnames = [(h or '').strip().lower() for h in reader.fieldnames]
+
+    # Spawned rather than forked: forking a threaded web process can copy locks held by other threads
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        pending = None  # (rows, iterator of hashes) submitted to the pool
+        for chunk in _chunks(reader, progress, chunk_size):
+            rows = _drop_existing(chunk, progress)
+            submitted = None
+            if rows:
+                per_worker = max(1, len(rows) // ((workers or multiprocessing.cpu_count()) * 4))
+                submitted = (rows, pool.map(_hash_password, [r['password'] for r in rows], chunksize=per_worker))
+            if pending:
+                progress.created += _insert_chunk(pending[0], list(pending[1]), set_password_url, progress)
+                if on_chunk:
+                    on_chunk(progress)
+            pending = submitted
+        if pending:
+            progress.created += _insert_chunk(pending[0], list(pending[1]), set_password_url, progress)
+            if on_chunk:
+                on_chunk(progress)
+        progress.status = 'done'
+    except Exception:
+        db.session.rollback()
+        progress.fail('Lỗi hệ thống khi nhập dữ liệu')
+        raise
+    finally:
+        pool.shutdown(cancel_futures=True)
+        progress.finished_at = time.monotonic()
+    return progress
@@ -0,0 +1,157 @@
+"""Daily statistics rollup for the admin analytics page.
+
+``DailyStat`` holds one counter per (day, metric, dimension): users created
+per role, jobs per job type, applications per current status, events and
+event registrations. Routes bump the counters in the same transaction as the
+row they create, so the rollup is maintained incrementally; deletions are not
+subtracted and are reconciled by ``backfill_daily_stats`` (``flask
+backfill-daily-stats``), which recomputes days from the source tables.
+"""
+import logging
+from datetime import datetime, date
+
+from sqlalchemy import select, delete, insert, func, literal
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, User, Job, JobApplication, Event, EventRegistration, DailyStat
+
+logger = logging.getLogger(__name__)
+
+NEW_USERS = 'new_users'
+NEW_JOBS = 'new_jobs'
+APPLICATIONS = 'applications'
+NEW_EVENTS = 'new_events'
+EVENT_REGISTRATIONS = 'event_registrations'
+
+# metric -> (source model, dimension column or None)
+SOURCES = {
+    NEW_USERS: (User, User.role),
+    NEW_JOBS: (Job, Job.job_type),
+    APPLICATIONS: (JobApplication, JobApplication.status),
+    NEW_EVENTS: (Event, None),
+    EVENT_REGISTRATIONS: (EventRegistration, None),
+}
+
+
+def _day(value):
+    if value is None:
+        return datetime.utcnow().date()
+    return value.date() if isinstance(value, datetime) else value
+
+
+def record_stat(metric, dimension='', delta=1, day=None):
+    """Add ``delta`` to a daily counter. Runs in the caller's transaction, does not commit."""
+    stmt = sqlite_insert(DailyStat).values(day=_day(day), metric=metric, dimension=dimension or '', value=delta)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['day', 'metric', 'dimension'],
+        set_={'value': DailyStat.value + stmt.excluded.value}
+    ))
+
+
+def move_stat(metric, old_dimension, new_dimension, day=None):
+    """Move one unit between dimensions of the same day, e.g. an application changing status."""
+    if old_dimension == new_dimension:
+        return
+    record_stat(metric, old_dimension, -1, day)
+    record_stat(metric, new_dimension, 1, day)
+
+
+def backfill_daily_stats(since=None):
+    """Recompute the rollup from the source tables, for every day or from ``since`` on.
+
+    One INSERT ... SELECT ... GROUP BY per metric. Commits and returns the
+    number of rollup rows written.
+    """
+    cleared = delete(DailyStat)
+    if since is not None:
+        cleared = cleared.where(DailyStat.day >= since)
+    db.session.execute(cleared)
+
+    written = 0
+    for metric, (model, dimension) in SOURCES.items():
+        day = func.date(model.created_at)
+        dimension = func.coalesce(dimension, '') if dimension is not None else literal('')
+        source = select(day, literal(metric), dimension, func.count()) \
+            .where(model.created_at.is_not(None)) \
+            .group_by(day, dimension)
+        if since is not None:
+            source = source.where(model.created_at >= datetime.combine(since, datetime.min.time()))
+        result = db.session.connection().execute(
+            insert(DailyStat).from_select(['day', 'metric', 'dimension', 'value'], source)
+        )
+        written += max(result.rowcount, 0)
+    db.session.commit()
+    logger.info(f"Daily stats backfilled from {since or 'the beginning'}: {written} rows")
+    return written
+
+
+def month_starts(now, months):
+    """First day of each of the last ``months`` calendar months, oldest first."""
+    year, month = now.year, now.month
+    starts = []
+    for _ in range(months):
+        starts.append(date(year, month, 1))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return starts[::-1]
+
+
+def monthly_totals(metrics, since):
+    """Sum daily counters per calendar month from ``since`` on.
+
+    Returns ``{metric: {month_start: total}}`` from a single range scan of the rollup.
+    """
+    rows = db.session.query(DailyStat.day, DailyStat.metric, DailyStat.value) \
+        .filter(DailyStat.metric.in_(metrics), DailyStat.day >= since).all()
+    totals = {metric: {} for metric in metrics}
+    for day, metric, value in rows:
+        month = day.replace(day=1)
+        totals[metric][month] = totals[metric].get(month, 0) + value
+    return totals
+
+
+def top_employers_by_jobs(limit=5):
+    """Companies with the most jobs, then the most applications, in one grouped query."""
+    application_counts = db.session.query(
+        JobApplication.job_id.label('job_id'),
+        func.count(JobApplication.id).label('application_count')
+    ).group_by(JobApplication.job_id).subquery()
+
+    job_count = func.count(Job.id)
+    application_count = func.coalesce(func.sum(application_counts.c.application_count), 0)
+    rows = db.session.query(Job.company_name, job_count, application_count) \
+        .outerjoin(application_counts, application_counts.c.job_id == Job.id) \
+        .group_by(Job.company_name) \
+        .order_by(job_count.desc(), application_count.desc()) \
+        .limit(limit).all()
+    return [{'company_name': name, 'job_count': jobs, 'application_count': applications}
+            for name, jobs, applications in rows]
+
+
+def users_by_role():
+    return dict(db.session.query(User.role, func.count(User.id)).group_by(User.role).all())
+
+
+def job_counts():
+    """Job totals by type plus overall and confirmed counts, from one grouped query."""
+    counts = {'by_type': {}, 'total': 0, 'confirmed': 0}
+    for job_type, is_confirmed, count in db.session.query(Job.job_type, Job.is_confirmed, func.count(Job.id)) \
+            .group_by(Job.job_type, Job.is_confirmed):
+        counts['by_type'][job_type] = counts['by_type'].get(job_type, 0) + count
+        counts['total'] += count
+        if is_confirmed:
+            counts['confirmed'] += count
+    return counts
+
+
+def applications_by_status():
+    return dict(db.session.query(JobApplication.status, func.count(JobApplication.id))
+                .group_by(JobApplication.status).all())
+
+
+def recent_jobs(limit=5):
+    """Newest jobs as plain dicts, safe to keep across requests."""
+    return [{'id': job_id, 'title': title, 'company_name': company_name,
+             'created_at': created_at, 'is_confirmed': is_confirmed}
+            for job_id, title, company_name, created_at, is_confirmed in
+            db.session.query(Job.id, Job.title, Job.company_name, Job.created_at, Job.is_confirmed)
+            .order_by(Job.created_at.desc()).limit(limit)]
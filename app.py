@@ -1,13 +1,14 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, send_from_directory, jsonify, abort, Response
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, abort, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta, UTC
 import os
+import posixpath
 import logging
 from werkzeug.utils import secure_filename
 from urllib.parse import urlencode
-from sqlalchemy import or_, and_, func
+from sqlalchemy import or_, and_, func, case, false
 from forms import RegistrationForm, LoginForm, JobForm, EventForm
 from flask_migrate import Migrate
 from flask_bcrypt import Bcrypt
@@ -15,11 +16,62 @@ from flask_mail import Mail, Message
 import json
 from sqlalchemy import inspect
 from sqlalchemy import text
+from sqlalchemy.orm import joinedload
 import csv
+import io
 import time
+import shutil
+import tempfile
+import click
 from models import (
     db, User, Profile, Post, Comment, Job, JobApplication, post_likes,
-    Education, Experience, Skill, Event, EventRegistration
+    Education, Experience, Skill, Event, EventRegistration, ActivityLog, Task
+)
+from search_index import (
+    ensure_applicant_index, index_applications, reindex_user,
+    remove_from_applicant_index, rebuild_applicant_index, applicant_search_clause,
+    ensure_user_name_index, rebuild_user_name_index, user_search_clause
+)
+from registrations import (
+    register_for_event, cancel_registration, change_registration_status,
+    promote_waitlist, waitlist_position, recount_registrations, bulk_check_in,
+    ACTIVE_STATUSES, REGISTRATION_STATUSES, REGISTERED, WAITLISTED, ALREADY_WAITLISTED
+)
+from pagination import keyset_page
+from calendar_feed import feed_token, reset_feed_secret, user_id_from_token, feed_validators, feed_rows, build_calendar
+from werkzeug.http import is_resource_modified
+from reminders import enqueue_event_reminders, drain_outbox, recover_interrupted
+from stats_cache import StatsCache
+from activity_log import (
+    ActivityLogWriter, ACTIVITY_LABELS, activity_label,
+    USER_REGISTERED, JOB_POSTED, JOB_CONFIRMED, JOB_APPLIED, EVENT_CREATED, EVENT_REGISTERED, POST_CREATED
+)
+from user_deletion import delete_user_data, schedule_file_purge
+from job_fingerprints import fingerprint_job, find_duplicates, backfill_job_fingerprints
+from exports import EXPORTS, FORMATS, parse_since, export_rows, stream_rows, next_since
+from alumni_import import import_alumni, ImportProgress
+from password_tokens import user_for_set_password_token
+from write_queue import WriteQueue
+from tasks import TaskRunner, task, enqueue, report_progress, task_status, run_pending
+from uploads import save_upload, UploadRejected, move_files
+from upload_serving import send_upload, upload_version
+from media_store import store_upload, release as release_media, post_image_path
+from upload_gc import collect_orphans
+import assets
+from sqlite_tuning import DEFAULT_PRAGMAS, configure_engine
+from image_proxy import is_external, request_fetch, external_image_response
+from images import (
+    SIZES as IMAGE_SIZES, image_url_path,
+    generate_all as generate_image_variants, savings_report
+)
+from moderation import (
+    QUEUES as MODERATION_QUEUES, MAX_BATCH as MODERATION_MAX_BATCH,
+    pending_page, approve as approve_pending, reject as reject_pending
+)
+from analytics import (
+    record_stat, move_stat, backfill_daily_stats, month_starts, monthly_totals,
+    top_employers_by_jobs, users_by_role, job_counts, applications_by_status, recent_jobs,
+    NEW_USERS, NEW_JOBS, APPLICATIONS, NEW_EVENTS
 )
 
 # Configure logging
@@ -32,14 +84,25 @@ JOB_TYPES = ['PHP', 'JavaScript', 'Python', 'Java', 'C#', '.NET', 'React', 'Angu
 LEVELS = ['Intern/Fresher', 'Junior', 'Middle', 'Senior', 'Team Lead', 'Manager']
 WORK_TYPES = ['Full-time', 'Part-time', 'Remote', 'Hybrid']
 
+# Page sizes for cursor-paginated listings
+EVENTS_PER_PAGE = 12
+USER_EVENTS_PER_PAGE = 20
+ACTIVITY_PER_PAGE = 50
+ADMIN_USERS_PER_PAGE = 25
+PENDING_JOBS_PER_PAGE = 50
+MODERATION_PAGE_LIMIT = 200
+
 # Get the absolute path of the current directory
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 DATABASE_PATH = os.path.join(BASE_DIR, 'alumni.db')
 
 app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your-secret-key'
+# Signs sessions; set SECRET_KEY in production, the fallback is only for local development
+app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key')
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{DATABASE_PATH}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# PRAGMAs run on every new SQLite connection (sqlite_tuning.py); None keeps SQLite's default
+app.config['SQLITE_PRAGMAS'] = dict(DEFAULT_PRAGMAS)
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
@@ -47,9 +110,71 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['LOGIN_MESSAGE_CATEGORY'] = 'info'
 app.config['REFRESH_MESSAGE_CATEGORY'] = 'info'
 
+# Mail configuration (point MAIL_SERVER/MAIL_PORT at a local SMTP sink for testing)
+app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'localhost')
+app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 25))
+app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', 'false').lower() == 'true'
+app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
+app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
+app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER', 'FIT Alumni <no-reply@fit-alumni.local>')
+# Public URL used for links in emails sent outside a request
+app.config['APP_BASE_URL'] = os.environ.get('APP_BASE_URL', 'http://localhost:5000')
+
+# Event reminders: hours before start_time, emails per SMTP connection, scheduler interval
+app.config['EVENT_REMINDER_WINDOWS_HOURS'] = [24, 1]
+app.config['OUTBOX_BATCH_SIZE'] = 50
+app.config['REMINDER_INTERVAL_SECONDS'] = 300
+# Outbox rows claimed longer ago than this by a sender that stopped are handed back
+app.config['OUTBOX_STALE_SECONDS'] = 900
+
+# Admin dashboard/analytics counters are cached per process for this long
+app.config['STATS_CACHE_TTL_SECONDS'] = 60
+
+# Activity log entries are written in batches off the request path
+app.config['ACTIVITY_LOG_FLUSH_SECONDS'] = 2.0
+app.config['ACTIVITY_LOG_BATCH_SIZE'] = 200
+
+# Processes hashing passwords during bulk alumni imports (None: one per CPU)
+app.config['ALUMNI_IMPORT_WORKERS'] = None
+
+# Background tasks (tasks.py): threads per process, poll interval when idle, and
+# seconds without a heartbeat before a running task counts as interrupted.
+# Set TASK_RUNNER_IN_PROCESS=false to leave tasks to `flask run-task-worker`.
+app.config['TASK_RUNNER_IN_PROCESS'] = os.environ.get('TASK_RUNNER_IN_PROCESS', 'true').lower() == 'true'
+app.config['TASK_WORKERS'] = 2
+app.config['TASK_POLL_SECONDS'] = 5.0
+app.config['TASK_STALE_SECONDS'] = 3600
+
+# Likes, comments, event registrations and job applications are written by one
+# thread per process that group-commits them (write_queue.py); request threads
+# wait at most WRITE_QUEUE_TIMEOUT_SECONDS for their write to start
+app.config['WRITE_QUEUE_ENABLED'] = os.environ.get('WRITE_QUEUE_ENABLED', 'false').lower() == 'true'
+app.config['WRITE_QUEUE_MAX_BATCH'] = 64
+app.config['WRITE_QUEUE_TIMEOUT_SECONDS'] = 10.0
+
+# Internal nginx location that serves upload bytes after Flask authorized the request,
+# e.g. '/protected-uploads' (None: Flask sends the file; USE_X_SENDFILE covers Apache)
+app.config['UPLOAD_ACCEL_REDIRECT_PREFIX'] = os.environ.get('UPLOAD_ACCEL_REDIRECT_PREFIX')
+# Orphaned uploads younger than the grace period are kept (their row may not be committed yet)
+app.config['UPLOAD_GC_GRACE_HOURS'] = 24
+app.config['UPLOAD_GC_INTERVAL_SECONDS'] = 6 * 3600
+# External post images are fetched once into the media store and served from there
+app.config['EXTERNAL_IMAGE_PROXY'] = True
+app.config['EXTERNAL_IMAGE_TIMEOUT_SECONDS'] = 10
+# Only for tests against a local server; otherwise private and loopback hosts are refused
+app.config['EXTERNAL_IMAGE_ALLOW_PRIVATE_HOSTS'] = False
+# Upload folders served to anyone
+PUBLIC_UPLOAD_FOLDERS = ('avatars', 'company_logos', 'events', 'posts')
+# Resumes live outside static/ and are only served through download_resume.
+# Resumes uploaded before are moved here by `flask move-resumes`.
+app.config['RESUME_FOLDER'] = os.path.join(app.instance_path, 'resumes')
+# Internal nginx location for RESUME_FOLDER, like UPLOAD_ACCEL_REDIRECT_PREFIX
+app.config['RESUME_ACCEL_REDIRECT_PREFIX'] = os.environ.get('RESUME_ACCEL_REDIRECT_PREFIX')
+LEGACY_RESUME_FOLDER = os.path.join(app.config['UPLOAD_FOLDER'], 'resumes')
+
 # Ensure upload folder exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'resumes'), exist_ok=True)
+os.makedirs(app.config['RESUME_FOLDER'], exist_ok=True)
 os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'posts'), exist_ok=True)
 os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'avatars'), exist_ok=True)
 os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'company_logos'), exist_ok=True)
@@ -60,11 +185,20 @@ os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
 
 # Initialize extensions
 db.init_app(app)
+with app.app_context():
+    configure_engine(db.engine, app.config['SQLITE_PRAGMAS'])
 migrate = Migrate(app, db)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 bcrypt = Bcrypt(app)
 mail = Mail(app)
+stats_cache = StatsCache(ttl=app.config['STATS_CACHE_TTL_SECONDS'])
+activity_log = ActivityLogWriter(app, flush_interval=app.config['ACTIVITY_LOG_FLUSH_SECONDS'],
+                                 max_batch=app.config['ACTIVITY_LOG_BATCH_SIZE'])
+task_runner = TaskRunner(app, workers=app.config['TASK_WORKERS'], poll_interval=app.config['TASK_POLL_SECONDS'],
+                         stale_after=app.config['TASK_STALE_SECONDS'])
+write_queue = WriteQueue(app, enabled=app.config['WRITE_QUEUE_ENABLED'], max_batch=app.config['WRITE_QUEUE_MAX_BATCH'],
+                         timeout=app.config['WRITE_QUEUE_TIMEOUT_SECONDS'])
 
 def init_db():
     """Initialize the database if it doesn't exist"""
@@ -172,12 +306,40 @@ def register():
             role=role
         )
         db.session.add(user)
+        record_stat(NEW_USERS, role)
         db.session.commit()
+        stats_cache.invalidate('users')
+        activity_log.log(USER_REGISTERED, user, 'user', user.id, f'{user.name} ({user.role})')
         
         flash('Đăng ký thành công', 'success')
         return redirect(url_for('login'))
     return render_template('register.html')
 
+@app.route('/set-password/<token>', methods=['GET', 'POST'])
+def set_password(token):
+    """Set a password from the one-time link in an imported alumnus's welcome email."""
+    user = user_for_set_password_token(token)
+    if user is None:
+        flash('Liên kết đặt mật khẩu không hợp lệ, đã được sử dụng hoặc đã hết hạn', 'danger')
+        return redirect(url_for('login'))
+    
+    if request.method == 'POST':
+        password = request.form.get('password') or ''
+        if len(password) < 6:
+            flash('Mật khẩu phải có ít nhất 6 ký tự', 'danger')
+            return render_template('set_password.html', user=user, token=token)
+        if password != request.form.get('confirm_password'):
+            flash('Mật khẩu không khớp', 'danger')
+            return render_template('set_password.html', user=user, token=token)
+        
+        # A new hash also invalidates the link
+        user.password = generate_password_hash(password)
+        db.session.commit()
+        app.logger.info(f"User {user.id} set a password from an emailed link")
+        flash('Đặt mật khẩu thành công. Vui lòng đăng nhập.', 'success')
+        return redirect(url_for('login'))
+    return render_template('set_password.html', user=user, token=token)
+
 @app.route('/profile', methods=['GET', 'POST'])
 @login_required
 def profile():
@@ -291,30 +453,25 @@ def edit_profile():
                     pass
 
             # Handle avatar upload
+            stale_files = []
             if 'avatar' in request.files and request.files['avatar'].filename:
                 avatar_file = request.files['avatar']
-                if allowed_file(avatar_file.filename, {'png', 'jpg', 'jpeg', 'gif'}):
-                    # Remove old avatar if exists
-                    if profile.avatar:
-                        old_avatar_path = os.path.join(app.config['UPLOAD_FOLDER'], 'avatars', profile.avatar)
-                        try:
-                            if os.path.exists(old_avatar_path):
-                                os.remove(old_avatar_path)
-                        except Exception as e:
-                            app.logger.warning(f"Failed to remove old avatar: {str(e)}")
-                    
-                    # Save new avatar
-                    filename = secure_filename(f"{current_user.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{avatar_file.filename}")
-                    avatar_path = os.path.join(app.config['UPLOAD_FOLDER'], 'avatars', filename)
-                    os.makedirs(os.path.dirname(avatar_path), exist_ok=True)
-                    avatar_file.save(avatar_path)
-                    profile.avatar = filename
-                else:
-                    flash('Định dạng file ảnh không hợp lệ. Chỉ chấp nhận PNG, JPG, JPEG, GIF.', 'danger')
+                # Save new avatar
+                try:
+                    filename = store_upload(avatar_file, app.config['UPLOAD_FOLDER'], 'avatars')
+                except UploadRejected as e:
+                    flash(f'Ảnh đại diện không hợp lệ: {e}', 'danger')
                     return redirect(url_for('edit_profile'))
+                
+                # The old avatar is removed after the commit unless another row shares it
+                if profile.avatar:
+                    stale_files = release_media(app.config['UPLOAD_FOLDER'], [f'avatars/{profile.avatar}'])
+                profile.avatar = filename
 
             if not current_user.profile:
                 db.session.add(profile)
+            # Profile fields are exported with the user row
+            current_user.updated_at = datetime.utcnow()
 
             # Handle education entries
             schools = request.form.getlist('school[]')
@@ -419,7 +576,11 @@ def edit_profile():
                 flash(f'Có lỗi xảy ra khi cập nhật kỹ năng: {str(e)}', 'warning')
                 # Continue with other updates even if skills failed
 
+            # Keep applicant search in sync with the new profile
+            reindex_user(current_user.id)
+
             db.session.commit()
+            schedule_file_purge(stale_files)
             flash('Cập nhật thông tin thành công!', 'success')
             return redirect(url_for('profile'))
 
@@ -471,28 +632,22 @@ def update_avatar():
         return redirect(url_for('profile'))
 
     try:
-        # Tạo tên file duy nhất
-        filename = secure_filename(f"{current_user.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.filename}")
-        avatar_path = os.path.join(app.config['UPLOAD_FOLDER'], 'avatars', filename)
-        app.logger.info(f"Tên file mới: {filename}, Đường dẫn: {avatar_path}")
-
-        # Đảm bảo thư mục tồn tại
-        os.makedirs(os.path.dirname(avatar_path), exist_ok=True)
-        app.logger.info(f"Đã kiểm tra/thêm thư mục: {os.path.dirname(avatar_path)}")
+        # Lưu file mới theo nội dung, từng khối một
+        try:
+            filename = store_upload(file, app.config['UPLOAD_FOLDER'], 'avatars', extensions=allowed_extensions)
+        except UploadRejected as e:
+            app.logger.warning(f"Từ chối avatar {file.filename}: {e}")
+            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                return jsonify({"success": False, "message": str(e)}), 400
+            flash(str(e), 'danger')
+            return redirect(url_for('profile'))
+        app.logger.info(f"Đã lưu avatar mới: {filename}")
 
-        # Xóa avatar cũ nếu có
+        # Bỏ tham chiếu tới avatar cũ; file chỉ bị xóa khi không còn ai dùng
         profile = current_user.profile or Profile(user_id=current_user.id)
+        stale_files = []
         if profile.avatar:
-            old_avatar_path = os.path.join(app.config['UPLOAD_FOLDER'], 'avatars', profile.avatar)
-            if os.path.exists(old_avatar_path):
-                os.remove(old_avatar_path)
-                app.logger.info(f"Đã xóa avatar cũ: {old_avatar_path}")
-            else:
-                app.logger.warning(f"Không tìm thấy avatar cũ để xóa: {old_avatar_path}")
-
-        # Lưu file mới
-        file.save(avatar_path)
-        app.logger.info(f"Đã lưu avatar mới: {avatar_path}")
+            stale_files = release_media(app.config['UPLOAD_FOLDER'], [f'avatars/{profile.avatar}'])
 
         # Cập nhật profile
         profile.avatar = filename
@@ -501,6 +656,7 @@ def update_avatar():
             app.logger.info("Đã tạo profile mới cho user")
 
         db.session.commit()
+        schedule_file_purge(stale_files)
         app.logger.info(f"Đã cập nhật avatar thành công: {filename}")
 
         # Trả về phản hồi JSON nếu là Ajax request
@@ -508,7 +664,7 @@ def update_avatar():
             return jsonify({
                 "success": True,
                 "message": "Cập nhật ảnh đại diện thành công",
-                "avatar_url": url_for('static', filename=f'uploads/avatars/{filename}')
+                "avatar_url": image_url(f'avatars/{filename}')
             })
 
         flash('Cập nhật ảnh đại diện thành công', 'success')
@@ -616,24 +772,21 @@ def alumni_add_job():
             if 'company_logo' in request.files:
                 file = request.files['company_logo']
                 if file and file.filename:
-                    # Check file size (max 5MB)
-                    if len(file.read()) > 5 * 1024 * 1024:
-                        flash('Logo công ty không được vượt quá 5MB', 'danger')
-                        return render_template('alumni/add_job.html', form=form, job_types=JOB_TYPES, levels=LEVELS, work_types=WORK_TYPES)
-                    file.seek(0)  # Reset file pointer after reading
-                    
-                    if allowed_file(file.filename, {'png', 'jpg', 'jpeg'}):
-                        filename = secure_filename(f"company_{current_user.id}_{int(time.time())}_{file.filename}")
-                        file_path = os.path.join(app.config['UPLOAD_FOLDER'], 'company_logos', filename)
-                        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                        file.save(file_path)
-                        job.company_logo = filename
-                    else:
-                        flash('Logo công ty không hợp lệ. Chỉ chấp nhận file PNG, JPG', 'danger')
+                    # Streamed to disk with the 5MB image limit; a logo uploaded before is shared
+                    try:
+                        job.company_logo = store_upload(file, app.config['UPLOAD_FOLDER'], 'company_logos',
+                                                        extensions={'png', 'jpg', 'jpeg'})
+                    except UploadRejected as e:
+                        flash(f'Logo công ty không hợp lệ: {e}', 'danger')
                         return render_template('alumni/add_job.html', form=form, job_types=JOB_TYPES, levels=LEVELS, work_types=WORK_TYPES)
             
             db.session.add(job)
+            db.session.flush()
+            fingerprint_job(job)
+            record_stat(NEW_JOBS, job.job_type)
             db.session.commit()
+            stats_cache.invalidate('jobs')
+            activity_log.log(JOB_POSTED, current_user, 'job', job.id, f'{job.title} - {job.company_name}')
             
             flash('Đăng tin tuyển dụng thành công! Tin của bạn đang chờ duyệt.', 'success')
             return redirect(url_for('alumni_jobs'))
@@ -654,11 +807,25 @@ def delete_job(job_id):
         flash('Bạn không có quyền xóa tin này', 'danger')
         return redirect(url_for('index'))
     
+    remove_from_applicant_index(job_id=job.id)
+    stale_files = release_media(app.config['UPLOAD_FOLDER'], [job.company_logo and f'company_logos/{job.company_logo}'])
     db.session.delete(job)
     db.session.commit()
+    schedule_file_purge(stale_files)
+    stats_cache.invalidate('jobs', 'applications')
     flash('Đã xóa tin tuyển dụng', 'success')
     return redirect(url_for('alumni_jobs'))
 
+def write_application(job_id, user_id, cover_letter, resume_path):
+    """Create a pending application and index it. Does not commit; returns its id."""
+    application = JobApplication(job_id=job_id, user_id=user_id, cover_letter=cover_letter,
+                                 resume_path=resume_path, status='pending')
+    db.session.add(application)
+    db.session.flush()
+    index_applications([application])
+    record_stat(APPLICATIONS, application.status)
+    return application.id
+
 @app.route('/apply/<int:job_id>', methods=['POST'])
 @login_required
 def apply_job(job_id):
@@ -687,21 +854,18 @@ def apply_job(job_id):
     if resume and allowed_file(resume.filename, {'pdf', 'doc', 'docx'}):
         # Save resume file
         filename = secure_filename(f"{current_user.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{resume.filename}")
-        resume_path = os.path.join(app.config['UPLOAD_FOLDER'], 'resumes', filename)
-        os.makedirs(os.path.dirname(resume_path), exist_ok=True)
-        resume.save(resume_path)
-        
-        # Create application
-        application = JobApplication(
-            job_id=job_id,
-            user_id=current_user.id,
-            cover_letter=request.form.get('cover_letter'),
-            resume_path=filename,
-            status='pending'
-        )
+        resume_path = os.path.join(app.config['RESUME_FOLDER'], filename)
+        try:
+            save_upload(resume, resume_path, 'resume')
+        except UploadRejected as e:
+            flash(f'CV/Resume không hợp lệ: {e}', 'danger')
+            return redirect(url_for('job_detail', job_id=job_id))
         
-        db.session.add(application)
-        db.session.commit()
+        application_id = write_queue.run(write_application, job_id, current_user.id,
+                                         request.form.get('cover_letter'), filename)
+        stats_cache.invalidate('applications')
+        activity_log.log(JOB_APPLIED, current_user, 'job_application', application_id,
+                         f'{current_user.name} - {job.title}')
         flash('Ứng tuyển thành công', 'success')
     else:
         flash('File không hợp lệ. Chỉ chấp nhận file PDF, DOC hoặc DOCX', 'danger')
@@ -719,20 +883,14 @@ def admin_dashboard():
 
         app.logger.info(f"Admin user accessed dashboard: {current_user.email} (ID: {current_user.id})")
         
-        total_users = User.query.count()
-        total_jobs = Job.query.count()
-        pending_jobs_count = Job.query.filter_by(is_confirmed=False).count()
-        total_applications = JobApplication.query.count()
-        recent_jobs = Job.query.order_by(Job.created_at.desc()).limit(5).all()
-        recent_users = User.query.order_by(User.created_at.desc()).limit(5).all()
+        jobs = cached_job_counts()
 
         return render_template('admin/dashboard.html',
-                             total_users=total_users,
-                             total_jobs=total_jobs,
-                             pending_jobs_count=pending_jobs_count,
-                             total_applications=total_applications,
-                             recent_jobs=recent_jobs,
-                             recent_users=recent_users)
+                             total_users=sum(cached_user_counts().values()),
+                             total_jobs=jobs['total'],
+                             pending_jobs_count=jobs['total'] - jobs['confirmed'],
+                             total_applications=sum(cached_application_counts().values()),
+                             recent_jobs=stats_cache.get('recent_jobs', lambda: recent_jobs(5), tags=('jobs',)))
     except Exception as e:
         app.logger.error(f"Error in admin dashboard: {str(e)}", exc_info=True)
         flash(f'Có lỗi xảy ra khi tải trang quản trị: {str(e)}', 'danger')
@@ -756,10 +914,16 @@ def admin_pending_jobs():
     if current_user.role != 'admin':
         flash('Bạn không có quyền truy cập', 'danger')
         return redirect(url_for('index'))
-    jobs = Job.query.filter_by(is_confirmed=False).order_by(Job.created_at.desc()).all()
+    # Newest first by id, which unlike created_at is unique; duplicates are looked up for this page only
+    jobs, next_cursor = keyset_page(Job.query.filter_by(is_confirmed=False), [(Job.id, True)],
+                                    cursor=request.args.get('cursor'), per_page=PENDING_JOBS_PER_PAGE)
+    duplicates = find_duplicates(jobs)
+    job_totals = cached_job_counts()
+    pending_total = job_totals['total'] - job_totals['confirmed']
     now = datetime.now(UTC)  # Current time for template use
     # Use a different template to avoid conflicts, or add logic to jobs.html
-    return render_template('admin/pending_jobs.html', jobs=jobs, now=now)
+    return render_template('admin/pending_jobs.html', jobs=jobs, duplicates=duplicates, now=now,
+                           pending_total=pending_total, next_cursor=next_cursor)
 
 @app.route('/admin/jobs/confirm/<int:job_id>', methods=['POST'])
 @login_required
@@ -770,6 +934,8 @@ def admin_confirm_job(job_id):
     job = Job.query.get_or_404(job_id)
     job.is_confirmed = True
     db.session.commit()
+    stats_cache.invalidate('jobs')
+    activity_log.log(JOB_CONFIRMED, current_user, 'job', job.id, f'{job.title} - {job.company_name}')
     flash(f'Đã duyệt công việc "{job.title}"', 'success')
     return redirect(url_for('admin_pending_jobs'))
     
@@ -782,8 +948,12 @@ def admin_delete_job(job_id):
 
     job = Job.query.get_or_404(job_id)
     job_title = job.title # Get title before deleting
+    remove_from_applicant_index(job_id=job.id)
+    stale_files = release_media(app.config['UPLOAD_FOLDER'], [job.company_logo and f'company_logos/{job.company_logo}'])
     db.session.delete(job)
     db.session.commit()
+    schedule_file_purge(stale_files)
+    stats_cache.invalidate('jobs', 'applications')
     flash(f'Đã xóa tin tuyển dụng "{job_title}"', 'success')
     # Redirect back to the page the admin came from (e.g., all jobs or pending jobs)
     return redirect(request.referrer or url_for('admin_jobs'))
@@ -797,7 +967,8 @@ def admin_users():
     
     # Get filter parameters
     role = request.args.get('role')
-    search = request.args.get('search', '')
+    search = request.args.get('search', '').strip()
+    page = request.args.get('page', 1, type=int)
     
     # Build query
     query = User.query
@@ -806,20 +977,119 @@ def admin_users():
     if role:
         query = query.filter(User.role == role)
     
-    # Apply search filter
-    if search:
-        search_term = f'%{search}%'
-        query = query.filter(
-            or_(
-                User.name.ilike(search_term),
-                User.email.ilike(search_term)
-            )
-        )
+    # Apply search filter: email prefix or diacritic-insensitive name match, both indexed
+    search_clause = user_search_clause(search)
+    if search_clause is not None:
+        query = query.filter(search_clause)
     
-    # Get users
-    users = query.order_by(User.created_at.desc()).all()
-    
-    return render_template('admin/users.html', users=users)
+    # The unfiltered totals only change when users are added or removed, so they are cached;
+    # searches are counted through the indexes on every request
+    if search_clause is None:
+        total = stats_cache.get(f'admin_users_total:{role or ""}', query.count, tags=('users',))
+    else:
+        total = query.count()
+    pages = max((total + ADMIN_USERS_PER_PAGE - 1) // ADMIN_USERS_PER_PAGE, 1)
+    page = min(max(page, 1), pages)
+    users = query.options(joinedload(User.profile)) \
+        .order_by(User.id.desc()) \
+        .offset((page - 1) * ADMIN_USERS_PER_PAGE).limit(ADMIN_USERS_PER_PAGE).all()
+    
+    # Post, job and application counts for the page in one query
+    user_ids = [user.id for user in users]
+    summaries = {}
+    if user_ids:
+        post_count = db.session.query(func.count(Post.id)).filter(Post.user_id == User.id).scalar_subquery()
+        job_count = db.session.query(func.count(Job.id)).filter(Job.alumni_id == User.id).scalar_subquery()
+        application_count = db.session.query(func.count(JobApplication.id)) \
+            .filter(JobApplication.user_id == User.id).scalar_subquery()
+        for user_id, posts, jobs, applications in db.session.query(User.id, post_count, job_count, application_count) \
+                .filter(User.id.in_(user_ids)):
+            summaries[user_id] = {'posts': posts, 'jobs': jobs, 'applications': applications}
+    
+    return render_template('admin/users.html',
+                         users=users,
+                         summaries=summaries,
+                         role_counts=cached_user_counts(),
+                         total=total,
+                         page=page,
+                         pages=pages)
+
+@app.route('/admin/users/import', methods=['POST'])
+@login_required
+def admin_import_alumni():
+    """Start a bulk alumni import from an uploaded CSV; poll the returned status URL."""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    file = request.files.get('file')
+    if not file or not file.filename:
+        return jsonify({'error': 'Vui lòng chọn file CSV'}), 400
+    if not allowed_file(file.filename, {'csv'}):
+        return jsonify({'error': 'Chỉ chấp nhận file CSV'}), 400
+    
+    # The import outlives the request, so the upload is copied to disk first
+    fd, path = tempfile.mkstemp(prefix='alumni-import-', suffix='.csv')
+    with os.fdopen(fd, 'wb') as out:
+        shutil.copyfileobj(file.stream, out)
+    # A half-done import is not retried; rows already created would be skipped as existing anyway
+    item = enqueue('import_alumni', max_attempts=1, created_by=current_user.id,
+                   path=path, filename=secure_filename(file.filename))
+    db.session.commit()
+    app.logger.info(f"Admin {current_user.id} started alumni import task {item.id} from {file.filename}")
+    return jsonify({
+        'success': True,
+        'id': item.id,
+        'status_url': url_for('admin_import_alumni_status', import_id=item.id)
+    }), 202
+
+@app.route('/admin/users/import/<int:import_id>')
+@login_required
+def admin_import_alumni_status(import_id):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    item = db.session.get(Task, import_id)
+    if item is None or item.name != 'import_alumni':
+        abort(404)
+    status = task_status(item)
+    progress = status['result'] or status['progress'] or ImportProgress().as_dict()
+    if item.status == 'failed' and progress['status'] != 'failed':
+        progress['status'] = 'failed'
+        progress['errors'].append({'line': None, 'error': 'Lỗi hệ thống khi nhập dữ liệu'})
+    progress['id'] = item.id
+    return jsonify(progress)
+
+def import_alumni_file(stream, progress=None, workers=None, on_chunk=None):
+    """Run import_alumni with welcome emails linking to set_password on APP_BASE_URL."""
+    with app.test_request_context(base_url=app.config['APP_BASE_URL']):
+        return import_alumni(
+            stream, progress, workers=workers, on_chunk=on_chunk,
+            set_password_url=lambda token: url_for('set_password', token=token, _external=True)
+        )
+
+@task('import_alumni')
+def import_alumni_task(path, filename=None, login_url=None):
+    """Import a CSV saved by admin_import_alumni, storing its progress on the task.
+
+    ``login_url`` is ignored; imports queued before set-password links still pass it.
+    """
+    progress = ImportProgress(filename)
+
+    def on_chunk(progress):
+        stats_cache.invalidate('users')
+        report_progress(progress.as_dict())
+
+    try:
+        with open(path, encoding='utf-8-sig', newline='') as stream:
+            import_alumni_file(stream, progress, workers=app.config['ALUMNI_IMPORT_WORKERS'], on_chunk=on_chunk)
+    except Exception:
+        report_progress(progress.as_dict())
+        raise
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    app.logger.info(f"Alumni import of {filename}: {progress.created} created, {progress.skipped} skipped")
+    return progress.as_dict()
 
 @app.route('/admin/delete_user/<int:user_id>', methods=['POST'])
 @login_required
@@ -834,49 +1104,11 @@ def delete_user(user_id):
         return redirect(url_for('admin_users'))
     
     try:
-        # Delete all related data first to avoid integrity errors
-        # Delete comments by this user
-        Comment.query.filter_by(user_id=user_id).delete()
-        
-        # Remove user from post likes
-        liked_posts = user.liked_posts
-        for post in liked_posts:
-            post.likers.remove(user)
-        
-        # Delete posts by this user
-        Post.query.filter_by(user_id=user_id).delete()
-        
-        # Delete job applications by this user
-        JobApplication.query.filter_by(user_id=user_id).delete()
-        
-        # Delete event registrations by this user
-        EventRegistration.query.filter_by(user_id=user_id).delete()
-        
-        # Delete events created by this user
-        events = Event.query.filter_by(creator_id=user_id).all()
-        for event in events:
-            # Delete registrations for this event
-            EventRegistration.query.filter_by(event_id=event.id).delete()
-            db.session.delete(event)
-        
-        # Delete jobs posted by this user
-        jobs = Job.query.filter_by(alumni_id=user_id).all()
-        for job in jobs:
-            # Delete applications for this job
-            JobApplication.query.filter_by(job_id=job.id).delete()
-            db.session.delete(job)
-        
-        # Delete skills, education, and experience
-        Skill.query.filter_by(user_id=user_id).delete()
-        Education.query.filter_by(user_id=user_id).delete()
-        Experience.query.filter_by(user_id=user_id).delete()
-        
-        # Delete profile
-        Profile.query.filter_by(user_id=user_id).delete()
-        
-        # Finally delete the user
-        db.session.delete(user)
+        # A fixed number of set-based deletes; uploads are removed after the commit
+        files = delete_user_data(user_id, app.config['UPLOAD_FOLDER'], app.config['RESUME_FOLDER'])
         db.session.commit()
+        stats_cache.invalidate('users', 'jobs', 'applications')
+        schedule_file_purge(files)
         
         flash('Đã xóa người dùng và tất cả dữ liệu liên quan', 'success')
     except Exception as e:
@@ -894,13 +1126,52 @@ def logout():
     
 @app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
-    # This allows for subdirectories in the path
-    directory = os.path.dirname(filename)
-    file = os.path.basename(filename)
-    if directory:
-        upload_folder = os.path.join(app.config['UPLOAD_FOLDER'], directory)
-        return send_from_directory(upload_folder, file)
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    if filename.split('/', 1)[0] not in PUBLIC_UPLOAD_FOLDERS:
+        abort(404)
+    return send_upload(app.config['UPLOAD_FOLDER'], filename)
+
+@app.route('/resumes/<path:filename>')
+@login_required
+def download_resume(filename):
+    application = JobApplication.query.filter_by(resume_path=filename).first_or_404()
+    if current_user.role != 'admin' and current_user.id not in (application.user_id, application.job.alumni_id):
+        abort(403)
+    return send_upload(app.config['RESUME_FOLDER'], filename, private=True,
+                       accel_config='RESUME_ACCEL_REDIRECT_PREFIX')
+
+@app.before_request
+def start_task_runner():
+    # Started lazily so CLI commands and the reloader parent don't spawn it
+    if app.config['TASK_RUNNER_IN_PROCESS']:
+        task_runner.start()
+
+@app.route('/tasks/<int:task_id>')
+@login_required
+def task_detail(task_id):
+    """Status of a background task, for the user who queued it or an admin."""
+    item = db.session.get(Task, task_id)
+    if item is None or (current_user.role != 'admin' and item.created_by != current_user.id):
+        abort(404)
+    return jsonify(task_status(item))
+
+@app.route('/admin/tasks')
+@login_required
+def admin_tasks():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    query = Task.query
+    status = request.args.get('status')
+    if status:
+        query = query.filter(Task.status == status)
+    items = query.order_by(Task.id.desc()).limit(min(request.args.get('limit', 50, type=int), 200)).all()
+    return jsonify({'tasks': [task_status(item) for item in items]})
+
+@app.before_request
+def hide_static_resumes():
+    # Until `flask move-resumes` has run, old resumes still sit under static/.
+    # Normalized first, so '//', '.' and '..' segments cannot route around the check.
+    if posixpath.normpath(request.path).startswith('/static/uploads/resumes/'):
+        abort(404)
 
 @app.route('/job/<int:job_id>')
 def job_detail(job_id):
@@ -1022,8 +1293,10 @@ def edit_job(job_id):
                 elif salary_max:
                     salary_display = f"Đến {salary_max} {currency}"
             
-            # Cập nhật thông tin job
+            # Cập nhật thông tin job; trường logo chứa file tải lên chứ không phải tên file đã lưu
+            current_logo = job.company_logo
             form.populate_obj(job)
+            job.company_logo = current_logo
             job.salary_display = salary_display
             
             # Cập nhật work_type nếu có trong form
@@ -1034,26 +1307,26 @@ def edit_job(job_id):
             if form.deadline.data:
                 job.deadline = form.deadline.data.replace(tzinfo=UTC)
             
-            # Xử lý logo công ty
-            if form.company_logo.data:
-                file = form.company_logo.data
-                if file and file.filename and allowed_file(file.filename, {'png', 'jpg', 'jpeg'}):
-                    # Xóa logo cũ nếu có
-                    if job.company_logo:
-                        old_logo_path = os.path.join(app.config['UPLOAD_FOLDER'], 'company_logos', job.company_logo)
-                        if os.path.exists(old_logo_path):
-                            os.remove(old_logo_path)
-                    
-                    filename = secure_filename(f"company_{current_user.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.filename}")
-                    file_path = os.path.join(app.config['UPLOAD_FOLDER'], 'company_logos', filename)
-                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                    file.save(file_path)
-                    job.company_logo = filename
-                elif file and file.filename:
-                    flash('Logo công ty không hợp lệ. Chỉ chấp nhận file PNG, JPG', 'danger')
+            # Xử lý logo công ty; không có file mới thì trường form giữ tên file hiện tại
+            stale_files = []
+            file = request.files.get('company_logo')
+            if file and file.filename:
+                try:
+                    filename = store_upload(file, app.config['UPLOAD_FOLDER'], 'company_logos',
+                                            extensions={'png', 'jpg', 'jpeg'})
+                except UploadRejected as e:
+                    flash(f'Logo công ty không hợp lệ: {e}', 'danger')
                     return render_template('alumni/edit_job.html', form=form, job=job, job_types=JOB_TYPES, levels=LEVELS, work_types=WORK_TYPES)
+                    
+                # Logo cũ bị xóa sau khi commit nếu không tin nào khác dùng
+                if job.company_logo:
+                    stale_files = release_media(app.config['UPLOAD_FOLDER'], [f'company_logos/{job.company_logo}'])
+                job.company_logo = filename
             
+            fingerprint_job(job)
             db.session.commit()
+            schedule_file_purge(stale_files)
+            stats_cache.invalidate('jobs')
             flash('Cập nhật tin tuyển dụng thành công', 'success')
             return redirect(url_for('alumni_jobs'))
             
@@ -1077,6 +1350,7 @@ def add_education():
         end_date=data.get('end_date')
     )
     db.session.add(education)
+    reindex_user(current_user.id)
     db.session.commit()
     return jsonify({'success': True, 'id': education.id})
     
@@ -1087,6 +1361,7 @@ def delete_education(id):
     if education.user_id != current_user.id:
         abort(403)
     db.session.delete(education)
+    reindex_user(current_user.id)
     db.session.commit()
     return jsonify({'success': True})
 
@@ -1103,6 +1378,7 @@ def add_experience():
         description=data.get('description')
     )
     db.session.add(experience)
+    reindex_user(current_user.id)
     db.session.commit()
     return jsonify({'success': True, 'id': experience.id})
     
@@ -1113,6 +1389,7 @@ def delete_experience(id):
     if experience.user_id != current_user.id:
         abort(403)
     db.session.delete(experience)
+    reindex_user(current_user.id)
     db.session.commit()
     return jsonify({'success': True})
 
@@ -1125,6 +1402,7 @@ def add_skill():
         name=data.get('name')
     )
     db.session.add(skill)
+    reindex_user(current_user.id)
     db.session.commit()
     return jsonify({'success': True, 'id': skill.id})
 
@@ -1135,6 +1413,7 @@ def delete_skill(id):
     if skill.user_id != current_user.id:
         abort(403)
     db.session.delete(skill)
+    reindex_user(current_user.id)
     db.session.commit()
     return jsonify({'success': True})
 
@@ -1156,6 +1435,23 @@ def admin_view_user(user_id):
                          experience=experience,
                          skills=skills)
 
+def cached_user_counts():
+    return stats_cache.get('users_by_role', users_by_role, tags=('users',))
+
+def cached_job_counts():
+    return stats_cache.get('job_counts', job_counts, tags=('jobs',))
+
+def cached_application_counts():
+    return stats_cache.get('applications_by_status', applications_by_status, tags=('applications',))
+
+def load_recent_activities(limit=10):
+    """Newest activity log entries in the shape the analytics template expects."""
+    return [{
+        'timestamp': entry.created_at,
+        'action': activity_label(entry.kind),
+        'details': entry.summary
+    } for entry in ActivityLog.query.order_by(ActivityLog.id.desc()).limit(limit)]
+
 @app.route('/admin/analytics')
 @login_required
 def admin_analytics():
@@ -1163,110 +1459,59 @@ def admin_analytics():
         flash('Bạn không có quyền truy cập trang này', 'danger')
         return redirect(url_for('index'))
 
-    # Calculate basic statistics
-    total_users = User.query.count()
-    total_jobs = Job.query.count()
-    active_jobs = Job.query.filter_by(is_confirmed=True).count()
-    total_applications = JobApplication.query.count()
+    # Calculate basic statistics, one grouped query per table
+    role_counts = cached_user_counts()
+    total_users = sum(role_counts.values())
+    student_count = role_counts.get('user', 0)
+    alumni_count = role_counts.get('alumni', 0)
+    admin_count = role_counts.get('admin', 0)
 
-    # Calculate user distribution
-    student_count = User.query.filter_by(role='user').count()
-    alumni_count = User.query.filter_by(role='alumni').count()
-    admin_count = User.query.filter_by(role='admin').count()
+    jobs = cached_job_counts()
+    total_jobs = jobs['total']
+    active_jobs = jobs['confirmed']
+    jobs_by_type = jobs['by_type']
 
-    # Calculate monthly statistics
-    now = datetime.utcnow()
-    last_month = now.replace(day=1) - timedelta(days=1)
-    this_month_start = now.replace(day=1)
-    last_month_start = last_month.replace(day=1)
+    status_counts = cached_application_counts()
+    total_applications = sum(status_counts.values())
 
-    last_month_users = User.query.filter(
-        User.created_at >= last_month_start,
-        User.created_at < this_month_start
-    ).count()
+    # Monthly statistics come from the daily rollup
+    now = datetime.utcnow()
+    months = month_starts(now, 6)
+    monthly = stats_cache.get(
+        f'monthly_totals:{months[0]}',
+        lambda: monthly_totals([NEW_USERS, NEW_JOBS, APPLICATIONS], since=months[0]),
+        tags=('users', 'jobs', 'applications')
+    )
+    this_month_start, last_month_start = months[-1], months[-2]
 
-    this_month_applications = JobApplication.query.filter(
-        JobApplication.created_at >= this_month_start
-    ).count()
+    last_month_users = monthly[NEW_USERS].get(last_month_start, 0)
+    current_month_users = monthly[NEW_USERS].get(this_month_start, 0)
+    this_month_applications = monthly[APPLICATIONS].get(this_month_start, 0)
 
     # Calculate user growth
     user_growth = 0
     if last_month_users > 0:
-        current_month_users = User.query.filter(
-            User.created_at >= this_month_start
-        ).count()
         user_growth = round(((current_month_users - last_month_users) / last_month_users) * 100)
 
     # Calculate success rate (example: based on application status)
-    successful_applications = JobApplication.query.filter_by(status='accepted').count()
+    successful_applications = status_counts.get('accepted', 0)
     success_rate = round((successful_applications / total_applications * 100) if total_applications > 0 else 0)
 
     # Get job categories data
     job_categories = JOB_TYPES
-    job_category_counts = [Job.query.filter_by(job_type=cat).count() for cat in job_categories]
+    job_category_counts = [jobs_by_type.get(cat, 0) for cat in job_categories]
 
     # Get monthly activity data for the last 6 months
-    monthly_labels = []
-    monthly_jobs = []
-    monthly_applications = []
-    
-    for i in range(5, -1, -1):
-        month_start = (now - timedelta(days=30*i)).replace(day=1)
-        month_end = (month_start.replace(month=month_start.month+1) if month_start.month < 12 
-                    else month_start.replace(year=month_start.year+1, month=1))
-        
-        monthly_labels.append(month_start.strftime('%m/%Y'))
-        monthly_jobs.append(Job.query.filter(
-            Job.created_at >= month_start,
-            Job.created_at < month_end
-        ).count())
-        monthly_applications.append(JobApplication.query.filter(
-            JobApplication.created_at >= month_start,
-            JobApplication.created_at < month_end
-        ).count())
-
-    # Get recent activities (example: job postings and applications)
-    recent_activities = []
-    recent_jobs = Job.query.order_by(Job.created_at.desc()).limit(5).all()
-    recent_applications = JobApplication.query.order_by(JobApplication.created_at.desc()).limit(5).all()
-
-    for job in recent_jobs:
-        recent_activities.append({
-            'timestamp': job.created_at,
-            'action': 'Tin tuyển dụng mới',
-            'details': f'{job.title} - {job.company_name}'
-        })
-
-    for app in recent_applications:
-        recent_activities.append({
-            'timestamp': app.created_at,
-            'action': 'Đơn ứng tuyển mới',
-            'details': f'{app.applicant.name} - {app.job.title}'
-        })
-
-    # Sort activities by timestamp
-    recent_activities.sort(key=lambda x: x['timestamp'], reverse=True)
-    recent_activities = recent_activities[:10]  # Keep only 10 most recent
+    monthly_labels = [month.strftime('%m/%Y') for month in months]
+    monthly_jobs = [monthly[NEW_JOBS].get(month, 0) for month in months]
+    monthly_applications = [monthly[APPLICATIONS].get(month, 0) for month in months]
 
-    # Get top employers
-    top_employers = []
-    company_stats = {}
-    
-    for job in Job.query.all():
-        if job.company_name not in company_stats:
-            company_stats[job.company_name] = {
-                'company_name': job.company_name,
-                'job_count': 0,
-                'application_count': 0
-            }
-        company_stats[job.company_name]['job_count'] += 1
-        company_stats[job.company_name]['application_count'] += len(job.applications)
+    # Get recent activities from the activity log
+    recent_activities = load_recent_activities()
 
-    top_employers = sorted(
-        company_stats.values(),
-        key=lambda x: (x['job_count'], x['application_count']),
-        reverse=True
-    )[:5]  # Top 5 employers
+    # Get top employers
+    top_employers = stats_cache.get('top_employers', lambda: top_employers_by_jobs(5),
+                                    tags=('jobs', 'applications'))
 
     stats = {
         'total_users': total_users,
@@ -1293,6 +1538,148 @@ def admin_analytics():
                          top_employers=top_employers,
                          now=now)  # Add now variable to template context
 
+@app.route('/admin/activity')
+@login_required
+def admin_activity():
+    if current_user.role != 'admin':
+        flash('Bạn không có quyền truy cập trang này', 'danger')
+        return redirect(url_for('index'))
+
+    kind = request.args.get('type', '')
+    actor = request.args.get('actor', '').strip()
+
+    query = ActivityLog.query
+    if kind:
+        query = query.filter(ActivityLog.kind == kind)
+    if actor:
+        if actor.isdigit():
+            query = query.filter(ActivityLog.actor_id == int(actor))
+        else:
+            actor_user = User.query.filter(func.lower(User.email) == actor.lower()).first()
+            if actor_user is None:
+                flash('Không tìm thấy người dùng với email này', 'warning')
+            query = query.filter(ActivityLog.actor_id == actor_user.id) if actor_user else query.filter(false())
+
+    entries, next_cursor = keyset_page(query, [(ActivityLog.id, True)],
+                                       cursor=request.args.get('cursor'), per_page=ACTIVITY_PER_PAGE)
+
+    return render_template('admin/activity.html',
+                         entries=entries,
+                         next_cursor=next_cursor,
+                         activity_labels=ACTIVITY_LABELS,
+                         activity_label=activity_label)
+
+@app.route('/admin/stats-cache')
+@login_required
+def admin_stats_cache():
+    """Hit/miss counters of this process's admin statistics cache."""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify(stats_cache.info())
+
+@app.route('/admin/export/<kind>')
+@login_required
+def admin_export(kind):
+    """Stream users, jobs or applications as CSV or NDJSON.
+
+    ``?since=<ISO date or datetime>`` limits the export to rows changed since
+    then; the ``X-Export-Until`` header is the value to pass next time. It
+    overlaps this export a little, so rows can repeat across exports and
+    should be deduplicated by id. Deletions only show in a full export.
+    """
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    if kind not in EXPORTS:
+        abort(404)
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return jsonify({'error': 'Invalid format'}), 400
+    since = None
+    if request.args.get('since'):
+        try:
+            since = parse_since(request.args['since'])
+        except ValueError:
+            return jsonify({'error': 'Invalid since'}), 400
+
+    started_at = datetime.utcnow()
+    columns, result = export_rows(kind, since)
+    app.logger.info(f"Admin {current_user.id} exporting {kind} as {fmt} since {since}")
+    filename = f"{kind}_{started_at.strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    return Response(
+        stream_with_context(stream_rows(columns, result, fmt)),
+        mimetype=FORMATS[fmt],
+        headers={
+            'Content-Disposition': f'attachment; filename={filename}',
+            'X-Export-Until': next_since(started_at).isoformat(),
+        }
+    )
+
+@app.route('/admin/moderation/<kind>/pending')
+@login_required
+def admin_moderation_pending(kind):
+    """Keyset-paged pending queue for jobs, events or posts."""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    if kind not in MODERATION_QUEUES:
+        abort(404)
+    limit = min(max(request.args.get('limit', 50, type=int), 1), MODERATION_PAGE_LIMIT)
+    items, next_cursor = pending_page(kind, cursor=request.args.get('cursor'), per_page=limit)
+    return jsonify({'items': items, 'next_cursor': next_cursor})
+
+@app.route('/admin/moderation/<kind>', methods=['POST'])
+@login_required
+def admin_moderate_batch(kind):
+    """Approve or reject many pending items in one transaction.
+
+    Body: ``{"action": "approve" | "reject", "ids": [...]}``. Ids that are
+    unknown or no longer pending are returned as ``skipped``.
+    """
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    if kind not in MODERATION_QUEUES:
+        abort(404)
+
+    data = request.get_json(silent=True) or {}
+    action = data.get('action')
+    if action not in ('approve', 'reject'):
+        return jsonify({'error': 'Invalid action'}), 400
+    try:
+        ids = list(dict.fromkeys(int(i) for i in data.get('ids') or []))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid id'}), 400
+    if not ids:
+        return jsonify({'error': 'Chưa chọn mục nào'}), 400
+    if len(ids) > MODERATION_MAX_BATCH:
+        return jsonify({'error': f'Tối đa {MODERATION_MAX_BATCH} mục mỗi lần'}), 400
+
+    files = []
+    try:
+        if action == 'approve':
+            processed = approve_pending(kind, ids)
+        else:
+            processed, files = reject_pending(kind, ids, app.config['UPLOAD_FOLDER'], app.config['RESUME_FOLDER'])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Batch {action} of {len(ids)} {kind} failed: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Có lỗi xảy ra khi xử lý'}), 500
+
+    if processed:
+        stats_cache.invalidate(*MODERATION_QUEUES[kind]['cache_tags'])
+        schedule_file_purge(files)
+        if kind == 'jobs' and action == 'approve':
+            for job in db.session.query(Job.id, Job.title, Job.company_name).filter(Job.id.in_(processed)):
+                activity_log.log(JOB_CONFIRMED, current_user, 'job', job.id, f'{job.title} - {job.company_name}')
+    app.logger.info(f"Admin {current_user.id} {action}d {len(processed)} {kind}")
+
+    processed_set = set(processed)
+    return jsonify({
+        'success': True,
+        'action': action,
+        'processed': processed,
+        'skipped': [i for i in ids if i not in processed_set]
+    })
+
 @app.route('/posts')
 def posts():
     """Display all public posts."""
@@ -1331,8 +1718,10 @@ def admin_delete_post(post_id):
         return redirect(url_for('index'))
     
     post = Post.query.get_or_404(post_id)
+    stale_files = release_media(app.config['UPLOAD_FOLDER'], [post_image_path(post.image_url)])
     db.session.delete(post)
     db.session.commit()
+    schedule_file_purge(stale_files)
     
     flash('Đã xóa tin tức thành công', 'success')
     return redirect(url_for('admin_posts'))
@@ -1356,12 +1745,10 @@ def job_applications(job_id):
     
     # Apply filters
     if search:
-        applications = applications.join(User).filter(
-            or_(
-                User.name.ilike(f'%{search}%'),
-                User.email.ilike(f'%{search}%')
-            )
-        )
+        # Match name, email, cover letter, skills, education and experience via the FTS index
+        search_clause = applicant_search_clause(job_id, search)
+        if search_clause is not None:
+            applications = applications.filter(search_clause)
     if status:
         applications = applications.filter_by(status=status)
     if viewed == 'true':
@@ -1442,8 +1829,10 @@ def update_application_status(application_id):
     if new_status not in ['pending', 'accepted', 'rejected']:
         return jsonify({'error': 'Invalid status'}), 400
     
+    move_stat(APPLICATIONS, application.status, new_status, day=application.created_at)
     application.status = new_status
     db.session.commit()
+    stats_cache.invalidate('applications')
     
     return jsonify({'success': True})
 
@@ -1465,8 +1854,10 @@ def delete_post(post_id):
     if post.author_id != current_user.id and current_user.role != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
     
+    stale_files = release_media(app.config['UPLOAD_FOLDER'], [post_image_path(post.image_url)])
     db.session.delete(post)
     db.session.commit()
+    schedule_file_purge(stale_files)
     return jsonify({'success': True})
 
 @app.route('/posts/export')
@@ -1608,8 +1999,9 @@ def social_feed():
             if len(featured_alumni) >= 6:  # Limit to 6 featured alumni
                 break
     
-    # Convert UTC time to local time for each post
-    posts = Post.query.order_by(Post.created_at.desc()).all()
+    # Convert UTC time to local time for each post; unpublished posts are only shown to their author
+    posts = Post.query.filter(or_(Post.is_published.is_(True), Post.user_id == current_user.id)) \
+        .order_by(Post.created_at.desc()).all()
     for post in posts:
         post.local_time = utc_to_local(post.created_at)
         for comment in post.comments:
@@ -1671,41 +2063,25 @@ def create_post():
     
     # Process image - Priority: 1. External image URL, 2. Uploaded image
     if image_url and image_url.strip():
-        # Use the image URL directly
+        # Use the image URL directly; a local copy is fetched in the background
         post.image_url = image_url.strip()
         app.logger.info(f"Using external image URL: {post.image_url}")
+        if app.config['EXTERNAL_IMAGE_PROXY'] and is_external(post.image_url):
+            request_fetch(post.image_url)
     elif image and image.filename:
         try:
-            # Validate image file
-            if not allowed_file(image.filename, {'png', 'jpg', 'jpeg', 'gif'}):
-                flash('Định dạng file không được hỗ trợ. Chỉ chấp nhận PNG, JPG, JPEG, GIF', 'danger')
-                return redirect(url_for('social_feed'))
-            
             # Process filename safely
-            filename = secure_filename(image.filename)
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-            unique_filename = f"{timestamp}_{filename}"
-            
-            # Ensure upload directory exists
-            upload_folder = os.path.join('static', 'uploads', 'posts')
-            os.makedirs(upload_folder, exist_ok=True)
-            
-            # Full path to save the file
-            image_path = os.path.join(upload_folder, unique_filename)
-            
-            # Save the image file
-            image.save(image_path)
-            
-            # Verify the file was saved successfully
-            if not os.path.exists(image_path):
-                raise FileNotFoundError(f"Failed to save image to {image_path}")
+            # Stream the image file to disk under its content hash, checking type and size
+            filename = store_upload(image, app.config['UPLOAD_FOLDER'], 'posts')
             
             # Store the relative path in the database (for use with url_for('static', filename=...))
-            post.image_url = f"uploads/posts/{unique_filename}"
+            post.image_url = f"uploads/posts/{filename}"
             
-            app.logger.info(f"Saved image to: {image_path}")
             app.logger.info(f"Stored in database as: {post.image_url}")
         
+        except UploadRejected as e:
+            flash(f'Hình ảnh không hợp lệ: {e}', 'danger')
+            return redirect(url_for('social_feed'))
         except Exception as e:
             error_msg = f"Error processing image upload: {str(e)}"
             app.logger.error(error_msg, exc_info=True)
@@ -1716,6 +2092,7 @@ def create_post():
     try:
         db.session.add(post)
         db.session.commit()
+        activity_log.log(POST_CREATED, current_user, 'post', post.id, post.content[:100])
         flash('Bài viết đã được tạo thành công!', 'success')
     except Exception as e:
         db.session.rollback()
@@ -1747,42 +2124,37 @@ def edit_post(post_id):
         
         post.content = content
         
-        # Handle image removal if requested
-        if remove_image and post.image_url and not post.image_url.startswith('http'):
-            # Only delete local files, not external URLs
-            image_path = os.path.join('static', post.image_url)
-            if os.path.exists(image_path):
-                os.remove(image_path)
+        # Store a new upload before touching the current image, so a rejected file changes nothing
+        old_image = post_image_path(post.image_url)
+        new_image = None
+        if not (image_url and image_url.strip()) and image and image.filename:
+            try:
+                new_image = store_upload(image, app.config['UPLOAD_FOLDER'], 'posts')
+            except UploadRejected as e:
+                flash(f'Hình ảnh không hợp lệ: {e}', 'danger')
+                return redirect(url_for('edit_post', post_id=post_id))
+        
+        # Handle image removal if requested (external URLs are simply dropped)
+        if remove_image and post.image_url:
             post.image_url = None
         
         # Priority: 1. Image URL (if provided), 2. Uploaded image
         if image_url and image_url.strip():
-            # Use the image URL directly
+            # Use the image URL directly; a local copy is fetched in the background
             post.image_url = image_url.strip()
-        elif image and image.filename:
-            # Delete old local image if it exists
-            if post.image_url and not post.image_url.startswith('http'):
-                old_image_path = os.path.join('static', post.image_url)
-                if os.path.exists(old_image_path):
-                    os.remove(old_image_path)
-            
-            # Save new image
-            filename = secure_filename(image.filename)
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-            filename = f"{timestamp}_{filename}"
-            
-            # Ensure directory exists
-            upload_folder = os.path.join('static', 'uploads', 'posts')
-            os.makedirs(upload_folder, exist_ok=True)
-            
-            # Save file to path
-            image_path = os.path.join(upload_folder, filename)
-            image.save(image_path)
-            
+            if app.config['EXTERNAL_IMAGE_PROXY'] and is_external(post.image_url):
+                request_fetch(post.image_url)
+        elif new_image:
             # Store the relative path in the database (for use with url_for('static', filename=...))
-            post.image_url = f"uploads/posts/{filename}"
+            post.image_url = f"uploads/posts/{new_image}"
+        
+        # The previous upload loses this post's reference; re-uploading the same file keeps the count even
+        stale_files = []
+        if old_image and (new_image or post_image_path(post.image_url) != old_image):
+            stale_files = release_media(app.config['UPLOAD_FOLDER'], [old_image])
         
         db.session.commit()
+        schedule_file_purge(stale_files)
         flash('Bài viết đã được cập nhật thành công!', 'success')
         return redirect(url_for('social_feed'))
     
@@ -1798,18 +2170,23 @@ def delete_social_post(post_id):
         flash('Bạn không có quyền xóa bài viết này!', 'danger')
         return redirect(url_for('social_feed'))
     
-    # Delete the post's image if it exists
-    if post.image_url and not post.image_url.startswith('http'):
-        image_path = os.path.join('static', post.image_url)
-        if os.path.exists(image_path):
-            os.remove(image_path)
+    # The post's image is deleted unless another row shares it
+    stale_files = release_media(app.config['UPLOAD_FOLDER'], [post_image_path(post.image_url)])
     
     db.session.delete(post)
     db.session.commit()
+    schedule_file_purge(stale_files)
     
     flash('Bài viết đã được xóa thành công!', 'success')
     return redirect(url_for('social_feed'))
 
+def write_comment(content, user_id, post_id):
+    """Add a comment. Does not commit; returns its id and created_at."""
+    comment = Comment(content=content, user_id=user_id, post_id=post_id)
+    db.session.add(comment)
+    db.session.flush()
+    return comment.id, comment.created_at
+
 @app.route('/social/posts/<int:post_id>/comments', methods=['POST'])
 @login_required
 def create_comment(post_id):
@@ -1819,12 +2196,10 @@ def create_comment(post_id):
     if not content:
         return jsonify({'success': False, 'message': 'Nội dung bình luận không được để trống'})
     
-    comment = Comment(content=content, user_id=current_user.id, post_id=post_id)
-    db.session.add(comment)
-    db.session.commit()
+    comment_id, created_at = write_queue.run(write_comment, content, current_user.id, post_id)
     
     # Convert UTC time to local time
-    comment.local_time = utc_to_local(comment.created_at)
+    local_time = utc_to_local(created_at)
     
     # Get the avatar URL for the current user
     avatar_url = None
@@ -1833,12 +2208,12 @@ def create_comment(post_id):
     
     return jsonify({
         'success': True,
-        'comment_id': comment.id,
+        'comment_id': comment_id,
         'user_name': current_user.name,
         'user_id': current_user.id,
         'post_id': post_id,
         'avatar_url': avatar_url,
-        'created_at': comment.local_time.strftime('%d/%m/%Y %H:%M')
+        'created_at': local_time.strftime('%d/%m/%Y %H:%M')
     })
 
 @app.route('/social/comments/<int:comment_id>/delete', methods=['POST'])
@@ -1859,18 +2234,23 @@ def delete_comment(comment_id):
     
     return jsonify({'success': True, 'post_id': post_id})
 
+def write_like_toggle(post_id, user_id):
+    """Like the post, or unlike it if the user already does. Does not commit; returns the like count."""
+    unliked = db.session.execute(
+        post_likes.delete().where(post_likes.c.post_id == post_id, post_likes.c.user_id == user_id)
+    ).rowcount
+    if not unliked:
+        db.session.execute(post_likes.insert().values(post_id=post_id, user_id=user_id))
+    return db.session.query(func.count()).select_from(post_likes) \
+        .filter(post_likes.c.post_id == post_id).scalar()
+
 @app.route('/social/posts/<int:post_id>/toggle_like', methods=['POST'])
 @login_required
 def toggle_like(post_id):
-    post = Post.query.get_or_404(post_id)
-    if current_user in post.likers:
-        post.likers.remove(current_user)
-    else:
-        post.likers.append(current_user)
-    db.session.commit()
+    Post.query.get_or_404(post_id)
     return jsonify({
         'success': True,
-        'likes_count': len(post.likers.all())
+        'likes_count': write_queue.run(write_like_toggle, post_id, current_user.id)
     })
 
 @app.template_global()
@@ -1881,6 +2261,42 @@ def update_url(args, **kwargs):
         params[key] = value
     return '?' + urlencode(params)
 
+@app.template_global()
+def image_url(path, size=None):
+    """URL of an uploaded image at a display size ('thumb', 'medium', 'large').
+
+    ``path`` is relative to the upload folder ('avatars/x.jpg') or to static
+    ('uploads/posts/x.jpg', as stored in Post.image_url); external URLs go
+    through the local image cache. Falls back to the original until its
+    variants exist.
+    """
+    if not path:
+        return path
+    if path.startswith(('http://', 'https://')):
+        if app.config['EXTERNAL_IMAGE_PROXY'] and is_external(path):
+            return url_for('external_image', url=path, size=size)
+        return path
+    if path.startswith('uploads/'):
+        path = path[len('uploads/'):]
+    path = image_url_path(path, size, app.config['UPLOAD_FOLDER'])
+    # The content version makes the URL cacheable forever; a new file gets a new URL
+    return url_for('uploaded_file', filename=path, v=upload_version(app.config['UPLOAD_FOLDER'], path))
+
+@app.route('/images/external')
+def external_image():
+    """Cached copy of an image a post links from another site."""
+    return external_image_response(request.args.get('url', ''), request.args.get('size'),
+                                   app.config['UPLOAD_FOLDER'])
+
+@app.template_global()
+def asset_urls(bundle):
+    """URLs to load for a CSS/JS bundle (see assets.BUNDLES)."""
+    return assets.asset_urls(app.static_folder, bundle)
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    return assets.send_asset(app.static_folder, filename)
+
 @app.route('/init-admin')
 def init_admin():
     admin_email = "admin@fit.edu.vn"
@@ -1897,7 +2313,9 @@ def init_admin():
             role='admin'
         )
         db.session.add(admin)
+        record_stat(NEW_USERS, 'admin')
         db.session.commit()
+        stats_cache.invalidate('users')
         return "Admin user created successfully!"
     return "Admin user already exists!"
 
@@ -1956,24 +2374,18 @@ def alumni_add_event():
             if form.image.data:
                 file = form.image.data
                 if file and file.filename:
-                    # Check file size (max 5MB)
-                    if len(file.read()) > 5 * 1024 * 1024:
-                        flash('Ảnh sự kiện không được vượt quá 5MB', 'danger')
-                        return render_template('alumni/add_event.html', form=form)
-                    file.seek(0)  # Reset file pointer after reading
-                    
-                    if allowed_file(file.filename, {'png', 'jpg', 'jpeg'}):
-                        filename = secure_filename(f"event_{current_user.id}_{int(time.time())}_{file.filename}")
-                        file_path = os.path.join(app.config['UPLOAD_FOLDER'], 'events', filename)
-                        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                        file.save(file_path)
-                        event.image = filename
-                    else:
-                        flash('Ảnh sự kiện không hợp lệ. Chỉ chấp nhận file PNG, JPG', 'danger')
+                    # Streamed to disk with the 5MB image limit
+                    try:
+                        event.image = store_upload(file, app.config['UPLOAD_FOLDER'], 'events',
+                                                   extensions={'png', 'jpg', 'jpeg'})
+                    except UploadRejected as e:
+                        flash(f'Ảnh sự kiện không hợp lệ: {e}', 'danger')
                         return render_template('alumni/add_event.html', form=form)
             
             db.session.add(event)
+            record_stat(NEW_EVENTS)
             db.session.commit()
+            activity_log.log(EVENT_CREATED, current_user, 'event', event.id, event.title)
             
             flash('Tạo sự kiện thành công! Sự kiện của bạn đang chờ duyệt.', 'success')
             return redirect(url_for('alumni_events'))
@@ -2002,34 +2414,38 @@ def edit_event(event_id):
 
     if form.validate_on_submit():
         try:
-            # Update event information
+            # Update event information; the image field holds the upload, not the stored filename
+            current_image = event.image
             form.populate_obj(event)
+            event.image = current_image
             
             # Convert datetime to UTC
             event.start_time = event.start_time.replace(tzinfo=UTC)
             if event.end_time:
                 event.end_time = event.end_time.replace(tzinfo=UTC)
             
-            # Handle image upload
-            if form.image.data:
-                file = form.image.data
-                if file and file.filename and allowed_file(file.filename, {'png', 'jpg', 'jpeg'}):
-                    # Delete old image if exists
-                    if event.image:
-                        old_image_path = os.path.join(app.config['UPLOAD_FOLDER'], 'events', event.image)
-                        if os.path.exists(old_image_path):
-                            os.remove(old_image_path)
-                    
-                    filename = secure_filename(f"event_{current_user.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.filename}")
-                    file_path = os.path.join(app.config['UPLOAD_FOLDER'], 'events', filename)
-                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                    file.save(file_path)
-                    event.image = filename
-                elif file and file.filename:
-                    flash('Ảnh sự kiện không hợp lệ. Chỉ chấp nhận file PNG, JPG', 'danger')
+            # Handle image upload; without a new file the form field holds the current filename
+            stale_files = []
+            file = request.files.get('image')
+            if file and file.filename:
+                try:
+                    filename = store_upload(file, app.config['UPLOAD_FOLDER'], 'events',
+                                            extensions={'png', 'jpg', 'jpeg'})
+                except UploadRejected as e:
+                    flash(f'Ảnh sự kiện không hợp lệ: {e}', 'danger')
                     return render_template('alumni/edit_event.html', form=form, event=event)
+                
+                # The old image is deleted after the commit unless another row shares it
+                if event.image:
+                    stale_files = release_media(app.config['UPLOAD_FOLDER'], [f'events/{event.image}'])
+                event.image = filename
             
             db.session.commit()
+            schedule_file_purge(stale_files)
+            
+            # A raised capacity hands the new seats to the waitlist
+            if promote_waitlist(event.id):
+                db.session.commit()
             flash('Cập nhật sự kiện thành công', 'success')
             return redirect(url_for('alumni_events'))
             
@@ -2049,14 +2465,12 @@ def delete_event(event_id):
         flash('Bạn không có quyền xóa sự kiện này', 'danger')
         return redirect(url_for('index'))
     
-    # Delete image if exists
-    if event.image:
-        image_path = os.path.join(app.config['UPLOAD_FOLDER'], 'events', event.image)
-        if os.path.exists(image_path):
-            os.remove(image_path)
+    # The image is deleted unless another row shares it
+    stale_files = release_media(app.config['UPLOAD_FOLDER'], [event.image and f'events/{event.image}'])
     
     db.session.delete(event)
     db.session.commit()
+    schedule_file_purge(stale_files)
     flash('Đã xóa sự kiện', 'success')
     return redirect(url_for('alumni_events'))
 
@@ -2070,50 +2484,43 @@ def event_detail(event_id):
         flash('Sự kiện này chưa được công khai.', 'warning')
         return redirect(url_for('index'))
     
-    # Get registrations count
-    registrations_count = EventRegistration.query.filter_by(event_id=event_id).count()
+    # Active registrations are counted on the event row
+    registrations_count = event.registered_count
     
-    # Check if user is registered
+    # Check if user is registered or waiting for a seat
     user_registered = False
+    user_waitlist_position = None
     if current_user.is_authenticated:
-        user_registered = EventRegistration.query.filter_by(
-            event_id=event_id, user_id=current_user.id).first() is not None
+        registration = EventRegistration.query.filter_by(
+            event_id=event_id, user_id=current_user.id).first()
+        user_registered = registration is not None and registration.status in ACTIVE_STATUSES
+        user_waitlist_position = waitlist_position(registration)
     
     return render_template('alumni/event_detail.html', 
                          event=event, 
                          registrations_count=registrations_count,
-                         user_registered=user_registered)
+                         user_registered=user_registered,
+                         user_waitlist_position=user_waitlist_position)
 
 @app.route('/event/<int:event_id>/register', methods=['POST'])
 @login_required
 def register_event(event_id):
     event = Event.query.get_or_404(event_id)
     
-    # Check if event is already full
-    if event.capacity:
-        current_registrations = EventRegistration.query.filter_by(event_id=event_id).count()
-        if current_registrations >= event.capacity:
-            flash('Sự kiện đã đầy, không thể đăng ký thêm.', 'warning')
-            return redirect(url_for('event_detail', event_id=event_id))
-    
-    # Check if user already registered
-    existing_registration = EventRegistration.query.filter_by(
-        event_id=event_id, user_id=current_user.id).first()
-    
-    if existing_registration:
+    # Seat is claimed atomically; a full event puts the user on the waitlist
+    outcome = register_for_event(event_id, current_user.id, run_write=write_queue.run)
+    if outcome in (REGISTERED, WAITLISTED):
+        activity_log.log(EVENT_REGISTERED, current_user, 'event', event_id,
+                         f'{event.title} ({"danh sách chờ" if outcome == WAITLISTED else "đã đăng ký"})')
+    
+    if outcome == REGISTERED:
+        flash('Đăng ký tham gia sự kiện thành công!', 'success')
+    elif outcome == WAITLISTED:
+        flash('Sự kiện đã đầy. Bạn đã được thêm vào danh sách chờ và sẽ được tự động đăng ký khi có chỗ trống.', 'info')
+    elif outcome == ALREADY_WAITLISTED:
+        flash('Bạn đang trong danh sách chờ của sự kiện này.', 'info')
+    else:
         flash('Bạn đã đăng ký tham gia sự kiện này rồi.', 'info')
-        return redirect(url_for('event_detail', event_id=event_id))
-    
-    # Create new registration
-    registration = EventRegistration(
-        event_id=event_id,
-        user_id=current_user.id,
-        status='registered'
-    )
-    
-    db.session.add(registration)
-    db.session.commit()
-    flash('Đăng ký tham gia sự kiện thành công!', 'success')
     return redirect(url_for('event_detail', event_id=event_id))
 
 @app.route('/event/<int:event_id>/cancel', methods=['POST'])
@@ -2122,17 +2529,19 @@ def cancel_event_registration(event_id):
     registration = EventRegistration.query.filter_by(
         event_id=event_id, user_id=current_user.id).first()
     
-    if not registration:
+    if not registration or registration.status == 'canceled':
         flash('Bạn chưa đăng ký tham gia sự kiện này.', 'warning')
         return redirect(url_for('event_detail', event_id=event_id))
     
     # Check if the event is in the future
     event = Event.query.get_or_404(event_id)
-    if event.start_time <= datetime.now(UTC):
+    # SQLite hands back naive datetimes; start_time is stored in UTC
+    if event.start_time.replace(tzinfo=UTC) <= datetime.now(UTC):
         flash('Không thể hủy đăng ký cho sự kiện đã diễn ra.', 'danger')
         return redirect(url_for('event_detail', event_id=event_id))
     
-    registration.status = 'canceled'
+    # Frees the seat and promotes the first user on the waitlist
+    cancel_registration(registration)
     db.session.commit()
     flash('Đã hủy đăng ký tham gia sự kiện.', 'success')
     return redirect(url_for('event_detail', event_id=event_id))
@@ -2183,14 +2592,81 @@ def update_registration_status(registration_id):
     data = request.get_json()
     new_status = data.get('status')
     
-    if new_status not in ['registered', 'canceled', 'attended']:
+    if new_status not in REGISTRATION_STATUSES:
         return jsonify({'error': 'Invalid status'}), 400
     
-    registration.status = new_status
+    if not change_registration_status(registration, new_status):
+        db.session.rollback()
+        return jsonify({'error': 'Sự kiện đã đủ người tham gia'}), 409
     db.session.commit()
     
     return jsonify({'success': True})
 
+def emails_from_csv(file_storage):
+    """Read attendee emails from an uploaded CSV, streaming it row by row.
+
+    Uses the column headed "email" when there is one, otherwise any cell
+    that looks like an address.
+    """
+    stream = io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig', newline='')
+    reader = csv.reader(stream)
+    emails = []
+    email_column = None
+    for row_number, row in enumerate(reader):
+        if row_number == 0:
+            headers = [cell.strip().lower() for cell in row]
+            if 'email' in headers:
+                email_column = headers.index('email')
+                continue
+        if email_column is not None:
+            if email_column < len(row) and row[email_column].strip():
+                emails.append(row[email_column].strip())
+        else:
+            emails.extend(cell.strip() for cell in row if '@' in cell)
+    return emails
+
+@app.route('/alumni/event/<int:event_id>/checkin', methods=['POST'])
+@login_required
+def bulk_check_in_registrations(event_id):
+    """Mark many attendees as attended at once, by registration id or CSV of emails."""
+    event = Event.query.get_or_404(event_id)
+    if current_user.role != 'alumni' or event.creator_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    registration_ids = []
+    emails = []
+    if request.is_json:
+        data = request.get_json() or {}
+        registration_ids = data.get('registration_ids') or []
+        emails = data.get('emails') or []
+    elif request.files.get('file') and request.files['file'].filename:
+        try:
+            emails = emails_from_csv(request.files['file'])
+        except (UnicodeDecodeError, csv.Error) as e:
+            return jsonify({'error': f'File CSV không hợp lệ: {str(e)}'}), 400
+    
+    try:
+        registration_ids = [int(i) for i in registration_ids]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid registration id'}), 400
+    if not registration_ids and not emails:
+        return jsonify({'error': 'Không có người tham gia nào để điểm danh'}), 400
+    
+    try:
+        matched, unmatched = bulk_check_in(event_id, registration_ids, emails)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Bulk check-in failed for event {event_id}: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Có lỗi xảy ra khi điểm danh'}), 500
+    
+    return jsonify({
+        'success': True,
+        'checked_in': sum(1 for m in matched if m['previous_status'] != 'attended'),
+        'matched': matched,
+        'unmatched': unmatched
+    })
+
 @app.route('/admin/events')
 @login_required
 def admin_events():
@@ -2223,14 +2699,12 @@ def admin_delete_event(event_id):
     event = Event.query.get_or_404(event_id)
     event_title = event.title # Get title before deleting
     
-    # Delete image if exists
-    if event.image:
-        image_path = os.path.join(app.config['UPLOAD_FOLDER'], 'events', event.image)
-        if os.path.exists(image_path):
-            os.remove(image_path)
+    # The image is deleted unless another row shares it
+    stale_files = release_media(app.config['UPLOAD_FOLDER'], [event.image and f'events/{event.image}'])
     
     db.session.delete(event)
     db.session.commit()
+    schedule_file_purge(stale_files)
     flash(f'Đã xóa sự kiện "{event_title}"', 'success')
     return redirect(request.referrer or url_for('admin_events'))
 
@@ -2241,6 +2715,7 @@ def events():
     location = request.args.get('location', '')
     date_filter = request.args.get('date', '')
     sort = request.args.get('sort', 'newest')
+    cursor = request.args.get('cursor')
     
     # Base query for published events
     query = Event.query.filter_by(is_published=True)
@@ -2274,53 +2749,111 @@ def events():
     elif date_filter == 'past':
         query = query.filter(Event.start_time <= now)
     
-    # Apply sorting
-    if sort == 'newest':
-        query = query.order_by(Event.created_at.desc())
-    elif sort == 'upcoming':
-        query = query.filter(Event.start_time > now).order_by(Event.start_time.asc())
+    # Apply sorting; every ordering ends on Event.id so the cursor is unambiguous
+    if sort == 'upcoming':
+        query = query.filter(Event.start_time > now)
+        order_by = [(Event.start_time, False), (Event.id, False)]
     elif sort == 'popular':
-        query = query.join(EventRegistration).group_by(Event.id).order_by(func.count(EventRegistration.id).desc())
+        # Stored counter, so events without registrations are still listed
+        order_by = [(Event.registered_count, True), (Event.id, True)]
+    else:
+        # Ids grow with creation time, and unlike created_at they are unique
+        order_by = [(Event.id, True)]
     
-    # Execute query
-    events = query.all()
+    # Fetch one page
+    events, next_cursor = keyset_page(query, order_by, cursor=cursor, per_page=EVENTS_PER_PAGE)
     
     return render_template('events.html',
                          events=events,
+                         next_cursor=next_cursor,
                          keyword=keyword,
                          location=location,
                          date_filter=date_filter,
-                         sort=sort)
+                         sort=sort,
+                         now=now.replace(tzinfo=None))
 
 @app.route('/user/events')
 @login_required
 def user_events():
     """Display events the user has registered for."""
-    # Get user's event registrations
-    registrations = EventRegistration.query.filter_by(user_id=current_user.id).all()
-    
-    # Get events from registrations
-    events = []
-    for registration in registrations:
-        event = Event.query.get(registration.event_id)
-        if event:
-            events.append({
-                'event': event,
-                'registration_status': registration.status,
-                'registration_date': registration.created_at
-            })
-    
-    # Sort events by start time
-    events.sort(key=lambda x: x['event'].start_time)
-    
-    # Separate upcoming and past events
+    page = request.args.get('page', 1, type=int)
     now = datetime.now(UTC)
-    upcoming_events = [e for e in events if e['event'].start_time > now]
-    past_events = [e for e in events if e['event'].start_time <= now]
+    is_past = Event.start_time <= now
+    
+    # Totals for both tabs in one aggregate
+    total, past_total = db.session.query(
+        func.count(EventRegistration.id),
+        func.coalesce(func.sum(case((is_past, 1), else_=0)), 0)
+    ).join(Event, Event.id == EventRegistration.event_id) \
+     .filter(EventRegistration.user_id == current_user.id).one()
+    
+    # Upcoming events first (soonest first), then past events (most recent first)
+    query = db.select(EventRegistration, Event) \
+        .join(Event, Event.id == EventRegistration.event_id) \
+        .where(EventRegistration.user_id == current_user.id) \
+        .order_by(case((is_past, 1), else_=0),
+                  case((is_past, None), else_=Event.start_time).asc(),
+                  Event.start_time.desc(),
+                  Event.id.asc())
+    pages = max(1, -(-total // USER_EVENTS_PER_PAGE))
+    page = min(max(page, 1), pages)
+    
+    upcoming_events = []
+    past_events = []
+    rows = db.session.execute(query.limit(USER_EVENTS_PER_PAGE).offset((page - 1) * USER_EVENTS_PER_PAGE))
+    for registration, event in rows:
+        event_info = {
+            'event': event,
+            'registration_status': registration.status,
+            'registration_date': registration.created_at
+        }
+        if event.start_time.replace(tzinfo=UTC) > now:
+            upcoming_events.append(event_info)
+        else:
+            past_events.append(event_info)
     
+    calendar_url = url_for('user_events_calendar', token=feed_token(current_user), _external=True)
+    # The feed secret is created the first time the URL is shown
+    db.session.commit()
     return render_template('user/events.html',
                          upcoming_events=upcoming_events,
-                         past_events=past_events)
+                         past_events=past_events,
+                         upcoming_total=total - past_total,
+                         past_total=past_total,
+                         page=page,
+                         pages=pages,
+                         calendar_url=calendar_url)
+
+@app.route('/user/events/calendar/reset', methods=['POST'])
+@login_required
+def reset_calendar_feed():
+    """Replace the user's calendar feed URL; calendars subscribed to the old one stop updating."""
+    reset_feed_secret(current_user)
+    db.session.commit()
+    flash('Đã tạo liên kết lịch mới. Liên kết cũ không còn sử dụng được.', 'success')
+    return redirect(url_for('user_events'))
+
+@app.route('/calendar/<token>.ics')
+def user_events_calendar(token):
+    """iCalendar feed of a user's registered events, for calendar clients."""
+    user_id = user_id_from_token(token)
+    if user_id is None:
+        abort(404)
+    
+    # Answer conditional polls before building the calendar
+    etag, last_modified = feed_validators(user_id)
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = Response(status=304)
+    else:
+        body = build_calendar(feed_rows(user_id),
+                              lambda event_id: url_for('event_detail', event_id=event_id, _external=True))
+        response = Response(body, mimetype='text/calendar')
+        response.headers['Content-Disposition'] = 'inline; filename=fit-alumni-events.ics'
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 # Make sure to create the events folder for uploads
 os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'events'), exist_ok=True)
@@ -2345,15 +2878,13 @@ def remove_avatar():
     try:
         # Kiểm tra xem người dùng có avatar không
         if current_user.profile and current_user.profile.avatar:
-            # Xóa file avatar cũ
-            old_avatar_path = os.path.join(app.config['UPLOAD_FOLDER'], 'avatars', current_user.profile.avatar)
-            if os.path.exists(old_avatar_path):
-                os.remove(old_avatar_path)
-                app.logger.info(f"Đã xóa avatar: {old_avatar_path}")
+            # Bỏ tham chiếu tới avatar; file chỉ bị xóa khi không còn ai dùng
+            stale_files = release_media(app.config['UPLOAD_FOLDER'], [f'avatars/{current_user.profile.avatar}'])
             
             # Cập nhật thông tin trong database
             current_user.profile.avatar = None
             db.session.commit()
+            schedule_file_purge(stale_files)
             
             # Trả về phản hồi JSON nếu là Ajax request
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -2435,8 +2966,10 @@ def withdraw_application(application_id):
     
     try:
         # Delete the application
+        remove_from_applicant_index(application_ids=[application.id])
         db.session.delete(application)
         db.session.commit()
+        stats_cache.invalidate('applications')
         flash('Đã hủy đơn ứng tuyển thành công.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -2445,10 +2978,259 @@ def withdraw_application(application_id):
     
     return redirect(url_for('user_applications'))
 
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Rebuild the applicant and user name full-text indexes from the database."""
+    total = rebuild_applicant_index()
+    print(f"Indexed {total} applications")
+    rebuild_user_name_index()
+    print("Rebuilt user name index")
+
+@app.cli.command('backfill-daily-stats')
+@click.option('--days', type=int, default=None, help='Only recompute the last N days (default: everything)')
+def backfill_daily_stats_command(days):
+    """Recompute the analytics daily rollup from the source tables."""
+    since = (datetime.utcnow() - timedelta(days=days - 1)).date() if days else None
+    written = backfill_daily_stats(since)
+    print(f"Wrote {written} daily stat rows.")
+
+@app.cli.command('import-alumni')
+@click.argument('csv_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--workers', type=int, default=None, help='Password hashing processes (default: one per CPU)')
+def import_alumni_command(csv_file, workers):
+    """Create alumni accounts from a CSV with email, name and optional profile columns."""
+    def report(progress):
+        print(f"{progress.rows} rows read, {progress.created} created, {progress.skipped} skipped")
+    
+    with open(csv_file, encoding='utf-8-sig', newline='') as stream:
+        progress = import_alumni_file(stream, workers=workers, on_chunk=report)
+    for error in progress.errors:
+        print(f"Line {error['line']}: {error['error']}")
+    summary = progress.as_dict()
+    print(f"{summary['status']}: {summary['created']} created, {summary['skipped']} skipped "
+          f"in {summary['elapsed_seconds']}s ({summary['rows_per_second']} rows/s)")
+
+@app.cli.command('backfill-job-fingerprints')
+@click.option('--all', 'recompute_all', is_flag=True, help='Recompute every job, not only ones without a signature')
+def backfill_job_fingerprints_command(recompute_all):
+    """Compute near-duplicate signatures for existing jobs."""
+    updated = backfill_job_fingerprints(only_missing=not recompute_all)
+    print(f"Fingerprinted {updated} jobs.")
+
+@app.cli.command('generate-image-variants')
+@click.option('--force', is_flag=True, help='Rewrite variants that already exist')
+def generate_image_variants_command(force):
+    """Create thumbnail, medium and large WebP variants of existing uploaded images."""
+    images, written = generate_image_variants(app.config['UPLOAD_FOLDER'], force=force)
+    print(f"Wrote {written} variants for {images} images.")
+
+@app.cli.command('image-savings-report')
+def image_savings_report_command():
+    """Compare the size of uploaded originals with their WebP variants."""
+    report = savings_report(app.config['UPLOAD_FOLDER'])
+    for name, stats in list(report['folders'].items()) + [('total', report['total'])]:
+        sizes = ', '.join(f"{size} {stats[f'{size}_bytes']} B" + (
+            f" ({stats[f'{size}_saved_percent']}% smaller)" if stats[f'{size}_saved_percent'] is not None else '')
+            for size in IMAGE_SIZES)
+        print(f"{name}: {stats['images']} images, originals {stats['original_bytes']} B; {sizes}; "
+              f"{stats['missing_variants']} variants missing")
+
+def print_upload_gc_report(report, dry_run=False):
+    verb = 'would remove' if dry_run else 'removed'
+    for name, stats in list(report['folders'].items()) + [('total', report['total'])]:
+        print(f"{name}: {stats['scanned']} files past the grace period, {verb} {stats['removed']}, "
+              f"{stats['bytes']} B reclaimed")
+
+@app.cli.command('collect-orphaned-uploads')
+@click.option('--grace-hours', type=float, default=None, help='Keep files modified more recently (default: UPLOAD_GC_GRACE_HOURS)')
+@click.option('--dry-run', is_flag=True, help='Only report what would be removed')
+def collect_orphaned_uploads_command(grace_hours, dry_run):
+    """Remove uploaded files that no database row references."""
+    if grace_hours is None:
+        grace_hours = app.config['UPLOAD_GC_GRACE_HOURS']
+    report = collect_orphans(app.config['UPLOAD_FOLDER'], grace_seconds=grace_hours * 3600, dry_run=dry_run,
+                             directories={'resumes': app.config['RESUME_FOLDER']})
+    print_upload_gc_report(report, dry_run=dry_run)
+
+@app.cli.command('move-resumes')
+def move_resumes_command():
+    """Move resumes uploaded under static/uploads/resumes to RESUME_FOLDER."""
+    moved, kept = move_files(LEGACY_RESUME_FOLDER, app.config['RESUME_FOLDER'])
+    print(f"Moved {moved} resumes to {app.config['RESUME_FOLDER']}.")
+    for name in kept:
+        print(f"Kept {name}: a different file with that name is already in {app.config['RESUME_FOLDER']}")
+
+@app.cli.command('run-upload-gc-scheduler')
+def run_upload_gc_scheduler_command():
+    """Collect orphaned uploads every UPLOAD_GC_INTERVAL_SECONDS until interrupted."""
+    interval = app.config['UPLOAD_GC_INTERVAL_SECONDS']
+    while True:
+        try:
+            report = collect_orphans(app.config['UPLOAD_FOLDER'],
+                                     grace_seconds=app.config['UPLOAD_GC_GRACE_HOURS'] * 3600,
+                                     directories={'resumes': app.config['RESUME_FOLDER']})
+            app.logger.info(f"Upload GC: removed {report['total']['removed']} files, "
+                            f"reclaimed {report['total']['bytes']} bytes")
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Upload GC run failed: {str(e)}", exc_info=True)
+        time.sleep(interval)
+
+@app.cli.command('build-assets')
+@click.option('--fetch-vendor', is_flag=True, help='Download Bootstrap, Font Awesome, Roboto and jQuery first')
+def build_assets_command(fetch_vendor):
+    """Build the fingerprinted, precompressed CSS/JS bundles into static/dist."""
+    if fetch_vendor:
+        print(f"Fetched {assets.fetch_vendor(app.static_folder)} vendor files.")
+    try:
+        manifest = assets.build(app.static_folder)
+    except FileNotFoundError as e:
+        print(f"Missing {e.filename}; run with --fetch-vendor to download third-party files.")
+        raise SystemExit(1)
+    dist = os.path.join(app.static_folder, assets.DIST_DIR)
+    for name, filename in manifest.items():
+        sizes = [f"{ext or 'raw'} {os.path.getsize(os.path.join(dist, filename + ext))} B"
+                 for ext in ('', '.gz', '.br') if os.path.exists(os.path.join(dist, filename + ext))]
+        print(f"{name}: {filename} ({', '.join(sizes)})")
+
+@app.cli.command('run-task-worker')
+def run_task_worker_command():
+    """Run queued background tasks in the foreground until interrupted."""
+    task_runner.run_forever()
+
+@app.cli.command('run-pending-tasks')
+def run_pending_tasks_command():
+    """Run every due background task once in this process, then exit."""
+    stats = run_pending()
+    print(f"Succeeded {stats['succeeded']}, retrying {stats['retried']}, failed {stats['failed']}")
+
+@app.cli.command('recount-event-registrations')
+def recount_event_registrations_command():
+    """Recompute Event.registered_count from the registration rows."""
+    recount_registrations()
+    db.session.commit()
+    print("Event registration counts updated")
+
+@app.cli.command('check-registration-burst')
+@click.option('--users', default=300, help='Number of simultaneous registrations')
+@click.option('--capacity', default=50, help='Seats on the temporary event')
+@click.option('--workers', default=64, help='Concurrent request threads')
+def check_registration_burst_command(users, capacity, workers):
+    """Fire parallel registrations at one event on a scratch database and verify seats and waitlist."""
+    # The load-test module is only loaded by the commands that run it
+    import benchmarks
+    result = benchmarks.event_registration_burst(app, activity_log, users=users, capacity=capacity, workers=workers)
+    for key, value in result.items():
+        print(f"{key}: {value}")
+    if not result['ok']:
+        raise SystemExit(1)
+
+@app.cli.command('bench-user-deletion')
+@click.option('--posts', default=2000, help='Posts owned by the deleted user')
+@click.option('--likes', default=3000, help='Posts of other users the deleted user liked')
+@click.option('--applications', default=2000, help='Job applications by the deleted user')
+def bench_user_deletion_command(posts, likes, applications):
+    """Time deleting a user who owns thousands of rows on a scratch database and count the SQL it runs."""
+    import benchmarks
+    result = benchmarks.user_deletion_cost(app, posts=posts, likes=likes, applications=applications)
+    for key, value in result.items():
+        print(f"{key}: {value}")
+    if not result['ok']:
+        raise SystemExit(1)
+
+@app.cli.command('bench-alumni-import')
+@click.option('--rows', default=200, help='Alumni rows per import')
+@click.option('--workers', default='1,2,4', help='Comma-separated process pool sizes')
+def bench_alumni_import_command(rows, workers):
+    """Measure bulk alumni import throughput for several hashing pool sizes."""
+    pool_sizes = [int(w) for w in workers.split(',') if w.strip()]
+    import benchmarks
+    result = benchmarks.alumni_import_throughput(app, rows=rows, workers=pool_sizes)
+    for key, value in result.items():
+        print(f"{key}: {value}")
+
+@app.cli.command('bench-sqlite-pragmas')
+@click.option('--seconds', default=5.0, help='Duration of each run')
+@click.option('--readers', default=8, help='Concurrent reader threads')
+@click.option('--writers', default=4, help='Concurrent writer threads')
+@click.option('--rows', default=20000, help='Rows seeded before each run')
+def bench_sqlite_pragmas_command(seconds, readers, writers, rows):
+    """Compare mixed read/write throughput with SQLite's defaults and with SQLITE_PRAGMAS."""
+    import benchmarks
+    result = benchmarks.sqlite_mixed_throughput(app, seconds=seconds, readers=readers, writers=writers, rows=rows)
+    for label, stats in result.items():
+        print(f"{label}: " + ', '.join(f"{key}={value}" for key, value in stats.items()))
+    if not all(stats['ok'] for stats in result.values()):
+        raise SystemExit(1)
+
+@app.cli.command('bench-write-queue')
+@click.option('--users', default=200, help='Users liking, commenting and registering')
+@click.option('--capacity', default=100, help='Seats on the temporary event')
+@click.option('--workers', default=32, help='Concurrent request threads')
+def bench_write_queue_command(users, capacity, workers):
+    """Compare throughput and tail latency of hot writes with direct commits and the write queue."""
+    import benchmarks
+    result = benchmarks.write_queue_load(app, write_queue, users=users, capacity=capacity, workers=workers)
+    for label, stats in result.items():
+        print(f"{label}: " + ', '.join(f"{key}={value}" for key, value in stats.items()))
+    if not all(stats['ok'] for stats in result.values()):
+        raise SystemExit(1)
+
+@app.cli.command('bench-bulk-checkin')
+@click.option('--sizes', default='10,100,500,1000', help='Comma-separated batch sizes')
+def bench_bulk_checkin_command(sizes):
+    """Measure bulk check-in latency across growing batch sizes on a scratch database."""
+    import benchmarks
+    result = benchmarks.bulk_check_in_latency(app, sizes=[int(s) for s in sizes.split(',')])
+    for batch in result['batches']:
+        print(f"batch {batch['batch_size']}: {batch['ms']} ms "
+              f"(checked in {batch['checked_in']}, unmatched {batch['unmatched']}, HTTP {batch['status_code']})")
+    print(f"attended: {result['attended']}")
+    print(f"ok: {result['ok']}")
+    if not result['ok']:
+        raise SystemExit(1)
+
+def run_event_reminders():
+    """Enqueue due event reminders and drain the outbox once."""
+    windows = [timedelta(hours=h) for h in app.config['EVENT_REMINDER_WINDOWS_HOURS']]
+    requeued, failed = recover_interrupted(app.config['OUTBOX_STALE_SECONDS'])
+    if requeued or failed:
+        app.logger.warning(f"Recovered stale outbox claims: {requeued} requeued, {failed} marked failed")
+    with app.test_request_context(base_url=app.config['APP_BASE_URL']):
+        created = enqueue_event_reminders(
+            windows,
+            event_url=lambda event_id: url_for('event_detail', event_id=event_id, _external=True)
+        )
+        stats = drain_outbox(mail, batch_size=app.config['OUTBOX_BATCH_SIZE'])
+    return created, stats
+
+@app.cli.command('send-event-reminders')
+def send_event_reminders_command():
+    """Enqueue reminders for upcoming events and send pending outbox emails."""
+    created, stats = run_event_reminders()
+    print(f"Enqueued {created} reminders; sent {stats['sent']}, retrying {stats['retried']}, failed {stats['failed']}")
+
+@app.cli.command('run-reminder-scheduler')
+def run_reminder_scheduler_command():
+    """Run the reminder scheduler in the foreground until interrupted."""
+    interval = app.config['REMINDER_INTERVAL_SECONDS']
+    while True:
+        try:
+            created, stats = run_event_reminders()
+            app.logger.info(f"Reminders: enqueued {created}, sent {stats['sent']}, "
+                            f"retrying {stats['retried']}, failed {stats['failed']}")
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Reminder run failed: {str(e)}", exc_info=True)
+        time.sleep(interval)
+
 if __name__ == '__main__':
     with app.app_context():
         # Create tables if they don't exist
         db.create_all()
+        ensure_applicant_index()
+        ensure_user_name_index()
+        db.session.commit()
         
         # Add new columns to Job table if they don't exist
         with db.engine.connect() as conn:
@@ -0,0 +1,276 @@
+"""Fingerprinted, precompressed bundles of the site's CSS and JavaScript.
+
+``flask build-assets`` concatenates the files of each bundle in ``BUNDLES``,
+minifies them (with rcssmin/rjsmin when installed), writes the result to
+``static/dist/<name>.<content hash>.<ext>`` with ``.gz`` and ``.br``
+(Brotli, when installed) siblings, and records the names in
+``static/dist/manifest.json``. Fonts and images a CSS bundle references are
+copied next to it under fingerprinted names too, so every URL a page loads
+can be cached forever. ``send_asset`` serves them with an immutable
+Cache-Control and picks the precompressed file the browser accepts.
+
+Third-party files in ``VENDOR`` are downloaded into ``static/vendor`` by
+``flask build-assets --fetch-vendor`` (with the fonts their CSS points to),
+so pages stop depending on CDNs. ``asset_urls`` falls back to the source
+files, and to the CDN for vendor files not downloaded, until the bundles
+are built.
+
+Behind nginx, ``/assets/`` can be served from ``static/dist`` directly with
+``gzip_static``/``brotli_static`` and ``expires max``.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import urllib.request
+from urllib.parse import urljoin, urlparse
+
+from flask import abort, request, send_file, url_for
+from werkzeug.security import safe_join
+
+try:
+    import rcssmin
+    import rjsmin
+except ImportError:  # Bundles are only concatenated without the minifiers
+    rcssmin = rjsmin = None
+
+try:
+    import brotli
+except ImportError:  # Only .gz files are written without Brotli
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+HASH_LENGTH = 12
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# Formats that are already compressed, so only the plain file is written
+_PRECOMPRESSED = {'.woff', '.woff2', '.png', '.jpg', '.jpeg', '.gif', '.webp'}
+# Google Fonts picks the font format by User-Agent; this one gets woff2
+_FETCH_USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                     '(KHTML, like Gecko) Chrome/120.0 Safari/537.36')
+_CSS_URL_RE = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+# Path under static/: URL it is downloaded from (and loaded from until then)
+VENDOR = {
+    'vendor/bootstrap/bootstrap.min.css': 'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css',
+    'vendor/bootstrap/bootstrap.bundle.min.js': 'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js',
+    # Font Awesome 6 also understands the fas/far/fab class names of version 5
+    'vendor/fontawesome/css/all.min.css': 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css',
+    'vendor/roboto/roboto.css': 'https://fonts.googleapis.com/css2?family=Roboto:wght@400;700&display=swap',
+    'vendor/jquery/jquery.min.js': 'https://code.jquery.com/jquery-3.6.0.min.js',
+}
+
+# Bundle name: files under static/, in order
+BUNDLES = {
+    'base.css': [
+        'vendor/bootstrap/bootstrap.min.css',
+        'vendor/fontawesome/css/all.min.css',
+        'vendor/roboto/roboto.css',
+        'css/main.css',
+    ],
+    # Loaded after each page's own CSS, so it is a bundle of its own
+    'theme.css': ['css/theme.css'],
+    'base.js': ['vendor/bootstrap/bootstrap.bundle.min.js', 'js/main.js'],
+    'feed.css': ['css/feed.css'],
+    'feed.js': ['vendor/jquery/jquery.min.js', 'js/feed.js'],
+}
+
+_manifest_cache = {}  # manifest path -> (mtime_ns, manifest)
+
+
+def _fingerprint(name, data):
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def _download(url):
+    req = urllib.request.Request(url, headers={'User-Agent': _FETCH_USER_AGENT})
+    with urllib.request.urlopen(req, timeout=30) as response:
+        return response.read()
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def fetch_vendor(static_folder):
+    """Download every ``VENDOR`` file and the fonts its CSS references. Returns the number of files written."""
+    written = 0
+    for path, url in VENDOR.items():
+        data = _download(url)
+        if path.endswith('.css'):
+            css = data.decode('utf-8')
+            directory = os.path.dirname(path)
+            for ref in sorted({m.group(2) for m in _CSS_URL_RE.finditer(css)}):
+                if ref.startswith(('data:', '#')):
+                    continue
+                source = urljoin(url, ref)
+                if urlparse(ref).scheme:
+                    # Absolute URLs (Google Fonts) are stored next to the CSS
+                    local = os.path.basename(urlparse(source).path)
+                    css = css.replace(ref, local)
+                else:
+                    local = ref.split('?', 1)[0].split('#', 1)[0]
+                target = os.path.normpath(os.path.join(static_folder, directory, local))
+                _write(target, _download(source))
+                written += 1
+            data = css.encode('utf-8')
+        _write(os.path.join(static_folder, path), data)
+        written += 1
+        logger.info(f"Fetched {url} into {path}")
+    return written
+
+
+def _minify(name, text):
+    if name.endswith('.css'):
+        return rcssmin.cssmin(text) if rcssmin else text
+    return rjsmin.jsmin(text) if rjsmin else text
+
+
+def _compressed(data):
+    """(extension, bytes) of each precompressed variant smaller than ``data``."""
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+    return [(ext, body) for ext, body in variants if len(body) < len(data)]
+
+
+def _emit(dist, name, data):
+    """Write ``data`` fingerprinted, with its compressed variants. Returns the written filename."""
+    filename = _fingerprint(name, data)
+    path = os.path.join(dist, filename)
+    if not os.path.exists(path):
+        _write(path, data)
+        if os.path.splitext(name)[1].lower() not in _PRECOMPRESSED:
+            for ext, body in _compressed(data):
+                _write(path + ext, body)
+    return filename
+
+
+def _bundle_css(static_folder, dist, source, css, emitted):
+    """Point the relative ``url()``s of ``source`` at fingerprinted copies in ``dist``."""
+    def rewrite(match):
+        ref = match.group(2)
+        if ref.startswith(('data:', '#')) or urlparse(ref).scheme or ref.startswith('/'):
+            return match.group(0)
+        clean = ref.split('?', 1)[0].split('#', 1)[0]
+        target = os.path.normpath(os.path.join(static_folder, os.path.dirname(source), clean))
+        if not os.path.isfile(target):
+            logger.warning(f"{source} references missing file {ref}")
+            return match.group(0)
+        if target not in emitted:
+            with open(target, 'rb') as f:
+                emitted[target] = _emit(dist, os.path.basename(target), f.read())
+        return f'url({emitted[target]})'
+
+    return _CSS_URL_RE.sub(rewrite, css)
+
+
+def build(static_folder):
+    """Build every bundle into ``static/dist`` and write the manifest. Returns the manifest.
+
+    Raises FileNotFoundError when a source file (or a vendor file that was
+    not fetched) is missing. Files of the previous build are kept, since
+    pages rendered from the old manifest may still request them; older ones
+    are removed.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    os.makedirs(dist, exist_ok=True)
+    manifest = {}
+    emitted = {}
+    for name, sources in BUNDLES.items():
+        parts = []
+        for source in sources:
+            with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+                text = f.read()
+            if name.endswith('.css'):
+                text = _bundle_css(static_folder, dist, source, text, emitted)
+            parts.append(_minify(name, text))
+        # The newline keeps a file ending in a // comment from swallowing the next one
+        manifest[name] = _emit(dist, name, '\n'.join(parts).encode('utf-8'))
+
+    manifest_path = os.path.join(dist, MANIFEST)
+    previous = _read_manifest(manifest_path)
+    files = set(manifest.values()) | set(emitted.values())
+    # An unchanged rebuild keeps what the last real change kept
+    if files == set(previous.get('files', [])):
+        retained = set(previous.get('previous', []))
+    else:
+        retained = set(previous.get('files', []))
+    keep = files | retained
+    _write(manifest_path, json.dumps({
+        'bundles': manifest,
+        'files': sorted(files),
+        'previous': sorted(retained - files),
+    }, indent=2).encode('utf-8'))
+    for entry in os.scandir(dist):
+        base = re.sub(r'\.(gz|br)$', '', entry.name)
+        if entry.is_file() and entry.name != MANIFEST and base not in keep:
+            os.remove(entry.path)
+    return manifest
+
+
+def _read_manifest(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_manifest(static_folder):
+    """Bundle name -> built filename, re-read when the manifest changes; empty before the first build."""
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    cached = _manifest_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, _read_manifest(path).get('bundles', {}))
+        _manifest_cache[path] = cached
+    return cached[1]
+
+
+def asset_urls(static_folder, bundle):
+    """URLs a page loads for ``bundle``: the built file, or its sources until it is built."""
+    built = load_manifest(static_folder).get(bundle)
+    if built:
+        return [url_for('asset', filename=built)]
+    urls = []
+    for source in BUNDLES[bundle]:
+        if source in VENDOR and not os.path.exists(os.path.join(static_folder, source)):
+            urls.append(VENDOR[source])
+        else:
+            urls.append(url_for('static', filename=source))
+    return urls
+
+
+def send_asset(static_folder, filename):
+    """Response for a built file, precompressed when the browser accepts it."""
+    path = safe_join(os.path.join(static_folder, DIST_DIR), filename)
+    if path is None or filename == MANIFEST or not os.path.isfile(path):
+        abort(404)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding = None
+    for candidate, ext in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[candidate] and os.path.isfile(path + ext):
+            encoding, path = candidate, path + ext
+            break
+
+    response = send_file(path, mimetype=mimetype, conditional=True, max_age=IMMUTABLE_MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,593 @@
+"""Load and consistency checks run against a live app instance.
+
+These are exposed as ``flask`` CLI commands in app.py. Each check creates its
+own throwaway rows, drives the real routes through the Flask test client from
+many threads and returns a result dict. Checks that run inside
+``scratch_database`` do all of that against a temporary SQLite file; the
+others remove what they created from the app's database before returning.
+"""
+import os
+import time
+import uuid
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, UTC
+
+from sqlalchemy import create_engine, insert, delete, func, event as sa_event
+
+from models import db, User, Post, Comment, Job, JobApplication, post_likes, Event, EventRegistration
+from search_index import ensure_applicant_index, ensure_user_name_index
+from sqlite_tuning import configure_engine
+
+# Never a valid werkzeug hash, so the throwaway accounts cannot log in
+UNUSABLE_PASSWORD = '!'
+
+
+@contextmanager
+def scratch_database(app, activity_log=None):
+    """Point ``app`` at a fresh SQLite file for the duration of the block.
+
+    The routes' side effects (stat rollups, activity log entries, outbox
+    rows, tasks) land in the scratch file, which is deleted afterwards, so
+    a check cannot leave anything behind in the real database. Pass the
+    app's ``activity_log`` writer when the routes log activity: it is
+    flushed before the real engine is put back.
+    """
+    directory = tempfile.mkdtemp(prefix='bench-db-')
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+    configure_engine(engine, app.config['SQLITE_PRAGMAS'])
+    with app.app_context():
+        # Flask-SQLAlchemy has no public way to swap an app's engine
+        engines = db._app_engines[app]
+        live_engine = engines[None]
+    try:
+        with engine.begin() as conn:
+            db.metadata.create_all(conn)
+            ensure_applicant_index(conn)
+            ensure_user_name_index(conn)
+        engines[None] = engine
+        try:
+            yield engine
+        finally:
+            if activity_log is not None:
+                activity_log.flush()
+            engines[None] = live_engine
+    finally:
+        engine.dispose()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def create_throwaway_users(count, role='user', prefix='bench'):
+    """Bulk insert ``count`` users and return their ids."""
+    tag = uuid.uuid4().hex[:8]
+    rows = [{
+        'name': f'{prefix} {tag} {i}',
+        'email': f'{prefix}-{tag}-{i}@bench.invalid',
+        'password': UNUSABLE_PASSWORD,
+        'role': role,
+        'created_at': datetime.utcnow(),
+    } for i in range(count)]
+    db.session.execute(insert(User), rows)
+    db.session.commit()
+    return [uid for (uid,) in db.session.query(User.id).filter(User.email.like(f'{prefix}-{tag}-%'))]
+
+
+def delete_throwaway_users(user_ids):
+    db.session.execute(delete(User).where(User.id.in_(user_ids)))
+    db.session.commit()
+
+
+def logged_in_client(app, user_id):
+    """Test client with a Flask-Login session, skipping the password check."""
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+    return client
+
+
+def event_registration_burst(app, activity_log=None, users=300, capacity=50, workers=64):
+    """Fire ``users`` simultaneous registrations at one event with ``capacity`` seats.
+
+    Checks that exactly ``capacity`` users got a seat, everyone else landed on
+    the waitlist, and Event.registered_count agrees with the registration rows.
+    Runs on a scratch database.
+    """
+    with scratch_database(app, activity_log):
+        with app.app_context():
+            user_ids = create_throwaway_users(users + 1)
+            creator_id = user_ids.pop()
+            event = Event(
+                title='Registration burst check',
+                description='Temporary event created by event_registration_burst',
+                start_time=datetime.now(UTC) + timedelta(days=7),
+                location='Benchmark',
+                capacity=capacity,
+                creator_id=creator_id,
+                is_published=True,
+            )
+            db.session.add(event)
+            db.session.commit()
+            event_id = event.id
+
+        clients = [logged_in_client(app, uid) for uid in user_ids]
+        start = threading.Barrier(min(workers, len(clients)))
+        latencies = []
+        statuses = []
+        lock = threading.Lock()
+
+        def register(client):
+            try:
+                start.wait(timeout=5)
+            except threading.BrokenBarrierError:
+                pass
+            t0 = time.perf_counter()
+            response = client.post(f'/event/{event_id}/register')
+            elapsed = time.perf_counter() - t0
+            with lock:
+                latencies.append(elapsed)
+                statuses.append(response.status_code)
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(register, clients))
+        wall = time.perf_counter() - t0
+
+        with app.app_context():
+            counts = dict(db.session.query(EventRegistration.status, func.count(EventRegistration.id))
+                          .filter_by(event_id=event_id).group_by(EventRegistration.status).all())
+            registered_count = db.session.get(Event, event_id).registered_count
+
+    latencies.sort()
+    expected_seats = min(capacity, users)
+    result = {
+        'requests': users,
+        'capacity': capacity,
+        'registered': counts.get('registered', 0),
+        'waitlisted': counts.get('waitlisted', 0),
+        'registered_count': registered_count,
+        'errors': sum(1 for code in statuses if code >= 500),
+        'wall_seconds': round(wall, 3),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1) if latencies else 0,
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1) if latencies else 0,
+    }
+    result['ok'] = (
+        result['errors'] == 0
+        and result['registered'] == expected_seats
+        and result['registered_count'] == expected_seats
+        and result['waitlisted'] == users - expected_seats
+    )
+    return result
+
+
+def bulk_check_in_latency(app, sizes=(10, 100, 500, 1000)):
+    """Time one bulk check-in request per batch size against a single event.
+
+    Half of each batch is sent as registration ids and half as emails, so both
+    lookup paths are exercised. Latency should stay close to flat as the
+    batch grows because the lookup and the update are chunked set operations.
+    Runs on a scratch database.
+    """
+    total = sum(sizes)
+    with scratch_database(app):
+        with app.app_context():
+            user_ids = create_throwaway_users(total + 1, prefix='checkin')
+            creator_id = user_ids.pop()
+            db.session.query(User).filter_by(id=creator_id).update({'role': 'alumni'})
+            event = Event(
+                title='Bulk check-in latency',
+                description='Temporary event created by bulk_check_in_latency',
+                start_time=datetime.now(UTC) + timedelta(days=1),
+                location='Benchmark',
+                capacity=None,
+                creator_id=creator_id,
+                is_published=True,
+            )
+            db.session.add(event)
+            db.session.commit()
+            event_id = event.id
+            db.session.execute(insert(EventRegistration), [
+                {'event_id': event_id, 'user_id': uid, 'status': 'registered', 'created_at': datetime.utcnow()}
+                for uid in user_ids
+            ])
+            db.session.query(Event).filter_by(id=event_id).update({'registered_count': total})
+            db.session.commit()
+            rows = db.session.query(EventRegistration.id, User.email) \
+                .join(User, User.id == EventRegistration.user_id) \
+                .filter(EventRegistration.event_id == event_id) \
+                .order_by(EventRegistration.id).all()
+
+        client = logged_in_client(app, creator_id)
+        results = []
+        offset = 0
+        for size in sizes:
+            batch = rows[offset:offset + size]
+            offset += size
+            half = size // 2
+            payload = {
+                'registration_ids': [registration_id for registration_id, _ in batch[:half]],
+                'emails': [email for _, email in batch[half:]],
+            }
+            t0 = time.perf_counter()
+            response = client.post(f'/alumni/event/{event_id}/checkin', json=payload)
+            elapsed = time.perf_counter() - t0
+            data = response.get_json() or {}
+            results.append({
+                'batch_size': size,
+                'status_code': response.status_code,
+                'checked_in': data.get('checked_in', 0),
+                'unmatched': len(data.get('unmatched', [])),
+                'ms': round(elapsed * 1000, 1),
+            })
+
+        with app.app_context():
+            attended = db.session.query(func.count(EventRegistration.id)) \
+                .filter_by(event_id=event_id, status='attended').scalar()
+
+    return {
+        'batches': results,
+        'attended': attended,
+        'ok': attended == total and all(r['checked_in'] == r['batch_size'] for r in results),
+    }
+
+
+def user_deletion_cost(app, posts=2000, likes=3000, applications=2000, others=20):
+    """Delete one user who owns thousands of rows through the admin route.
+
+    The victim has ``posts`` posts (liked and commented on by ``others``
+    users), likes ``likes`` posts of other users, has applied ``applications``
+    times and posted jobs that others applied to. Reports the time and the
+    number of SQL statements the delete request ran, and checks that nothing
+    owned by the user survived. Runs on a scratch database.
+    """
+    with scratch_database(app):
+        with app.app_context():
+            admin_id, victim_id, *other_ids = create_throwaway_users(others + 2, prefix='deletion')
+            db.session.query(User).filter(User.id.in_([admin_id])).update({'role': 'admin'})
+            db.session.query(User).filter(User.id == victim_id).update({'role': 'alumni'})
+            now = datetime.utcnow()
+
+            db.session.execute(insert(Post), [{'content': f'victim post {i}', 'user_id': victim_id, 'created_at': now}
+                                              for i in range(posts)])
+            db.session.execute(insert(Post), [{'content': f'other post {i}', 'user_id': other_ids[i % others],
+                                               'created_at': now} for i in range(likes)])
+            victim_posts = [pid for (pid,) in db.session.query(Post.id).filter_by(user_id=victim_id)]
+            other_posts = [pid for (pid,) in db.session.query(Post.id).filter(Post.user_id.in_(other_ids))]
+
+            db.session.execute(insert(post_likes), [{'user_id': victim_id, 'post_id': pid} for pid in other_posts])
+            db.session.execute(insert(post_likes), [{'user_id': uid, 'post_id': pid}
+                                                    for uid in other_ids for pid in victim_posts[:posts // 10]])
+            db.session.execute(insert(Comment), [{'content': 'comment', 'user_id': other_ids[i % others],
+                                                  'post_id': pid, 'created_at': now}
+                                                 for i, pid in enumerate(victim_posts)])
+
+            job_rows = [{'title': f'job {i}', 'description': 'd', 'location': 'Benchmark', 'company_name': 'Bench',
+                         'alumni_id': uid, 'is_confirmed': True}
+                        for i, uid in enumerate([victim_id] * 10 + other_ids)]
+            db.session.execute(insert(Job), job_rows)
+            victim_jobs = [jid for (jid,) in db.session.query(Job.id).filter_by(alumni_id=victim_id)]
+            other_jobs = [jid for (jid,) in db.session.query(Job.id).filter(Job.alumni_id.in_(other_ids))]
+            db.session.execute(insert(JobApplication), [{'user_id': victim_id, 'job_id': other_jobs[i % len(other_jobs)],
+                                                         'status': 'pending', 'created_at': now}
+                                                        for i in range(applications)])
+            db.session.execute(insert(JobApplication), [{'user_id': uid, 'job_id': jid, 'status': 'pending',
+                                                         'created_at': now}
+                                                        for uid in other_ids for jid in victim_jobs])
+            db.session.commit()
+            owned_rows = (
+                db.session.query(func.count(Post.id)).filter_by(user_id=victim_id).scalar()
+                + db.session.query(func.count()).select_from(post_likes).filter(post_likes.c.user_id == victim_id).scalar()
+                + db.session.query(func.count(JobApplication.id)).filter_by(user_id=victim_id).scalar()
+            )
+
+        statements = []
+
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        client = logged_in_client(app, admin_id)
+        with app.app_context():
+            engine = db.engine
+        sa_event.listen(engine, 'before_cursor_execute', count_statement)
+        t0 = time.perf_counter()
+        try:
+            response = client.post(f'/admin/delete_user/{victim_id}')
+        finally:
+            elapsed = time.perf_counter() - t0
+            sa_event.remove(engine, 'before_cursor_execute', count_statement)
+
+        with app.app_context():
+            leftovers = (
+                db.session.query(func.count(User.id)).filter_by(id=victim_id).scalar()
+                + db.session.query(func.count(Post.id)).filter_by(user_id=victim_id).scalar()
+                + db.session.query(func.count()).select_from(post_likes).filter(
+                    (post_likes.c.user_id == victim_id) | post_likes.c.post_id.in_(victim_posts)).scalar()
+                + db.session.query(func.count(Comment.id)).filter(Comment.post_id.in_(victim_posts)).scalar()
+                + db.session.query(func.count(JobApplication.id)).filter(
+                    (JobApplication.user_id == victim_id) | JobApplication.job_id.in_(victim_jobs)).scalar()
+                + db.session.query(func.count(Job.id)).filter_by(alumni_id=victim_id).scalar()
+            )
+
+    return {
+        'owned_rows': owned_rows,
+        'status_code': response.status_code,
+        'statements': len(statements),
+        'ms': round(elapsed * 1000, 1),
+        'leftover_rows': leftovers,
+        'ok': response.status_code == 302 and leftovers == 0,
+    }
+
+
+def alumni_import_throughput(app, rows=200, workers=(1, 2, 4), sample=20):
+    """Import ``rows`` generated alumni with each process pool size and report rows per second.
+
+    The baseline is ``sample`` accounts created the way /register does it:
+    one duplicate-email query, one password hash and one commit per person.
+    Imported accounts are deleted again after each run.
+    """
+    import csv
+    import io
+    from werkzeug.security import generate_password_hash
+    from alumni_import import import_alumni
+    from analytics import record_stat, NEW_USERS
+    from models import Profile
+
+    def cleanup(tag):
+        user_ids = [uid for (uid,) in db.session.query(User.id).filter(User.email.like(f'import-{tag}-%'))]
+        db.session.execute(delete(Profile).where(Profile.user_id.in_(user_ids)))
+        record_stat(NEW_USERS, 'alumni', delta=-len(user_ids))
+        delete_throwaway_users(user_ids)
+
+    results = {}
+    with app.app_context():
+        tag = uuid.uuid4().hex[:8]
+        t0 = time.perf_counter()
+        for i in range(sample):
+            email = f'import-{tag}-{i}@bench.invalid'
+            db.session.query(User.id).filter_by(email=email).first()
+            db.session.add(User(name=f'Baseline {i}', email=email, role='alumni',
+                                password=generate_password_hash(f'pw-{tag}-{i}')))
+            record_stat(NEW_USERS, 'alumni')
+            db.session.commit()
+        results['baseline_rows_per_second'] = round(sample / (time.perf_counter() - t0), 1)
+        cleanup(tag)
+
+        for pool_size in workers:
+            tag = uuid.uuid4().hex[:8]
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(['email', 'name', 'password', 'graduation_year', 'company'])
+            for i in range(rows):
+                writer.writerow([f'import-{tag}-{i}@bench.invalid', f'Cựu sinh viên {i}', f'pw-{tag}-{i}',
+                                 2000 + i % 25, 'Bench'])
+            buffer.seek(0)
+
+            t0 = time.perf_counter()
+            progress = import_alumni(buffer, workers=pool_size)
+            elapsed = time.perf_counter() - t0
+            results[f'workers_{pool_size}'] = {
+                'created': progress.created,
+                'seconds': round(elapsed, 2),
+                'rows_per_second': round(rows / elapsed, 1),
+            }
+            cleanup(tag)
+    return results
+
+
+def sqlite_mixed_throughput(app, seconds=5.0, readers=8, writers=4, rows=20000):
+    """Run concurrent readers and writers against a scratch SQLite file, before and after tuning.
+
+    "default" opens connections the way the app did before
+    ``SQLITE_PRAGMAS`` (rollback journal, SQLite's defaults), "tuned" applies
+    the configured PRAGMAs. Each run gets a fresh database seeded with
+    ``rows`` rows; readers page through recent rows and count them, writers
+    update a counter and insert a row per transaction. Reports operations
+    per second, latency percentiles and "database is locked" errors. The
+    app's own database is not touched.
+    """
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+
+    def percentile(values, fraction):
+        return round(values[min(len(values) - 1, int(len(values) * fraction))] * 1000, 2) if values else 0
+
+    def run(pragmas):
+        directory = tempfile.mkdtemp(prefix='bench-sqlite-')
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}",
+                               pool_size=readers + writers)
+        configure_engine(engine, pragmas)
+        try:
+            with engine.begin() as conn:
+                conn.execute(text('CREATE TABLE item (id INTEGER PRIMARY KEY, author INTEGER, body TEXT, '
+                                  'created_at REAL)'))
+                conn.execute(text('CREATE INDEX ix_item_created_at ON item (created_at)'))
+                conn.execute(text('CREATE TABLE counter (id INTEGER PRIMARY KEY, value INTEGER)'))
+                conn.execute(text('INSERT INTO counter (id, value) VALUES (1, 0)'))
+                conn.execute(text('INSERT INTO item (author, body, created_at) VALUES (:a, :b, :c)'),
+                             [{'a': i % 500, 'b': f'Bench row {i} ' * 8, 'c': i} for i in range(rows)])
+
+            stats = {'read': [], 'write': [], 'locked': 0}
+            lock = threading.Lock()
+            start = threading.Barrier(readers + writers)
+            deadline = None
+
+            def reader():
+                start.wait()
+                while time.perf_counter() < deadline:
+                    t0 = time.perf_counter()
+                    try:
+                        with engine.connect() as conn:
+                            conn.execute(text('SELECT id, author, body FROM item '
+                                              'ORDER BY created_at DESC LIMIT 20')).all()
+                            conn.execute(text('SELECT count(*) FROM item WHERE author = :a'),
+                                         {'a': int(t0 * 1000) % 500}).scalar()
+                    except OperationalError:
+                        with lock:
+                            stats['locked'] += 1
+                        continue
+                    with lock:
+                        stats['read'].append(time.perf_counter() - t0)
+
+            def writer(n):
+                start.wait()
+                i = 0
+                while time.perf_counter() < deadline:
+                    t0 = time.perf_counter()
+                    try:
+                        with engine.begin() as conn:
+                            conn.execute(text('UPDATE counter SET value = value + 1 WHERE id = 1'))
+                            conn.execute(text('INSERT INTO item (author, body, created_at) VALUES (:a, :b, :c)'),
+                                         {'a': n, 'b': f'Writer {n} row {i}', 'c': rows + t0})
+                    except OperationalError:
+                        with lock:
+                            stats['locked'] += 1
+                        continue
+                    i += 1
+                    with lock:
+                        stats['write'].append(time.perf_counter() - t0)
+
+            threads = [threading.Thread(target=reader) for _ in range(readers)]
+            threads += [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+            t0 = time.perf_counter()
+            deadline = t0 + seconds
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            wall = time.perf_counter() - t0
+
+            with engine.connect() as conn:
+                journal_mode = conn.execute(text('PRAGMA journal_mode')).scalar()
+                committed = conn.execute(text('SELECT value FROM counter WHERE id = 1')).scalar()
+        finally:
+            engine.dispose()
+            shutil.rmtree(directory, ignore_errors=True)
+
+        reads, writes = sorted(stats['read']), sorted(stats['write'])
+        return {
+            'journal_mode': journal_mode,
+            'reads_per_second': round(len(reads) / wall, 1),
+            'writes_per_second': round(len(writes) / wall, 1),
+            'read_p50_ms': percentile(reads, 0.5),
+            'read_p99_ms': percentile(reads, 0.99),
+            'write_p50_ms': percentile(writes, 0.5),
+            'write_p99_ms': percentile(writes, 0.99),
+            'locked_errors': stats['locked'],
+            'ok': committed == len(writes),
+        }
+
+    return {
+        'default': run({}),
+        'tuned': run(app.config['SQLITE_PRAGMAS']),
+    }
+
+
+def write_queue_load(app, write_queue, users=200, capacity=100, workers=32):
+    """Drive likes, comments and event registrations from ``workers`` threads, with and without ``write_queue``.
+
+    Each of ``users`` throwaway users likes one post, comments on it and
+    registers for an event with ``capacity`` seats, in random order across
+    users. The load runs once with direct commits and once through the
+    writer thread, on fresh rows each time. Reports requests per second,
+    latency percentiles, errors and batch sizes, and checks the resulting
+    rows. The queue's ``enabled`` flag is restored afterwards.
+    """
+    import random
+    from analytics import record_stat, EVENT_REGISTRATIONS
+
+    def run(enabled):
+        with app.app_context():
+            user_ids = create_throwaway_users(users + 1)
+            owner_id = user_ids.pop()
+            post = Post(content='Write queue load check', user_id=owner_id)
+            event = Event(
+                title='Write queue load check',
+                description='Temporary event created by write_queue_load',
+                start_time=datetime.now(UTC) + timedelta(days=7),
+                location='Benchmark',
+                capacity=capacity,
+                creator_id=owner_id,
+                is_published=True,
+            )
+            db.session.add_all([post, event])
+            db.session.commit()
+            post_id, event_id = post.id, event.id
+
+        clients = {uid: logged_in_client(app, uid) for uid in user_ids}
+        calls = [(uid, action) for uid in user_ids for action in ('like', 'comment', 'register')]
+        random.shuffle(calls)
+        latencies = []
+        statuses = []
+        lock = threading.Lock()
+
+        def call(item):
+            uid, action = item
+            client = clients[uid]
+            t0 = time.perf_counter()
+            if action == 'like':
+                response = client.post(f'/social/posts/{post_id}/toggle_like')
+            elif action == 'comment':
+                response = client.post(f'/social/posts/{post_id}/comments', json={'content': f'Bench {uid}'})
+            else:
+                response = client.post(f'/event/{event_id}/register')
+            elapsed = time.perf_counter() - t0
+            with lock:
+                latencies.append(elapsed)
+                statuses.append(response.status_code)
+
+        write_queue.enabled = enabled
+        batches, jobs = write_queue.batches, write_queue.jobs
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(call, calls))
+        wall = time.perf_counter() - t0
+        batches, jobs = write_queue.batches - batches, write_queue.jobs - jobs
+
+        with app.app_context():
+            # Only the throwaway users' rows: rows of a deleted post can linger under a reused id
+            likes = db.session.query(func.count()).select_from(post_likes) \
+                .filter(post_likes.c.post_id == post_id, post_likes.c.user_id.in_(user_ids)).scalar()
+            comments = db.session.query(func.count(Comment.id)) \
+                .filter(Comment.post_id == post_id, Comment.user_id.in_(user_ids)).scalar()
+            counts = dict(db.session.query(EventRegistration.status, func.count(EventRegistration.id))
+                          .filter_by(event_id=event_id).group_by(EventRegistration.status).all())
+            registered_count = db.session.get(Event, event_id).registered_count
+
+            db.session.execute(post_likes.delete().where(post_likes.c.post_id == post_id))
+            db.session.execute(delete(Comment).where(Comment.post_id == post_id))
+            db.session.execute(delete(Post).where(Post.id == post_id))
+            db.session.execute(delete(EventRegistration).where(EventRegistration.event_id == event_id))
+            db.session.execute(delete(Event).where(Event.id == event_id))
+            record_stat(EVENT_REGISTRATIONS, delta=-sum(counts.values()))
+            db.session.commit()
+            delete_throwaway_users(user_ids + [owner_id])
+
+        latencies.sort()
+        result = {
+            'requests': len(calls),
+            'requests_per_second': round(len(calls) / wall, 1),
+            'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1),
+            'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+            'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+            'max_ms': round(latencies[-1] * 1000, 1),
+            'errors': sum(1 for code in statuses if code >= 500),
+            'batches': batches,
+            'mean_batch': round(jobs / batches, 1) if batches else 0,
+        }
+        result['ok'] = (
+            result['errors'] == 0
+            and likes == users
+            and comments == users
+            and counts.get('registered', 0) == min(capacity, users) == registered_count
+            and counts.get('waitlisted', 0) == max(users - capacity, 0)
+        )
+        return result
+
+    was_enabled = write_queue.enabled
+    try:
+        return {'direct': run(False), 'write_queue': run(True)}
+    finally:
+        write_queue.enabled = was_enabled
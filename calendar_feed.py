@@ -0,0 +1,144 @@
+"""Per-user iCalendar (RFC 5545) feed of registered events.
+
+Calendar clients poll the feed without a browser session, so the URL carries a
+token instead: the user id and a random per-user secret stored in
+``User.calendar_feed_secret``. Resetting the secret revokes every URL handed
+out before. Each poll first runs one aggregate query to compute the
+ETag and Last-Modified validators; the calendar body is only rebuilt when they
+changed.
+"""
+import hashlib
+import hmac
+import secrets
+from datetime import datetime, timedelta, UTC
+
+from sqlalchemy import func, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models import db, User, Event, EventRegistration
+
+FEED_SECRET_BYTES = 24
+PRODID = '-//FIT Alumni//Events//VI'
+# Events without an end time are shown with this duration
+DEFAULT_DURATION = timedelta(hours=2)
+
+
+def reset_feed_secret(user):
+    """Give ``user`` a new feed secret, invalidating older feed URLs. Does not commit; returns it."""
+    secret = secrets.token_urlsafe(FEED_SECRET_BYTES)
+    # Not a profile change, so updated_at (and incremental exports) stay as they are
+    db.session.execute(
+        update(User).where(User.id == user.id)
+        .values(calendar_feed_secret=secret, updated_at=User.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    set_committed_value(user, 'calendar_feed_secret', secret)
+    return secret
+
+
+def feed_token(user):
+    """Token for ``user``'s feed URL. Creates the feed secret on first use; the caller commits."""
+    secret = user.calendar_feed_secret or reset_feed_secret(user)
+    return f'{user.id}-{secret}'
+
+
+def user_id_from_token(token):
+    """Return the user id of a current feed token, or None."""
+    user_id, _, secret = (token or '').partition('-')
+    if not user_id.isdigit() or not secret:
+        return None
+    stored = db.session.query(User.calendar_feed_secret).filter(User.id == int(user_id)).scalar()
+    if not stored or not hmac.compare_digest(stored, secret):
+        return None
+    return int(user_id)
+
+
+def feed_validators(user_id):
+    """Return ``(etag, last_modified)`` for a user's feed with a single aggregate query."""
+    count, max_registration_id, registration_changed, event_changed = db.session.query(
+        func.count(EventRegistration.id),
+        func.max(EventRegistration.id),
+        func.max(EventRegistration.updated_at),
+        func.max(Event.updated_at),
+    ).join(Event, Event.id == EventRegistration.event_id) \
+     .filter(EventRegistration.user_id == user_id).one()
+
+    stamps = [s for s in (registration_changed, event_changed) if s is not None]
+    last_modified = max(stamps).replace(tzinfo=UTC, microsecond=0) if stamps else None
+    fingerprint = f'{user_id}:{count}:{max_registration_id}:{registration_changed}:{event_changed}'
+    etag = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
+    return etag, last_modified
+
+
+def feed_rows(user_id):
+    """Registrations that belong in the feed, joined with their events."""
+    return db.session.query(EventRegistration, Event) \
+        .join(Event, Event.id == EventRegistration.event_id) \
+        .filter(EventRegistration.user_id == user_id,
+                EventRegistration.status != 'canceled') \
+        .order_by(Event.start_time.asc(), Event.id.asc()) \
+        .all()
+
+
+def _escape(value):
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,') \
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def _fold(line):
+    """Fold a content line at 75 octets without splitting UTF-8 sequences."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74  # continuation lines start with a space
+    return '\r\n '.join(parts)
+
+
+def _utc(dt):
+    # SQLite returns naive datetimes; event times are stored in UTC
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC)
+    return dt.astimezone(UTC).strftime('%Y%m%dT%H%M%SZ')
+
+
+def build_calendar(rows, event_url, calendar_name='Sự kiện FIT Alumni'):
+    """Render ``(registration, event)`` rows as an iCalendar document.
+
+    ``event_url`` maps an event id to an absolute URL.
+    """
+    now = _utc(datetime.now(UTC))
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(calendar_name)}',
+    ]
+    for registration, event in rows:
+        end_time = event.end_time or (event.start_time + DEFAULT_DURATION)
+        lines += [
+            'BEGIN:VEVENT',
+            f'UID:event-{event.id}-registration-{registration.id}@fit-alumni',
+            f'DTSTAMP:{now}',
+            f'DTSTART:{_utc(event.start_time)}',
+            f'DTEND:{_utc(end_time)}',
+            f'SUMMARY:{_escape(event.title)}',
+            f'LOCATION:{_escape(event.location)}',
+            f'DESCRIPTION:{_escape(event.description)}',
+            f'URL:{event_url(event.id)}',
+            'STATUS:TENTATIVE' if registration.status == 'waitlisted' else 'STATUS:CONFIRMED',
+        ]
+        if event.updated_at:
+            lines.append(f'LAST-MODIFIED:{_utc(event.updated_at)}')
+        lines.append('END:VEVENT')
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
@@ -0,0 +1,316 @@
+"""Local cache of images posts link from other sites.
+
+Feed viewers used to load every external ``Post.image_url`` straight from
+its host. ``image_url`` now points them at ``/images/external?url=...``,
+served by ``external_image_response``. The first request for a URL, or the
+post that links it, queues a ``fetch_external_image`` task. The task
+downloads the image once, with a timeout, an overall deadline and the
+``remote_image`` size cap. It saves the image into the media store's
+``posts`` folder, where its WebP variants are generated like an uploaded
+image's. Until the copy is ready, or when the fetch failed, the endpoint
+redirects to the original URL.
+
+The endpoint only fetches URLs some post links, so it is not an open proxy.
+Once no post links a URL any more, ``release_unlinked`` (run by the upload
+GC) drops its row and the copy's media store reference.
+Hosts that resolve to private, loopback or link-local addresses are refused
+(also after redirects) unless ``EXTERNAL_IMAGE_ALLOW_PRIVATE_HOSTS`` is set,
+which tests do for a local stand-in server. The connection resolves each host
+once. It checks the addresses it got and connects to one of them, so a DNS
+answer that changes between the check and the connect cannot point it
+elsewhere. TLS still verifies the certificate against the hostname. Every
+socket read and write times out at the download's deadline, so a server
+trickling bytes cannot hold the task past it.
+"""
+import functools
+import hashlib
+import http.client
+import io
+import ipaddress
+import logging
+import os
+import socket
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+from urllib.parse import urlparse
+
+from flask import abort, current_app, redirect
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from werkzeug.datastructures import FileStorage
+
+from models import db, Post, ExternalImage
+from images import SIZES, available as variants_available, image_url_path
+from media_store import store_upload, release as release_media
+from tasks import task, enqueue
+from upload_serving import send_upload, IMMUTABLE_MAX_AGE
+from uploads import UploadRejected
+
+logger = logging.getLogger(__name__)
+
+FETCH_ATTEMPTS = 3
+MAX_URL_LENGTH = 2048
+CONTENT_TYPES = {'image/png': 'png', 'image/jpeg': 'jpg', 'image/gif': 'gif', 'image/webp': 'webp'}
+_USER_AGENT = 'FIT-Alumni image cache'
+
+
+class BlockedURL(ValueError):
+    """The URL is not one the proxy fetches."""
+
+
+def is_external(url):
+    return bool(url) and url.startswith(('http://', 'https://')) and len(url) <= MAX_URL_LENGTH
+
+
+def url_hash(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def _check_url(url):
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise BlockedURL(f'Unsupported URL {url}')
+
+
+def _vetted_addresses(host, port, allow_private):
+    """Addresses ``host`` resolves to, once. Raises BlockedURL if any of them is not public."""
+    addresses = list(dict.fromkeys(
+        sockaddr[:2] for *_, sockaddr in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)))
+    if not allow_private:
+        for address, _ in addresses:
+            if not ipaddress.ip_address(address).is_global:
+                raise BlockedURL(f'{host} resolves to a non-public address')
+    return addresses
+
+
+def _remaining(deadline, timeout):
+    """Socket timeout for the next operation: ``timeout``, cut short by the deadline."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError('Image download took too long')
+    return min(timeout, remaining) if isinstance(timeout, (int, float)) else remaining
+
+
+class _DeadlineRaw(io.RawIOBase):
+    def __init__(self, owner, raw):
+        self._owner = owner
+        self._raw = raw
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        self._owner.arm()
+        return self._raw.readinto(buffer)
+
+    def close(self):
+        self._raw.close()
+        super().close()
+
+
+class _DeadlineSocket:
+    """Socket whose every send and receive times out at the download's deadline."""
+
+    def __init__(self, sock, deadline, timeout):
+        self._sock = sock
+        self._deadline = deadline
+        self._timeout = timeout
+
+    def arm(self):
+        self._sock.settimeout(_remaining(self._deadline, self._timeout))
+
+    def sendall(self, data, *args):
+        self.arm()
+        return self._sock.sendall(data, *args)
+
+    def makefile(self, mode='rb', *args, **kwargs):
+        # The socket's own file keeps it open after the connection lets go of it
+        return io.BufferedReader(_DeadlineRaw(self, self._sock.makefile(mode, buffering=0)))
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+
+class _VettedConnectionMixin:
+    """Connects only to addresses vetted by ``_vetted_addresses``, with every operation under the deadline."""
+
+    def __init__(self, host, *, allow_private, deadline, **kwargs):
+        super().__init__(host, **kwargs)
+        self._allow_private = allow_private
+        self._deadline = deadline
+        # http.client's hook for opening the TCP connection; TLS is set up on top with the hostname
+        self._create_connection = self._connect_vetted
+
+    def _connect_vetted(self, address, timeout, source_address=None):
+        host, port = address
+        error = None
+        for vetted in _vetted_addresses(host, port, self._allow_private):
+            try:
+                return socket.create_connection(vetted, _remaining(self._deadline, timeout), source_address)
+            except TimeoutError:
+                raise
+            except OSError as e:
+                error = e
+        raise error or OSError(f'{host} did not resolve')
+
+    def connect(self):
+        super().connect()
+        self.sock = _DeadlineSocket(self.sock, self._deadline, self.timeout)
+
+
+class _VettedHTTPConnection(_VettedConnectionMixin, http.client.HTTPConnection):
+    pass
+
+
+class _VettedHTTPSConnection(_VettedConnectionMixin, http.client.HTTPSConnection):
+    pass
+
+
+class _VettedHTTPHandler(urllib.request.HTTPHandler):
+    def __init__(self, allow_private, deadline):
+        super().__init__()
+        self.connection_options = {'allow_private': allow_private, 'deadline': deadline}
+
+    def http_open(self, req):
+        return self.do_open(functools.partial(_VettedHTTPConnection, **self.connection_options), req)
+
+
+class _VettedHTTPSHandler(urllib.request.HTTPSHandler):
+    def __init__(self, allow_private, deadline):
+        super().__init__()
+        self.connection_options = {'allow_private': allow_private, 'deadline': deadline}
+
+    def https_open(self, req):
+        return self.do_open(functools.partial(_VettedHTTPSConnection, **self.connection_options), req,
+                            context=self._context)
+
+
+class _CheckedRedirects(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        # The new host's addresses are vetted when its connection opens
+        _check_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def _download_into_store(url, config):
+    """Fetch ``url`` into the posts folder of the media store. Returns the stored filename."""
+    allow_private = config['EXTERNAL_IMAGE_ALLOW_PRIVATE_HOSTS']
+    timeout = config['EXTERNAL_IMAGE_TIMEOUT_SECONDS']
+    deadline = time.monotonic() + timeout
+    _check_url(url)
+    opener = urllib.request.build_opener(
+        # No proxies from the environment: the connection must go to the vetted address
+        urllib.request.ProxyHandler({}),
+        _VettedHTTPHandler(allow_private, deadline),
+        _VettedHTTPSHandler(allow_private, deadline),
+        _CheckedRedirects(),
+    )
+    request = urllib.request.Request(url, headers={'User-Agent': _USER_AGENT, 'Accept': 'image/*'})
+    with opener.open(request, timeout=timeout) as response:
+        content_type = response.headers.get_content_type()
+        extension = CONTENT_TYPES.get(content_type)
+        if extension is None:
+            raise UploadRejected(f'Unsupported content type {content_type}')
+        # save_upload enforces the size cap and checks the signature against the type
+        return store_upload(FileStorage(stream=response, filename=f'external.{extension}'),
+                            config['UPLOAD_FOLDER'], 'posts', kind='remote_image')
+
+
+def request_fetch(url):
+    """Make sure ``url`` is cached or being fetched. Does not commit; returns its ExternalImage."""
+    key = url_hash(url)
+    inserted = db.session.execute(
+        sqlite_insert(ExternalImage)
+        .values(url_hash=key, url=url, status='pending', attempts=0, created_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=['url_hash'])
+    ).rowcount
+    item = ExternalImage.query.filter_by(url_hash=key).one()
+    if inserted:
+        enqueue('fetch_external_image', max_attempts=FETCH_ATTEMPTS, image_id=item.id)
+    return item
+
+
+def release_unlinked(upload_folder, created_before):
+    """Drop cached copies of URLs no Post links any more. Does not commit.
+
+    Only rows created before ``created_before`` go, so a post still being
+    written keeps the copy it just requested. Returns the files no row
+    references any more, like ``media_store.release``.
+    """
+    linked = select(Post.id).where(Post.image_url == ExternalImage.url).exists()
+    paths = db.session.scalars(
+        delete(ExternalImage)
+        .where(~linked, ExternalImage.created_at < created_before)
+        .returning(ExternalImage.path)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if paths:
+        logger.info(f"Released {len(paths)} cached external images no post links")
+    return release_media(upload_folder, paths)
+
+
+def _fail(item, error):
+    logger.warning(f"Could not cache external image {item.url}: {error}")
+    item.status = 'failed'
+    item.last_error = str(error)[:2000]
+    db.session.commit()
+
+
+@task('fetch_external_image')
+def fetch_external_image(image_id):
+    """Download one ExternalImage. Network errors are retried by the task runner."""
+    item = db.session.get(ExternalImage, image_id)
+    if item is None or item.status != 'pending':
+        return None
+    # Committed first, so the count survives the rollback of a failed attempt
+    item.attempts += 1
+    db.session.commit()
+    try:
+        filename = _download_into_store(item.url, current_app.config)
+    except (BlockedURL, UploadRejected) as e:
+        db.session.rollback()
+        _fail(item, e)
+        return None
+    except (urllib.error.URLError, OSError) as e:
+        db.session.rollback()
+        permanent = isinstance(e, urllib.error.HTTPError) and e.code < 500
+        if permanent or item.attempts >= FETCH_ATTEMPTS:
+            _fail(item, e)
+            return None
+        # The runner retries with backoff
+        raise
+    item.status = 'ready'
+    item.path = f'posts/{filename}'
+    item.fetched_at = datetime.utcnow()
+    item.last_error = None
+    db.session.commit()
+    logger.info(f"Cached external image {item.url} as {item.path}")
+    return item.path
+
+
+def external_image_response(url, size, upload_folder):
+    """The cached copy of ``url`` at ``size``, or a redirect to ``url`` until there is one."""
+    if not is_external(url):
+        abort(404)
+    item = ExternalImage.query.filter_by(url_hash=url_hash(url)).first()
+    if item is None:
+        if db.session.query(Post.id).filter(Post.image_url == url).first() is None:
+            abort(404)
+        item = request_fetch(url)
+        db.session.commit()
+
+    if item.status != 'ready' or not os.path.isfile(os.path.join(upload_folder, item.path)):
+        response = redirect(url)
+        response.cache_control.no_store = True
+        return response
+
+    path = image_url_path(item.path, size, upload_folder)
+    response = send_upload(upload_folder, path)
+    # Once fetched, a URL's copy never changes; only a variant still being generated can
+    if size not in SIZES or path != item.path or not variants_available():
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    return response
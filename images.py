@@ -0,0 +1,180 @@
+"""Resized WebP variants of uploaded images.
+
+Each uploaded image ``<folder>/<name>`` gets ``<folder>/variants/<stem>.<size>.webp``
+for every size in ``SIZES``, generated on a background thread after the
+upload is saved. Templates call the ``image_url`` global with the size they
+display; until the variants exist (or when Pillow is not installed) it falls
+back to the original file.
+"""
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; originals are served as uploaded without it
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Longest side in pixels. thumb covers avatar and logo slots at 2x density,
+# medium covers cards and the feed, large the detail pages.
+SIZES = {'thumb': 128, 'medium': 640, 'large': 1600}
+WEBP_QUALITY = 80
+VARIANT_DIR = 'variants'
+# Folders under the upload folder whose images get variants
+IMAGE_FOLDERS = ('avatars', 'company_logos', 'events', 'posts')
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.webp'}
+
+_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-variants')
+
+
+def available():
+    return Image is not None
+
+
+def variant_path(path, size):
+    """Path of one variant of the original image at ``path``."""
+    directory, name = os.path.split(path)
+    stem = os.path.splitext(name)[0]
+    return os.path.join(directory, VARIANT_DIR, f'{stem}.{size}.webp')
+
+
+def variant_paths(path):
+    return [variant_path(path, size) for size in SIZES]
+
+
+def is_image(path):
+    return os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+
+
+def make_variants(path, force=False):
+    """Write every missing variant of one image. Returns the number written."""
+    if not available() or not is_image(path):
+        return 0
+    targets = {size: variant_path(path, size) for size in SIZES}
+    if not force:
+        targets = {size: target for size, target in targets.items() if not os.path.exists(target)}
+    if not targets:
+        return 0
+
+    written = 0
+    with Image.open(path) as original:
+        # Phone photos are stored sideways with an EXIF rotation flag
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        os.makedirs(os.path.join(os.path.dirname(path), VARIANT_DIR), exist_ok=True)
+        # Largest first, so each smaller size is resampled from an already reduced image
+        for size in sorted(targets, key=SIZES.get, reverse=True):
+            image.thumbnail((SIZES[size], SIZES[size]), Image.LANCZOS)
+            # Unique per writer: the same shared image can be processed twice at once
+            tmp_path = f'{targets[size]}.{uuid.uuid4().hex}.tmp'
+            image.save(tmp_path, 'WEBP', quality=WEBP_QUALITY, method=4)
+            # Readers never see a half-written file
+            os.replace(tmp_path, targets[size])
+            written += 1
+    return written
+
+
+def _make_variants_logged(path):
+    try:
+        return make_variants(path)
+    except Exception as e:
+        logger.warning(f"Could not create variants of {path}: {e}")
+        return 0
+
+
+def schedule_variants(path):
+    """Create the variants of a just-saved upload on a background thread."""
+    if available() and is_image(path):
+        return _pool.submit(_make_variants_logged, path)
+    return None
+
+
+def remove_image_files(path):
+    """Delete an uploaded image and its variants, ignoring files that are already gone."""
+    for target in [path] + variant_paths(path):
+        try:
+            os.remove(target)
+        except FileNotFoundError:
+            pass
+
+
+def image_url_path(upload_path, size, upload_folder):
+    """Path under the upload folder to serve for ``upload_path`` at ``size``.
+
+    ``upload_path`` is relative to the upload folder (``avatars/x.jpg``);
+    the variant is returned when it exists, otherwise the original.
+    """
+    if size in SIZES and is_image(upload_path):
+        variant = variant_path(upload_path, size)
+        if os.path.exists(os.path.join(upload_folder, variant)):
+            return variant.replace(os.sep, '/')
+    return upload_path
+
+
+def originals(upload_folder):
+    """Every original image under the image folders."""
+    for folder in IMAGE_FOLDERS:
+        directory = os.path.join(upload_folder, folder)
+        if not os.path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            if entry.is_file() and is_image(entry.name):
+                yield entry.path
+
+
+def generate_all(upload_folder, force=False):
+    """Create missing variants for every existing upload. Returns (images, variants written)."""
+    images = written = 0
+    for path in originals(upload_folder):
+        images += 1
+        try:
+            written += make_variants(path, force=force)
+        except Exception as e:
+            logger.warning(f"Could not create variants of {path}: {e}")
+    return images, written
+
+
+def savings_report(upload_folder):
+    """Bytes of originals versus each variant size, per folder and in total.
+
+    ``<size>_saved_percent`` only compares images that have that variant,
+    so a partly backfilled folder doesn't look better than it is.
+    """
+    def empty():
+        stats = {'images': 0, 'original_bytes': 0, 'missing_variants': 0}
+        for size in SIZES:
+            stats[f'{size}_bytes'] = 0
+            stats[f'{size}_compared_bytes'] = 0
+        return stats
+
+    folders = {}
+    total = empty()
+    for path in originals(upload_folder):
+        folder = os.path.basename(os.path.dirname(path))
+        buckets = (folders.setdefault(folder, empty()), total)
+        original_bytes = os.path.getsize(path)
+        for bucket in buckets:
+            bucket['images'] += 1
+            bucket['original_bytes'] += original_bytes
+        for size in SIZES:
+            target = variant_path(path, size)
+            if os.path.exists(target):
+                variant_bytes = os.path.getsize(target)
+                for bucket in buckets:
+                    bucket[f'{size}_bytes'] += variant_bytes
+                    bucket[f'{size}_compared_bytes'] += original_bytes
+            else:
+                for bucket in buckets:
+                    bucket['missing_variants'] += 1
+
+    for stats in list(folders.values()) + [total]:
+        for size in SIZES:
+            compared = stats.pop(f'{size}_compared_bytes')
+            stats[f'{size}_saved_percent'] = (
+                round(100 * (1 - stats[f'{size}_bytes'] / compared), 1) if compared else None
+            )
+    return {'folders': folders, 'total': total}
@@ -0,0 +1,174 @@
+"""Near-duplicate detection for job postings.
+
+Every job gets a MinHash signature of the word shingles in its text, computed
+when it is posted or edited. The share of equal signature slots between two
+jobs estimates how much of their text they share, so a repost with a few
+words changed (or just a new logo) scores close to 1.
+
+The signature is cut into ``BANDS`` bands of ``ROWS`` slots and each band is
+hashed into an indexed ``job_signature_band`` row (locality-sensitive
+hashing). Jobs that share any band are the only candidates compared, so
+flagging a pending job costs a few index lookups instead of a comparison with
+every job. With 16 bands of 4 rows a pair sharing 70% of its shingles becomes
+a candidate 99% of the time, and one sharing 30% only 12% of the time.
+"""
+import hashlib
+import random
+import re
+import struct
+import unicodedata
+
+from sqlalchemy import delete, insert, or_, and_
+
+from models import db, Job, JobSignatureBand
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 2
+# Estimated share of shingles above which two jobs are flagged as duplicates
+DUPLICATE_THRESHOLD = 0.7
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Fixed seed: stored signatures must stay comparable across processes and restarts
+_rng = random.Random(20261019)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+# Fixed width and byte order, so stored signatures read the same on every platform
+_SIGNATURE = struct.Struct(f'<{NUM_PERM}I')
+
+
+def _normalise(text):
+    text = (text or '').replace('Đ', 'D').replace('đ', 'd').lower()
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Set of word shingles of ``text``; single words for very short texts."""
+    tokens = _TOKEN_RE.findall(_normalise(text))
+    if len(tokens) < size:
+        return set(tokens)
+    return {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def _stable_hash(value, digest_size=8):
+    # Python's hash() is salted per process; signatures are stored, so use a stable hash
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=digest_size).digest(), 'big')
+
+
+def minhash(text):
+    """MinHash signature of ``text`` as a list of NUM_PERM ints, or None if it has no words."""
+    hashes = [_stable_hash(shingle) for shingle in shingles(text)]
+    if not hashes:
+        return None
+    return [min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return sum(1 for x, y in zip(signature, other) if x == y) / NUM_PERM
+
+
+def band_values(signature):
+    return [_stable_hash(','.join(map(str, signature[band * ROWS:(band + 1) * ROWS])), digest_size=4)
+            for band in range(BANDS)]
+
+
+def pack_signature(signature):
+    return _SIGNATURE.pack(*signature)
+
+
+def unpack_signature(data):
+    return list(_SIGNATURE.unpack(data))
+
+
+def job_text(job):
+    return '\n'.join(filter(None, [job.title, job.company_name, job.location, job.description, job.requirements]))
+
+
+def fingerprint_job(job):
+    """Store the job's signature and replace its LSH band rows. The job must have an id. Does not commit."""
+    signature = minhash(job_text(job))
+    job.minhash = pack_signature(signature) if signature is not None else None
+    db.session.execute(delete(JobSignatureBand).where(JobSignatureBand.job_id == job.id))
+    if signature is not None:
+        db.session.execute(insert(JobSignatureBand), [
+            {'job_id': job.id, 'band': band, 'value': value}
+            for band, value in enumerate(band_values(signature))
+        ])
+
+
+def find_duplicates(jobs, threshold=DUPLICATE_THRESHOLD):
+    """Likely duplicates of each job among all other jobs.
+
+    Returns ``{job_id: [(other_job_id, title, company_name, is_confirmed, similarity), ...]}``
+    with the most similar first; jobs without duplicates are left out. Two
+    indexed queries serve the whole list.
+    """
+    signatures = {job.id: unpack_signature(job.minhash) for job in jobs if job.minhash}
+    if not signatures:
+        return {}
+
+    bands_by_job = {job_id: band_values(signature) for job_id, signature in signatures.items()}
+    wanted = [set() for _ in range(BANDS)]
+    for values in bands_by_job.values():
+        for band, value in enumerate(values):
+            wanted[band].add(value)
+    band_rows = db.session.query(JobSignatureBand.job_id, JobSignatureBand.band, JobSignatureBand.value).filter(
+        or_(*[and_(JobSignatureBand.band == band, JobSignatureBand.value.in_(values))
+              for band, values in enumerate(wanted)])
+    ).all()
+
+    bucket = {}
+    for other_id, band, value in band_rows:
+        bucket.setdefault((band, value), set()).add(other_id)
+    candidates_by_job = {}
+    for job_id, values in bands_by_job.items():
+        candidates = set()
+        for band, value in enumerate(values):
+            candidates |= bucket.get((band, value), set())
+        candidates.discard(job_id)
+        if candidates:
+            candidates_by_job[job_id] = candidates
+    if not candidates_by_job:
+        return {}
+
+    candidate_ids = set().union(*candidates_by_job.values())
+    others = {row.id: row for row in db.session.query(
+        Job.id, Job.title, Job.company_name, Job.is_confirmed, Job.minhash
+    ).filter(Job.id.in_(candidate_ids), Job.minhash.isnot(None))}
+
+    duplicates = {}
+    for job_id, candidates in candidates_by_job.items():
+        matches = []
+        for other_id in candidates:
+            other = others.get(other_id)
+            if other is None:
+                continue
+            score = similarity(signatures[job_id], unpack_signature(other.minhash))
+            if score >= threshold:
+                matches.append((other.id, other.title, other.company_name, other.is_confirmed, score))
+        if matches:
+            duplicates[job_id] = sorted(matches, key=lambda m: (-m[4], m[0]))
+    return duplicates
+
+
+def backfill_job_fingerprints(batch_size=500, only_missing=True):
+    """Compute signatures for existing jobs. Returns the number of jobs updated."""
+    total = 0
+    last_id = 0
+    while True:
+        query = Job.query.filter(Job.id > last_id)
+        if only_missing:
+            query = query.filter(Job.minhash.is_(None))
+        batch = query.order_by(Job.id).limit(batch_size).all()
+        if not batch:
+            break
+        for job in batch:
+            fingerprint_job(job)
+        db.session.commit()
+        total += len(batch)
+        last_id = batch[-1].id
+    return total
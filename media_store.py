@@ -0,0 +1,93 @@
+"""Content-addressed storage for uploaded images.
+
+Avatars, company logos, event images and post images are stored as
+``<folder>/<first 32 hex digits of their SHA-256>.<ext>``, so the same logo
+uploaded for ten job postings is kept once. A ``MediaBlob`` row per file
+counts the rows whose column holds that filename: ``store_upload`` adds a
+reference, ``release`` drops references and returns the files no row uses
+any more, which the caller purges once its transaction is committed.
+
+Resumes are private to one application and stay outside the store.
+"""
+import hashlib
+import os
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, MediaBlob
+from uploads import save_upload
+from images import schedule_variants
+
+HASH_LENGTH = 32
+MEDIA_FOLDERS = ('avatars', 'company_logos', 'events', 'posts')
+# Extensions that name the same format, so identical bytes get one filename
+_EXTENSION_ALIASES = {'jpeg': 'jpg'}
+# Post.image_url holds uploaded images relative to static/, unlike the other columns
+POST_IMAGE_PREFIX = 'uploads/'
+
+
+def content_name(sha256, extension):
+    extension = extension.lower()
+    return f'{sha256[:HASH_LENGTH]}.{_EXTENSION_ALIASES.get(extension, extension)}'
+
+
+def post_image_path(image_url):
+    """Store path of a Post.image_url, or None for external images."""
+    if image_url and image_url.startswith(POST_IMAGE_PREFIX):
+        return image_url[len(POST_IMAGE_PREFIX):]
+    return None
+
+
+def acquire(path, sha256, size, count=1):
+    """Add ``count`` references to the file at ``path``. Does not commit."""
+    db.session.execute(
+        sqlite_insert(MediaBlob)
+        .values(path=path, sha256=sha256, size=size, ref_count=count, created_at=datetime.utcnow())
+        .on_conflict_do_update(index_elements=['path'], set_={'ref_count': MediaBlob.ref_count + count})
+    )
+
+
+def store_upload(file, upload_folder, folder, kind='image', extensions=None):
+    """Save an upload into ``folder`` under its content name and reference it. Returns the filename.
+
+    Raises UploadRejected like ``uploads.save_upload``. Does not commit.
+    """
+    directory = os.path.join(upload_folder, folder)
+    incoming = os.path.join(directory, f'.incoming-{uuid.uuid4().hex}')
+    digest = hashlib.sha256()
+    size = save_upload(file, incoming, kind, extensions, digest=digest)
+
+    sha256 = digest.hexdigest()
+    filename = content_name(sha256, file.filename.rsplit('.', 1)[1])
+    # Identical bytes are already there when the file is shared; replacing keeps
+    # one copy and puts back a file a concurrent purge may just have removed
+    os.replace(incoming, os.path.join(directory, filename))
+    # Only missing variants are generated, so a shared file costs nothing here
+    schedule_variants(os.path.join(directory, filename))
+    acquire(f'{folder}/{filename}', sha256, size)
+    return filename
+
+
+def release(upload_folder, paths):
+    """Drop one reference per entry of ``paths`` (store paths; repeats count). Does not commit.
+
+    Returns the absolute paths of files no row references any more, to purge
+    after the commit. Files without a MediaBlob row count as unshared.
+    """
+    counts = Counter(path for path in paths if path)
+    if not counts:
+        return []
+    table = MediaBlob.__table__
+    db.session.execute(
+        update(table).where(table.c.path == bindparam('b_path'))
+        .values(ref_count=table.c.ref_count - bindparam('b_count')),
+        [{'b_path': path, 'b_count': count} for path, count in counts.items()]
+    )
+    still_used = set(db.session.scalars(
+        select(MediaBlob.path).where(MediaBlob.path.in_(list(counts)), MediaBlob.ref_count > 0)))
+    db.session.execute(delete(table).where(table.c.path.in_(list(counts)), table.c.ref_count <= 0))
+    return [os.path.join(upload_folder, path) for path in counts if path not in still_used]
@@ -5,6 +5,8 @@ from flask import current_app
 
 from alembic import context
 
+from search_index import APPLICANT_INDEX, USER_NAME_INDEX
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -45,6 +47,20 @@ target_db = current_app.extensions['migrate'].db
 # ... etc.
 
 
+# FTS5 virtual tables and the shadow tables SQLite keeps for them are created
+# with raw SQL, so autogenerate would otherwise propose dropping them
+FTS_TABLES = (APPLICANT_INDEX, USER_NAME_INDEX)
+FTS_SHADOW_SUFFIXES = ('_data', '_idx', '_content', '_docsize', '_config')
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == 'table' and reflected and compare_to is None:
+        if name in FTS_TABLES or any(name == table + suffix
+                                     for table in FTS_TABLES for suffix in FTS_SHADOW_SUFFIXES):
+            return False
+    return True
+
+
 def get_metadata():
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
@@ -65,7 +81,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +110,8 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
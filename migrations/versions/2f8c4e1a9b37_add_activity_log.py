@@ -0,0 +1,41 @@
+"""Add activity_log table
+
+Revision ID: 2f8c4e1a9b37
+Revises: 9d3f6a2b7c15
+Create Date: 2026-10-19 16:48:02.117934
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f8c4e1a9b37'
+down_revision = '9d3f6a2b7c15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('activity_log',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('actor_id', sa.Integer(), nullable=True),
+    sa.Column('actor_name', sa.String(length=100), nullable=True),
+    sa.Column('target_type', sa.String(length=50), nullable=True),
+    sa.Column('target_id', sa.Integer(), nullable=True),
+    sa.Column('summary', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('activity_log', schema=None) as batch_op:
+        batch_op.create_index('ix_activity_log_kind_id', ['kind', 'id'], unique=False)
+        batch_op.create_index('ix_activity_log_actor_id_id', ['actor_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('activity_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_activity_log_actor_id_id')
+        batch_op.drop_index('ix_activity_log_kind_id')
+
+    op.drop_table('activity_log')
@@ -0,0 +1,41 @@
+"""Add job minhash signatures and LSH bands
+
+Revision ID: 3c6b9e0d4a72
+Revises: d7a4c1e2f359
+Create Date: 2026-10-19 19:20:44.581036
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c6b9e0d4a72'
+down_revision = 'd7a4c1e2f359'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing jobs are fingerprinted by `flask backfill-job-fingerprints`
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('minhash', sa.LargeBinary(), nullable=True))
+
+    op.create_table('job_signature_band',
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('band', sa.Integer(), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['job_id'], ['job.id'], ),
+    sa.PrimaryKeyConstraint('job_id', 'band')
+    )
+    with op.batch_alter_table('job_signature_band', schema=None) as batch_op:
+        batch_op.create_index('ix_job_signature_band_band_value', ['band', 'value'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('job_signature_band', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_signature_band_band_value')
+
+    op.drop_table('job_signature_band')
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.drop_column('minhash')
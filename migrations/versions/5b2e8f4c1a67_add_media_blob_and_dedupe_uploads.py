@@ -0,0 +1,144 @@
+"""Add media_blob and dedupe uploaded images by content
+
+Revision ID: 5b2e8f4c1a67
+Revises: 8e1f5a7c2b94
+Create Date: 2026-10-19 21:12:05.118342
+
+Every avatar, company logo, event image and post image referenced from the
+database gets a copy named ``<sha256 prefix>.<ext>`` in its folder, and rows
+are pointed at that name. Identical files share one copy, and media_blob gets
+one row per copy with its reference count. Copies are hard links where the
+filesystem allows. Nothing is renamed or deleted, so a failed upgrade leaves
+every file the old rows point at in place. The old names are unreferenced
+afterwards; remove them once the upgrade is committed with
+``flask collect-orphaned-uploads``. The downgrade only drops the table; the
+new names keep working as plain filenames.
+"""
+import hashlib
+import os
+import shutil
+from collections import defaultdict
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2e8f4c1a67'
+down_revision = '8e1f5a7c2b94'
+branch_labels = None
+depends_on = None
+
+# Same scheme as media_store; copied so the migration keeps working if that module changes
+HASH_LENGTH = 32
+EXTENSION_ALIASES = {'jpeg': 'jpg'}
+VARIANT_SIZES = ('thumb', 'medium', 'large')
+# table, column, folder under the upload folder, prefix stored in the column
+REFERENCES = [
+    ('profile', 'avatar', 'avatars', ''),
+    ('job', 'company_logo', 'company_logos', ''),
+    ('event', 'image', 'events', ''),
+    ('post', 'image_url', 'posts', 'uploads/posts/'),
+]
+
+
+def _upload_folder():
+    try:
+        from flask import current_app
+        return current_app.config['UPLOAD_FOLDER']
+    except (ImportError, RuntimeError, KeyError):
+        return 'static/uploads'
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _variant(directory, name, size):
+    return os.path.join(directory, 'variants', f'{os.path.splitext(name)[0]}.{size}.webp')
+
+
+def _link_or_copy(source, target):
+    try:
+        os.link(source, target)
+    except OSError:
+        # Filesystems without hard links, or a folder on another device
+        shutil.copy2(source, target)
+
+
+def _dedupe_uploads(bind, upload_folder):
+    blobs = {}  # store path -> [sha256, size, ref_count]
+    for table, column, folder, prefix in REFERENCES:
+        directory = os.path.join(upload_folder, folder)
+        rows = bind.execute(sa.text(
+            f'SELECT id, {column} FROM "{table}" WHERE {column} LIKE :prefix'
+        ), {'prefix': prefix + '%'}).fetchall()
+        renames = {}  # old filename -> new filename
+        updates = defaultdict(list)
+        for row_id, value in rows:
+            old_name = value[len(prefix):]
+            if '/' in old_name or not old_name:
+                continue
+            if old_name not in renames:
+                old_path = os.path.join(directory, old_name)
+                if not os.path.isfile(old_path):
+                    continue
+                sha256 = _sha256(old_path)
+                extension = old_name.rsplit('.', 1)[-1].lower() if '.' in old_name else 'bin'
+                new_name = f'{sha256[:HASH_LENGTH]}.{EXTENSION_ALIASES.get(extension, extension)}'
+                renames[old_name] = new_name
+                blobs.setdefault(f'{folder}/{new_name}', [sha256, os.path.getsize(old_path), 0])
+            if old_name not in renames:
+                continue
+            new_name = renames[old_name]
+            blobs[f'{folder}/{new_name}'][2] += 1
+            if new_name != old_name:
+                updates[prefix + new_name].append(row_id)
+
+        for value, ids in updates.items():
+            bind.execute(sa.text(f'UPDATE "{table}" SET {column} = :value WHERE id = :id'),
+                         [{'value': value, 'id': row_id} for row_id in ids])
+
+        # Old files stay until the upload GC finds them unreferenced after the commit
+        for old_name, new_name in renames.items():
+            if old_name == new_name:
+                continue
+            for old, new in [(os.path.join(directory, old_name), os.path.join(directory, new_name))] + [
+                    (_variant(directory, old_name, size), _variant(directory, new_name, size)) for size in VARIANT_SIZES]:
+                if os.path.exists(old) and not os.path.exists(new):
+                    _link_or_copy(old, new)
+
+    if blobs:
+        now = datetime.utcnow()
+        bind.execute(sa.text(
+            'INSERT INTO media_blob (path, sha256, size, ref_count, created_at) '
+            'VALUES (:path, :sha256, :size, :ref_count, :created_at)'
+        ), [{'path': path, 'sha256': sha256, 'size': size, 'ref_count': count, 'created_at': now}
+            for path, (sha256, size, count) in blobs.items()])
+
+
+def upgrade():
+    op.create_table('media_blob',
+        sa.Column('path', sa.String(length=255), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('path')
+    )
+    with op.batch_alter_table('media_blob', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_media_blob_sha256'), ['sha256'], unique=False)
+
+    _dedupe_uploads(op.get_bind(), _upload_folder())
+
+
+def downgrade():
+    with op.batch_alter_table('media_blob', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_media_blob_sha256'))
+
+    op.drop_table('media_blob')
@@ -0,0 +1,49 @@
+"""Add event registered_count and unique event registration
+
+Revision ID: 5e7d2c9a4f18
+Revises: a3c91f0d2b41
+Create Date: 2026-10-19 10:02:37.530914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e7d2c9a4f18'
+down_revision = 'a3c91f0d2b41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('registered_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index(batch_op.f('ix_event_registered_count'), ['registered_count'], unique=False)
+
+    # Keep only the earliest registration per (event, user) before enforcing uniqueness
+    op.execute("""
+        DELETE FROM event_registration
+        WHERE id NOT IN (SELECT MIN(id) FROM event_registration GROUP BY event_id, user_id)
+    """)
+
+    with op.batch_alter_table('event_registration', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_event_registration_event_user', ['event_id', 'user_id'])
+        batch_op.create_index('ix_event_registration_event_status', ['event_id', 'status'], unique=False)
+
+    op.execute("""
+        UPDATE event SET registered_count = (
+            SELECT COUNT(*) FROM event_registration r
+            WHERE r.event_id = event.id AND r.status IN ('registered', 'attended')
+        )
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('event_registration', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_registration_event_status')
+        batch_op.drop_constraint('uq_event_registration_event_user', type_='unique')
+
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_event_registered_count'))
+        batch_op.drop_column('registered_count')
@@ -0,0 +1,54 @@
+"""Add user email and name search indexes
+
+Revision ID: 6a1e9c3d5f20
+Revises: 2f8c4e1a9b37
+Create Date: 2026-10-19 17:21:45.630218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a1e9c3d5f20'
+down_revision = '2f8c4e1a9b37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_user_email_lower', 'user', [sa.text('lower(email)')], unique=False)
+
+    op.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS user_name_search USING fts5(
+            name,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS user_name_search_ai AFTER INSERT ON user BEGIN
+            INSERT INTO user_name_search (rowid, name) VALUES (new.id, replace(replace(new.name, 'Đ', 'D'), 'đ', 'd'));
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS user_name_search_ad AFTER DELETE ON user BEGIN
+            DELETE FROM user_name_search WHERE rowid = old.id;
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS user_name_search_au AFTER UPDATE OF name ON user BEGIN
+            DELETE FROM user_name_search WHERE rowid = old.id;
+            INSERT INTO user_name_search (rowid, name) VALUES (new.id, replace(replace(new.name, 'Đ', 'D'), 'đ', 'd'));
+        END
+    """)
+    # Backfill existing users
+    op.execute("INSERT INTO user_name_search (rowid, name) "
+               "SELECT id, replace(replace(name, 'Đ', 'D'), 'đ', 'd') FROM user")
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS user_name_search_au")
+    op.execute("DROP TRIGGER IF EXISTS user_name_search_ad")
+    op.execute("DROP TRIGGER IF EXISTS user_name_search_ai")
+    op.execute("DROP TABLE IF EXISTS user_name_search")
+    op.drop_index('ix_user_email_lower', table_name='user')
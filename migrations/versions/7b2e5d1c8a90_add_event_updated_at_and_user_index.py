@@ -0,0 +1,37 @@
+"""Add updated_at to events and registrations, index registrations by user
+
+Revision ID: 7b2e5d1c8a90
+Revises: c81f4b6e09d3
+Create Date: 2026-10-19 13:40:12.664021
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2e5d1c8a90'
+down_revision = 'c81f4b6e09d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('event_registration', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_event_registration_user_id', ['user_id'], unique=False)
+
+    op.execute("UPDATE event SET updated_at = created_at")
+    op.execute("UPDATE event_registration SET updated_at = created_at")
+
+
+def downgrade():
+    with op.batch_alter_table('event_registration', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_registration_user_id')
+        batch_op.drop_column('updated_at')
+
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,34 @@
+"""Add updated_at to user, job and job_application
+
+Revision ID: 8e1f5a7c2b94
+Revises: 3c6b9e0d4a72
+Create Date: 2026-10-19 19:58:31.640217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e1f5a7c2b94'
+down_revision = '3c6b9e0d4a72'
+branch_labels = None
+depends_on = None
+
+TABLES = ['user', 'job', 'job_application']
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+            batch_op.create_index(f'ix_{table}_updated_at', ['updated_at'], unique=False)
+        # Existing rows count as last changed when they were created
+        op.execute(f'UPDATE "{table}" SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)')
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{table}_updated_at')
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,49 @@
+"""Add daily_stat rollup table
+
+Revision ID: 9d3f6a2b7c15
+Revises: e4a0b7c35d62
+Create Date: 2026-10-19 16:12:31.504218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3f6a2b7c15'
+down_revision = 'e4a0b7c35d62'
+branch_labels = None
+depends_on = None
+
+
+BACKFILL = [
+    ("new_users", "user", "role"),
+    ("new_jobs", "job", "job_type"),
+    ("applications", "job_application", "status"),
+    ("new_events", "event", "''"),
+    ("event_registrations", "event_registration", "''"),
+]
+
+
+def upgrade():
+    op.create_table('daily_stat',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('metric', sa.String(length=50), nullable=False),
+    sa.Column('dimension', sa.String(length=50), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'metric', 'dimension', name='uq_daily_stat_day_metric_dimension')
+    )
+
+    for metric, table, dimension in BACKFILL:
+        op.execute(
+            f"INSERT INTO daily_stat (day, metric, dimension, value) "
+            f"SELECT date(created_at), '{metric}', COALESCE({dimension}, ''), COUNT(*) FROM {table} "
+            f"WHERE created_at IS NOT NULL "
+            f"GROUP BY date(created_at), COALESCE({dimension}, '')"
+        )
+
+
+def downgrade():
+    op.drop_table('daily_stat')
@@ -0,0 +1,48 @@
+"""Add applicant full-text search index
+
+Revision ID: a3c91f0d2b41
+Revises: 641d427712f2
+Create Date: 2026-10-19 09:12:04.118342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c91f0d2b41'
+down_revision = '641d427712f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS applicant_search USING fts5(
+            job_id UNINDEXED,
+            user_id UNINDEXED,
+            name,
+            email,
+            cover_letter,
+            skills,
+            education,
+            experience,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    # Backfill existing applications
+    op.execute("""
+        INSERT INTO applicant_search
+            (rowid, job_id, user_id, name, email, cover_letter, skills, education, experience)
+        SELECT a.id, a.job_id, a.user_id, u.name, u.email, COALESCE(a.cover_letter, ''),
+               COALESCE((SELECT group_concat(s.name, ', ') FROM skill s WHERE s.user_id = a.user_id), ''),
+               COALESCE((SELECT group_concat(COALESCE(e.school, '') || ' ' || COALESCE(e.major, '') || ' ' || COALESCE(e.degree, ''), char(10))
+                         FROM education e WHERE e.user_id = a.user_id), ''),
+               COALESCE((SELECT group_concat(x.position || ' ' || x.company || ' ' || COALESCE(x.description, ''), char(10))
+                         FROM experience x WHERE x.user_id = a.user_id), '')
+        FROM job_application a JOIN user u ON u.id = a.user_id
+    """)
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS applicant_search")
@@ -0,0 +1,42 @@
+"""Add indexes on user-owned foreign keys
+
+Revision ID: b5d2e8f14a63
+Revises: 6a1e9c3d5f20
+Create Date: 2026-10-19 17:58:12.904471
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d2e8f14a63'
+down_revision = '6a1e9c3d5f20'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_profile_user_id', 'profile', ['user_id']),
+    ('ix_education_user_id', 'education', ['user_id']),
+    ('ix_experience_user_id', 'experience', ['user_id']),
+    ('ix_skill_user_id', 'skill', ['user_id']),
+    ('ix_post_user_id', 'post', ['user_id']),
+    ('ix_comment_user_id', 'comment', ['user_id']),
+    ('ix_comment_post_id', 'comment', ['post_id']),
+    ('ix_post_likes_post_id', 'post_likes', ['post_id']),
+    ('ix_job_alumni_id', 'job', ['alumni_id']),
+    ('ix_job_application_user_id', 'job_application', ['user_id']),
+    ('ix_job_application_job_id', 'job_application', ['job_id']),
+    ('ix_event_creator_id', 'event', ['creator_id']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
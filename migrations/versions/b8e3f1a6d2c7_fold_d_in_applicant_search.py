@@ -0,0 +1,32 @@
+"""Fold đ to d in the applicant search index
+
+Revision ID: b8e3f1a6d2c7
+Revises: f6b1d8a2c094
+Create Date: 2026-10-20 09:05:41.227310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e3f1a6d2c7'
+down_revision = 'f6b1d8a2c094'
+branch_labels = None
+depends_on = None
+
+_COLUMNS = ('name', 'email', 'cover_letter', 'skills', 'education', 'experience')
+
+
+def _fold(column):
+    return f"replace(replace({column}, 'Đ', 'D'), 'đ', 'd')"
+
+
+def upgrade():
+    # Rows indexed before search_index.fold_text kept "đ", which queries now fold to "d"
+    op.execute(f"UPDATE applicant_search SET {', '.join(f'{c} = {_fold(c)}' for c in _COLUMNS)}")
+
+
+def downgrade():
+    # Folded rows still match; `flask rebuild-search-index` reindexes from the source rows if needed
+    pass
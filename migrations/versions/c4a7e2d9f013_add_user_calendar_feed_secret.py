@@ -0,0 +1,26 @@
+"""Add user.calendar_feed_secret
+
+Revision ID: c4a7e2d9f013
+Revises: b8e3f1a6d2c7
+Create Date: 2026-10-20 09:31:12.604118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a7e2d9f013'
+down_revision = 'b8e3f1a6d2c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('calendar_feed_secret', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('calendar_feed_secret')
@@ -0,0 +1,28 @@
+"""Add event listing indexes
+
+Revision ID: c81f4b6e09d3
+Revises: 5e7d2c9a4f18
+Create Date: 2026-10-19 11:24:51.207736
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81f4b6e09d3'
+down_revision = '5e7d2c9a4f18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.create_index('ix_event_published_start_time', ['is_published', 'start_time'], unique=False)
+        batch_op.create_index('ix_event_published_registered_count', ['is_published', 'registered_count'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_published_registered_count')
+        batch_op.drop_index('ix_event_published_start_time')
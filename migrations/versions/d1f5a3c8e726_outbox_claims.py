@@ -0,0 +1,28 @@
+"""Claim columns on outbox_email for stale-claim recovery
+
+Revision ID: d1f5a3c8e726
+Revises: c4a7e2d9f013
+Create Date: 2026-10-20 11:02:47.318506
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1f5a3c8e726'
+down_revision = 'c4a7e2d9f013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('outbox_email', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('claimed_by', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('claimed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('outbox_email', schema=None) as batch_op:
+        batch_op.drop_column('claimed_at')
+        batch_op.drop_column('claimed_by')
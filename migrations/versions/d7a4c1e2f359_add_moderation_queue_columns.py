@@ -0,0 +1,35 @@
+"""Add post publish flag and moderation queue indexes
+
+Revision ID: d7a4c1e2f359
+Revises: b5d2e8f14a63
+Create Date: 2026-10-19 18:42:07.315902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a4c1e2f359'
+down_revision = 'b5d2e8f14a63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing posts stay visible
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('is_published', sa.Boolean(), nullable=False, server_default=sa.true()))
+        batch_op.create_index('ix_post_published_id', ['is_published', 'id'], unique=False)
+
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.create_index('ix_job_confirmed_id', ['is_confirmed', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_confirmed_id')
+
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_index('ix_post_published_id')
+        batch_op.drop_column('is_published')
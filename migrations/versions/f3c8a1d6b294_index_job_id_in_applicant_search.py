@@ -0,0 +1,46 @@
+"""Index job_id in the applicant search index
+
+Revision ID: f3c8a1d6b294
+Revises: e7b2c9d4f158
+Create Date: 2026-10-20 14:22:37.518064
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c8a1d6b294'
+down_revision = 'e7b2c9d4f158'
+branch_labels = None
+depends_on = None
+
+_COLUMNS = 'job_id, user_id, name, email, cover_letter, skills, education, experience'
+
+
+def _rebuild(job_id_column):
+    # FTS5 columns cannot be altered, so copy the rows into a new table and swap it in
+    op.execute(f"""
+        CREATE VIRTUAL TABLE applicant_search_new USING fts5(
+            {job_id_column},
+            user_id UNINDEXED,
+            name,
+            email,
+            cover_letter,
+            skills,
+            education,
+            experience,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    op.execute(f"INSERT INTO applicant_search_new (rowid, {_COLUMNS}) SELECT rowid, {_COLUMNS} FROM applicant_search")
+    op.execute("DROP TABLE applicant_search")
+    op.execute("ALTER TABLE applicant_search_new RENAME TO applicant_search")
+
+
+def upgrade():
+    _rebuild('job_id')
+
+
+def downgrade():
+    _rebuild('job_id UNINDEXED')
@@ -0,0 +1,36 @@
+"""Add external_image for the post image cache
+
+Revision ID: f6b1d8a2c094
+Revises: a3d9c6f1e852
+Create Date: 2026-10-19 22:41:19.508733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6b1d8a2c094'
+down_revision = 'a3d9c6f1e852'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('external_image',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('url_hash', sa.String(length=64), nullable=False),
+    sa.Column('url', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('path', sa.String(length=255), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('fetched_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('url_hash')
+    )
+
+
+def downgrade():
+    op.drop_table('external_image')
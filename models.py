@@ -10,6 +10,8 @@ post_likes = db.Table('post_likes',
     db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
     db.Column('post_id', db.Integer, db.ForeignKey('post.id'), primary_key=True)
 )
+# The primary key covers lookups by user_id; this one covers deleting a post's likes
+db.Index('ix_post_likes_post_id', post_likes.c.post_id)
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -18,19 +20,29 @@ class User(UserMixin, db.Model):
     password = db.Column(db.String(200), nullable=False)
     role = db.Column(db.String(20), nullable=False, default='user')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    profile = db.relationship('Profile', backref='user', uselist=False)
-    posts = db.relationship('Post', backref='author', lazy=True)
-    comments = db.relationship('Comment', backref='author', lazy=True)
+    # Also bumped when the profile changes, so incremental exports pick it up
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Random part of the iCalendar feed URL (calendar_feed.py); None until the feed is first shown
+    calendar_feed_secret = db.Column(db.String(64))
+    # Everything a user owns goes with them; bulk deletes use user_deletion.delete_user_data
+    profile = db.relationship('Profile', backref='user', uselist=False, cascade='all, delete-orphan')
+    posts = db.relationship('Post', backref='author', lazy=True, cascade='all, delete-orphan')
+    comments = db.relationship('Comment', backref='author', lazy=True, cascade='all, delete-orphan')
     liked_posts = db.relationship('Post', secondary=post_likes, backref=db.backref('likers', lazy='dynamic'))
-    education = db.relationship('Education', backref='user', lazy=True)
-    experience = db.relationship('Experience', backref='user', lazy=True)
-    skills = db.relationship('Skill', backref='user', lazy=True)
-    jobs_posted = db.relationship('Job', backref='alumni', lazy=True, foreign_keys='Job.alumni_id')
-    events_created = db.relationship('Event', backref='creator', lazy=True, foreign_keys='Event.creator_id')
+    education = db.relationship('Education', backref='user', lazy=True, cascade='all, delete-orphan')
+    experience = db.relationship('Experience', backref='user', lazy=True, cascade='all, delete-orphan')
+    skills = db.relationship('Skill', backref='user', lazy=True, cascade='all, delete-orphan')
+    jobs_posted = db.relationship('Job', backref='alumni', lazy=True, foreign_keys='Job.alumni_id',
+                                  cascade='all, delete-orphan')
+    events_created = db.relationship('Event', backref='creator', lazy=True, foreign_keys='Event.creator_id',
+                                     cascade='all, delete-orphan')
+
+# Case-insensitive email lookups and prefix searches range-scan this index
+db.Index('ix_user_email_lower', func.lower(User.email))
 
 class Profile(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     avatar = db.Column(db.String(200))
     bio = db.Column(db.Text)
     phone = db.Column(db.String(20))
@@ -41,7 +53,7 @@ class Profile(db.Model):
 
 class Education(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     school = db.Column(db.String(200), nullable=False)
     major = db.Column(db.String(200))
     degree = db.Column(db.String(100))
@@ -51,7 +63,7 @@ class Education(db.Model):
 
 class Experience(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     position = db.Column(db.String(200), nullable=False)
     company = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
@@ -61,7 +73,7 @@ class Experience(db.Model):
 
 class Skill(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -70,15 +82,20 @@ class Post(db.Model):
     content = db.Column(db.Text, nullable=False)
     image_url = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    is_published = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true())
     comments = db.relationship('Comment', backref='post', lazy=True, cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_post_published_id', 'is_published', 'id'),
+    )
+
 class Comment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False, index=True)
 
 class Job(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -98,10 +115,18 @@ class Job(db.Model):
     contact_name = db.Column(db.String(100))
     contact_email = db.Column(db.String(120))
     contact_phone = db.Column(db.String(20))
-    alumni_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    alumni_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     is_confirmed = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # MinHash signature of the posting text, see job_fingerprints.py
+    minhash = db.Column(db.LargeBinary)
     applications = db.relationship('JobApplication', backref='job', lazy=True, cascade='all, delete-orphan')
+    signature_bands = db.relationship('JobSignatureBand', lazy=True, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('ix_job_confirmed_id', 'is_confirmed', 'id'),
+    )
 
     @property
     def salary_range(self):
@@ -109,18 +134,33 @@ class Job(db.Model):
             return "Thương lượng"
         return self.salary_display
 
+class JobSignatureBand(db.Model):
+    """One locality-sensitive-hashing band of a job's MinHash signature."""
+    job_id = db.Column(db.Integer, db.ForeignKey('job.id'), primary_key=True)
+    band = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_job_signature_band_band_value', 'band', 'value'),
+    )
+
 class JobApplication(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    job_id = db.Column(db.Integer, db.ForeignKey('job.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('job.id'), nullable=False, index=True)
     status = db.Column(db.String(20), default='pending')
     cover_letter = db.Column(db.Text)
     resume_path = db.Column(db.String(255))
     is_viewed = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    user = db.relationship('User', backref=db.backref('job_applications', lazy=True))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    user = db.relationship('User', backref=db.backref('job_applications', lazy=True, cascade='all, delete-orphan'))
 
 class Event(db.Model):
+    __table_args__ = (
+        db.Index('ix_event_published_start_time', 'is_published', 'start_time'),
+        db.Index('ix_event_published_registered_count', 'is_published', 'registered_count'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=False)
@@ -131,15 +171,121 @@ class Event(db.Model):
     requirements = db.Column(db.Text)
     contact_info = db.Column(db.Text)
     image = db.Column(db.String(200))
-    creator_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    creator_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     is_published = db.Column(db.Boolean, default=False)
+    # Active (registered/attended) registrations, maintained by registrations.py
+    registered_count = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     registrations = db.relationship('EventRegistration', backref='event', lazy=True, cascade='all, delete-orphan')
 
 class EventRegistration(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('event_id', 'user_id', name='uq_event_registration_event_user'),
+        db.Index('ix_event_registration_event_status', 'event_id', 'status'),
+        db.Index('ix_event_registration_user_id', 'user_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     event_id = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=False)
-    status = db.Column(db.String(20), default='registered')  # registered, canceled, attended
+    status = db.Column(db.String(20), default='registered')  # registered, waitlisted, canceled, attended
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    user = db.relationship('User', backref=db.backref('event_registrations', lazy=True)) 
\ No newline at end of file
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    user = db.relationship('User', backref=db.backref('event_registrations', lazy=True, cascade='all, delete-orphan'))
+
+# Emails waiting to be sent by reminders.drain_outbox()
+class OutboxEmail(db.Model):
+    __table_args__ = (
+        db.Index('ix_outbox_email_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    # Unique per logical message, so re-running the scheduler never enqueues twice
+    dedupe_key = db.Column(db.String(200), unique=True, nullable=False)
+    kind = db.Column(db.String(50), nullable=False)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, claimed, sending, sent, failed
+    # Sender holding the row and when it claimed it (or started sending it), for stale-claim recovery
+    claimed_by = db.Column(db.String(64))
+    claimed_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+# Per-day counters for the admin analytics page, maintained by analytics.py
+class DailyStat(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('day', 'metric', 'dimension', name='uq_daily_stat_day_metric_dimension'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    metric = db.Column(db.String(50), nullable=False)  # new_users, new_jobs, applications, new_events, event_registrations
+    # Breakdown within the metric (role, job type, application status), '' when there is none
+    dimension = db.Column(db.String(50), nullable=False, default='')
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+# Append-only log of user actions, written in batches by activity_log.ActivityLogWriter.
+# actor_id is not a foreign key so entries outlive deleted users.
+class ActivityLog(db.Model):
+    __table_args__ = (
+        db.Index('ix_activity_log_kind_id', 'kind', 'id'),
+        db.Index('ix_activity_log_actor_id_id', 'actor_id', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # see activity_log.ACTIVITY_LABELS
+    actor_id = db.Column(db.Integer)
+    actor_name = db.Column(db.String(100))
+    target_type = db.Column(db.String(50))
+    target_id = db.Column(db.Integer)
+    summary = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# One content-addressed upload, shared by every row that stores its filename.
+# Maintained by media_store.py; the file is removed when ref_count drops to 0.
+class MediaBlob(db.Model):
+    # Relative to UPLOAD_FOLDER, e.g. 'company_logos/<sha256 prefix>.png'
+    path = db.Column(db.String(255), primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# Background work run by tasks.py; payload, progress and result hold JSON.
+# created_by is not a foreign key so tasks outlive deleted users.
+class Task(db.Model):
+    __table_args__ = (
+        db.Index('ix_task_status_run_after', 'status', 'run_after'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, succeeded, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Set by the claim that is running the task, refreshed while it reports progress
+    claimed_by = db.Column(db.String(64))
+    heartbeat_at = db.Column(db.DateTime)
+    progress = db.Column(db.Text)
+    result = db.Column(db.Text)
+    last_error = db.Column(db.Text)
+    created_by = db.Column(db.Integer, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+# An image a post links from another site, fetched once into the media store by image_proxy.py.
+# path holds one MediaBlob reference once the fetch succeeded.
+class ExternalImage(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    url_hash = db.Column(db.String(64), unique=True, nullable=False)  # sha256 of url
+    url = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, ready, failed
+    path = db.Column(db.String(255))  # e.g. 'posts/<sha256 prefix>.jpg'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    fetched_at = db.Column(db.DateTime)
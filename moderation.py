@@ -0,0 +1,124 @@
+"""Batch moderation of pending jobs, events and posts.
+
+Each queue is one model plus the boolean column that marks it approved.
+``pending_page`` walks a queue by keyset cursor; ``approve`` and ``reject``
+act on a whole list of ids with a fixed number of set-based statements in
+the caller's transaction. Rejecting deletes the item, like the single-item
+admin delete routes do.
+"""
+import os
+
+from sqlalchemy import update, delete, select
+from sqlalchemy.orm import joinedload
+
+from models import db, Job, JobApplication, JobSignatureBand, Event, EventRegistration, Post, Comment, post_likes
+from job_fingerprints import find_duplicates
+from pagination import keyset_page
+from search_index import remove_from_applicant_index
+from media_store import release as release_media, post_image_path
+
+# Largest id list accepted per request
+MAX_BATCH = 1000
+
+QUEUES = {
+    # Jobs and posts are reviewed oldest first; events soonest first so they are
+    # approved before they start. Both orders are served by an index.
+    # ``cache_tags`` are the stats cache tags a batch of this kind invalidates.
+    'jobs': {'model': Job, 'flag': Job.is_confirmed, 'author': 'alumni', 'order_by': [(Job.id, False)],
+             'cache_tags': ('jobs', 'applications')},
+    'events': {'model': Event, 'flag': Event.is_published, 'author': 'creator',
+               'order_by': [(Event.start_time, False), (Event.id, False)],
+               'cache_tags': ('events',)},
+    'posts': {'model': Post, 'flag': Post.is_published, 'author': 'author', 'order_by': [(Post.id, False)],
+              'cache_tags': ('posts',)},
+}
+
+
+def _summary(kind, item):
+    author_name = getattr(item, QUEUES[kind]['author']).name
+    if kind == 'jobs':
+        return {'id': item.id, 'title': item.title, 'subtitle': item.company_name,
+                'created_at': item.created_at.isoformat() if item.created_at else None, 'author': author_name}
+    if kind == 'events':
+        return {'id': item.id, 'title': item.title, 'subtitle': item.location,
+                'start_time': item.start_time.isoformat(), 'author': author_name}
+    return {'id': item.id, 'title': item.content[:100], 'subtitle': None,
+            'created_at': item.created_at.isoformat() if item.created_at else None, 'author': author_name}
+
+
+def pending_page(kind, cursor=None, per_page=50):
+    """One page of the pending queue. Returns ``(items, next_cursor)`` with items as dicts."""
+    queue = QUEUES[kind]
+    model = queue['model']
+    query = model.query.options(joinedload(getattr(model, queue['author']))).filter(queue['flag'].is_(False))
+    items, next_cursor = keyset_page(query, queue['order_by'], cursor=cursor, per_page=per_page)
+    summaries = [_summary(kind, item) for item in items]
+    if kind == 'jobs':
+        duplicates = find_duplicates(items)
+        for summary in summaries:
+            summary['possible_duplicates'] = [match[0] for match in duplicates.get(summary['id'], [])]
+    return summaries, next_cursor
+
+
+def _pending_ids(kind, ids):
+    queue = QUEUES[kind]
+    model = queue['model']
+    return [item_id for (item_id,) in db.session.query(model.id).filter(model.id.in_(ids), queue['flag'].is_(False))]
+
+
+def approve(kind, ids):
+    """Approve the pending items among ``ids``. Does not commit. Returns the approved ids."""
+    queue = QUEUES[kind]
+    model = queue['model']
+    approved = _pending_ids(kind, ids)
+    if approved:
+        db.session.execute(
+            update(model)
+            .where(model.id.in_(approved), queue['flag'].is_(False))
+            .values({queue['flag'].key: True})
+            .execution_options(synchronize_session=False)
+        )
+    return approved
+
+
+def reject(kind, ids, upload_folder, resume_folder):
+    """Delete the pending items among ``ids`` with their dependent rows. Does not commit.
+
+    Returns ``(rejected_ids, file_paths)``; purge the files after the commit.
+    """
+    rejected = _pending_ids(kind, ids)
+    if not rejected:
+        return [], []
+
+    paths = []
+    if kind == 'jobs':
+        logos = db.session.query(Job.company_logo).filter(Job.id.in_(rejected), Job.company_logo.isnot(None))
+        paths += release_media(upload_folder, [f'company_logos/{logo}' for (logo,) in logos])
+        for (resume,) in db.session.query(JobApplication.resume_path).filter(
+                JobApplication.job_id.in_(rejected), JobApplication.resume_path.isnot(None)):
+            paths.append(os.path.join(resume_folder, resume))
+        remove_from_applicant_index(job_ids=rejected)
+        statements = [
+            delete(JobApplication).where(JobApplication.job_id.in_(rejected)),
+            delete(JobSignatureBand).where(JobSignatureBand.job_id.in_(rejected)),
+            delete(Job).where(Job.id.in_(rejected)),
+        ]
+    elif kind == 'events':
+        images = db.session.query(Event.image).filter(Event.id.in_(rejected), Event.image.isnot(None))
+        paths += release_media(upload_folder, [f'events/{image}' for (image,) in images])
+        statements = [
+            delete(EventRegistration).where(EventRegistration.event_id.in_(rejected)),
+            delete(Event).where(Event.id.in_(rejected)),
+        ]
+    else:
+        image_urls = db.session.query(Post.image_url).filter(Post.id.in_(rejected), Post.image_url.isnot(None))
+        paths += release_media(upload_folder, [post_image_path(image_url) for (image_url,) in image_urls])
+        post_ids = select(Post.id).where(Post.id.in_(rejected))
+        statements = [
+            delete(post_likes).where(post_likes.c.post_id.in_(post_ids)),
+            delete(Comment).where(Comment.post_id.in_(rejected)),
+            delete(Post).where(Post.id.in_(rejected)),
+        ]
+    for statement in statements:
+        db.session.execute(statement.execution_options(synchronize_session=False))
+    return rejected, paths
@@ -0,0 +1,64 @@
+"""Keyset (cursor) pagination helpers.
+
+A page is fetched with ``WHERE (sort keys) > (last row's sort keys)`` instead
+of OFFSET, so every page costs the same index range scan no matter how deep
+the user scrolls. The cursor handed to the client is an opaque, URL-safe
+encoding of the last row's sort key values.
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(values):
+    """Encode a tuple of sort key values as an opaque URL-safe token."""
+    payload = [{'$dt': v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a token made by encode_cursor. Returns None for a missing or malformed token."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        return [datetime.fromisoformat(v['$dt']) if isinstance(v, dict) else v for v in payload]
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+def keyset_page(query, order_by, cursor=None, per_page=20):
+    """Fetch one page of ``query`` ordered by ``order_by``.
+
+    ``order_by`` is a list of ``(column, descending)`` pairs that must end with
+    a unique column (usually the primary key) so the ordering is total.
+    Returns ``(items, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    values = decode_cursor(cursor)
+    if values is not None and len(values) == len(order_by):
+        # (a, b) after (x, y)  ==  a > x OR (a = x AND b > y), per column direction
+        clauses = []
+        for i, (column, descending) in enumerate(order_by):
+            equal_prefix = [c == v for (c, _), v in zip(order_by[:i], values[:i])]
+            step = column < values[i] if descending else column > values[i]
+            clauses.append(and_(*equal_prefix, step))
+        query = query.filter(or_(*clauses))
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column, descending in order_by])
+    rows = query.limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor([_row_value(last, column) for column, _ in order_by])
+    return rows, next_cursor
+
+
+def _row_value(row, column):
+    # ORM entities expose the mapped attribute; tuple rows expose the label
+    return getattr(row, column.key)
@@ -0,0 +1,45 @@
+"""Signed one-time links for setting a password.
+
+Accounts created by the bulk alumni import get a random password that nobody
+knows, and their welcome email carries a set-password link instead. The token
+is signed with SECRET_KEY and holds the user id and a digest of the user's
+current password hash, so nothing secret is stored. Setting a password
+changes the hash, which uses the link up. Links expire after
+``TOKEN_MAX_AGE``.
+"""
+import hashlib
+import hmac
+from datetime import timedelta
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+from models import db, User
+
+TOKEN_MAX_AGE = timedelta(days=14)
+_SALT = 'set-password'
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=_SALT)
+
+
+def _hash_digest(password_hash):
+    return hashlib.sha256(password_hash.encode('utf-8')).hexdigest()[:16]
+
+
+def make_set_password_token(user_id, password_hash):
+    """Token for the user's set-password link, valid while their password stays ``password_hash``."""
+    return _serializer().dumps([user_id, _hash_digest(password_hash)])
+
+
+def user_for_set_password_token(token):
+    """The User a token was issued to, or None if it is invalid, expired or already used."""
+    try:
+        user_id, digest = _serializer().loads(token, max_age=int(TOKEN_MAX_AGE.total_seconds()))
+    except (BadSignature, ValueError, TypeError):
+        return None
+    user = db.session.get(User, user_id) if isinstance(user_id, int) else None
+    if user is None or not isinstance(digest, str) or not hmac.compare_digest(_hash_digest(user.password), digest):
+        return None
+    return user
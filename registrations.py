@@ -0,0 +1,255 @@
+"""Event seat accounting: atomic capacity counter and FIFO waitlist.
+
+``Event.registered_count`` holds the number of active (registered or attended)
+registrations. Seats are claimed with a single conditional UPDATE so two
+requests can never take the last seat, and every status change goes through
+this module so the counter stays in step with the registration rows.
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import update, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models import db, User, Event, EventRegistration
+from analytics import record_stat, EVENT_REGISTRATIONS
+from write_queue import write_now
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('registered', 'attended')
+REGISTRATION_STATUSES = ('registered', 'waitlisted', 'canceled', 'attended')
+
+# register_for_event() outcomes
+REGISTERED = 'registered'
+WAITLISTED = 'waitlisted'
+ALREADY_REGISTERED = 'already_registered'
+ALREADY_WAITLISTED = 'already_waitlisted'
+
+
+def claim_seat(event_id):
+    """Take one seat if any is left. Returns True when the seat was taken."""
+    result = db.session.execute(
+        update(Event)
+        .where(Event.id == event_id)
+        .where((Event.capacity.is_(None)) | (Event.registered_count < Event.capacity))
+        # Seat counting is not an edit of the event, leave updated_at alone
+        .values(registered_count=Event.registered_count + 1, updated_at=Event.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def release_seat(event_id):
+    """Give back one seat."""
+    db.session.execute(
+        update(Event)
+        .where(Event.id == event_id, Event.registered_count > 0)
+        .values(registered_count=Event.registered_count - 1, updated_at=Event.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _register(event_id, user_id):
+    """The writes of register_for_event. Does not commit; raises IntegrityError when a concurrent request won."""
+    existing = EventRegistration.query.filter_by(event_id=event_id, user_id=user_id).first()
+    if existing and existing.status in ACTIVE_STATUSES:
+        return ALREADY_REGISTERED
+    if existing and existing.status == 'waitlisted':
+        return ALREADY_WAITLISTED
+
+    # The seat claim is the first write of the transaction, so SQLite takes
+    # the write lock here and the rest of the registration runs serialized.
+    status = REGISTERED if claim_seat(event_id) else WAITLISTED
+    if existing:
+        # Re-registering after a cancellation joins the back of the queue.
+        # Guard on the old status so a double submit cannot claim two seats.
+        result = db.session.execute(
+            update(EventRegistration)
+            .where(EventRegistration.id == existing.id, EventRegistration.status == existing.status)
+            .values(status=status, created_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            raise IntegrityError('re-registration raced', None, None)
+        # created_at moved to today, and so does the row in the daily rollup
+        record_stat(EVENT_REGISTRATIONS, delta=-1, day=existing.created_at)
+    else:
+        db.session.add(EventRegistration(event_id=event_id, user_id=user_id, status=status))
+        db.session.flush()
+    record_stat(EVENT_REGISTRATIONS)
+    return status
+
+
+def register_for_event(event_id, user_id, run_write=write_now):
+    """Register a user, or put them on the waitlist when the event is full.
+
+    Commits on success; ``run_write`` may be a WriteQueue's ``run`` to have
+    the writer thread do it. Returns one of REGISTERED, WAITLISTED,
+    ALREADY_REGISTERED or ALREADY_WAITLISTED.
+    """
+    try:
+        return run_write(_register, event_id, user_id)
+    except IntegrityError:
+        # A concurrent request for the same user won the unique constraint;
+        # rolling back also returned the seat claimed with it.
+        db.session.rollback()
+        current = EventRegistration.query.filter_by(event_id=event_id, user_id=user_id).first()
+        if current and current.status == 'waitlisted':
+            return ALREADY_WAITLISTED
+        return ALREADY_REGISTERED
+
+
+def promote_waitlist(event_id):
+    """Move waitlisted users into free seats, oldest first. Does not commit.
+
+    Returns the promoted registrations.
+    """
+    promoted = []
+    while True:
+        candidate = EventRegistration.query.filter_by(event_id=event_id, status='waitlisted') \
+            .order_by(EventRegistration.created_at.asc(), EventRegistration.id.asc()).first()
+        if not candidate or not claim_seat(event_id):
+            break
+        candidate.status = 'registered'
+        db.session.flush()
+        promoted.append(candidate)
+    for registration in promoted:
+        logger.info(f"Promoted user {registration.user_id} from waitlist of event {event_id}")
+    return promoted
+
+
+def change_registration_status(registration, new_status):
+    """Apply a status change and keep the seat counter and waitlist consistent.
+
+    Does not commit. Returns False when the change needs a seat and the
+    event is full, or when the registration was changed concurrently.
+    """
+    old_status = registration.status
+    if new_status == old_status:
+        return True
+
+    # Guarded on the status we read, so the same change can't be applied twice
+    if not _set_status(registration, old_status, new_status):
+        db.session.refresh(registration)
+        return registration.status == new_status
+
+    was_active = old_status in ACTIVE_STATUSES
+    is_active = new_status in ACTIVE_STATUSES
+    if is_active and not was_active and not claim_seat(registration.event_id):
+        _set_status(registration, new_status, old_status)
+        return False
+    if was_active and not is_active:
+        release_seat(registration.event_id)
+        promote_waitlist(registration.event_id)
+    return True
+
+
+def _set_status(registration, old_status, new_status):
+    result = db.session.execute(
+        update(EventRegistration)
+        .where(EventRegistration.id == registration.id, EventRegistration.status == old_status)
+        .values(status=new_status)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 1:
+        set_committed_value(registration, 'status', new_status)
+        return True
+    return False
+
+
+def cancel_registration(registration):
+    """Cancel a registration and hand its seat to the waitlist. Does not commit."""
+    change_registration_status(registration, 'canceled')
+
+
+def waitlist_position(registration):
+    """1-based position of a waitlisted registration, or None."""
+    if registration is None or registration.status != 'waitlisted':
+        return None
+    ahead = EventRegistration.query.filter(
+        EventRegistration.event_id == registration.event_id,
+        EventRegistration.status == 'waitlisted',
+        (EventRegistration.created_at < registration.created_at) |
+        ((EventRegistration.created_at == registration.created_at) & (EventRegistration.id < registration.id))
+    ).count()
+    return ahead + 1
+
+
+def recount_registrations(event_id=None, event_ids=None):
+    """Recompute registered_count from the registration rows, for one event, a list, or all.
+
+    Does not commit.
+    """
+    active = db.session.query(func.count(EventRegistration.id)).filter(
+        EventRegistration.event_id == Event.id,
+        EventRegistration.status.in_(ACTIVE_STATUSES)
+    ).scalar_subquery()
+    stmt = update(Event).values(registered_count=active, updated_at=Event.updated_at) \
+        .execution_options(synchronize_session=False)
+    if event_id is not None:
+        stmt = stmt.where(Event.id == event_id)
+    if event_ids is not None:
+        stmt = stmt.where(Event.id.in_(event_ids))
+    db.session.execute(stmt)
+
+
+# Keeps each IN (...) list well under SQLite's bound-parameter limit
+CHECK_IN_CHUNK = 900
+
+
+def _chunks(items, size=CHECK_IN_CHUNK):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def bulk_check_in(event_id, registration_ids=(), emails=()):
+    """Mark many registrations of one event as attended in a single transaction.
+
+    Registrations are looked up by id and/or by the registrant's email in one
+    batched query per chunk. Only registered (or already attended) rows are
+    checked in; waitlisted and canceled ones are reported as unmatched.
+    Does not commit. Returns ``(matched, unmatched)`` lists of dicts.
+    """
+    wanted_ids = {int(i) for i in registration_ids}
+    wanted_emails = {e.strip().lower() for e in emails if e and e.strip()}
+
+    found = {}
+    lookup = db.session.query(EventRegistration.id, EventRegistration.status, User.email, User.name) \
+        .join(User, User.id == EventRegistration.user_id) \
+        .filter(EventRegistration.event_id == event_id)
+    for chunk in _chunks(sorted(wanted_ids)):
+        for row in lookup.filter(EventRegistration.id.in_(chunk)):
+            found[row.id] = row
+    for chunk in _chunks(sorted(wanted_emails)):
+        for row in lookup.filter(func.lower(User.email).in_(chunk)):
+            found[row.id] = row
+
+    matched = []
+    unmatched = []
+    to_update = []
+    for row in found.values():
+        if row.status in ACTIVE_STATUSES:
+            matched.append({'registration_id': row.id, 'email': row.email, 'name': row.name,
+                            'previous_status': row.status})
+            if row.status != 'attended':
+                to_update.append(row.id)
+        else:
+            unmatched.append({'value': row.email, 'registration_id': row.id,
+                              'reason': f'status is {row.status}'})
+
+    found_ids = set(found)
+    found_emails = {row.email.lower() for row in found.values()}
+    unmatched += [{'value': i, 'reason': 'registration not found'} for i in sorted(wanted_ids - found_ids)]
+    unmatched += [{'value': e, 'reason': 'email not registered'} for e in sorted(wanted_emails - found_emails)]
+
+    # registered -> attended keeps the seat, so registered_count is unchanged
+    for chunk in _chunks(to_update):
+        db.session.execute(
+            update(EventRegistration)
+            .where(EventRegistration.id.in_(chunk), EventRegistration.status == 'registered')
+            .values(status='attended')
+            .execution_options(synchronize_session=False)
+        )
+    return matched, unmatched
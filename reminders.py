@@ -0,0 +1,238 @@
+"""Event reminder emails through a persistent outbox.
+
+``enqueue_event_reminders`` finds events starting inside each reminder window
+and writes one OutboxEmail per active registration. ``drain_outbox`` sends
+pending rows in batches over a single SMTP connection.
+
+A batch is claimed (``claimed``, tagged with ``claimed_by`` and
+``claimed_at``) before connecting, and every row's status is committed on its
+own: ``sending`` right before its SMTP command, then ``sent``, ``pending``
+for a retry or ``failed``. Delivery is at-most-once. When a sender dies,
+``recover_interrupted`` (run by every reminder command) only touches its rows
+once their claim is older than the stale timeout. Claimed rows it never got
+to go back to ``pending``. The one row it was sending may already have gone
+out, so it is marked failed for inspection instead of being sent twice.
+Every status change is conditional on the claim, so rows handed back
+this way are left alone by a sender that turns out to be alive.
+"""
+import logging
+import os
+import smtplib
+import socket
+import uuid
+from datetime import datetime, timedelta, UTC
+
+from flask_mail import Message
+from sqlalchemy import update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, User, Event, EventRegistration, OutboxEmail
+from registrations import ACTIVE_STATUSES
+
+logger = logging.getLogger(__name__)
+
+KIND_EVENT_REMINDER = 'event_reminder'
+DEFAULT_WINDOWS = (timedelta(hours=24), timedelta(hours=1))
+MAX_ATTEMPTS = 5
+DEFAULT_STALE_SECONDS = 900
+INTERRUPTED_ERROR = 'Interrupted while sending; not retried to avoid duplicates'
+
+
+def _window_label(window):
+    hours = int(window.total_seconds() // 3600)
+    return f'{hours}h' if hours else f'{int(window.total_seconds() // 60)}m'
+
+
+def _reminder_text(user_name, event, window_label, event_url):
+    start = event.start_time.replace(tzinfo=UTC) + timedelta(hours=7)  # Vietnam time
+    subject = f'Nhắc lịch: {event.title} bắt đầu lúc {start.strftime("%H:%M %d/%m/%Y")}'
+    body = (
+        f'Chào {user_name},\n\n'
+        f'Sự kiện "{event.title}" mà bạn đã đăng ký sẽ bắt đầu trong khoảng {window_label} nữa.\n\n'
+        f'Thời gian: {start.strftime("%H:%M %d/%m/%Y")}\n'
+        f'Địa điểm: {event.location}\n'
+    )
+    if event_url:
+        body += f'Chi tiết: {event_url}\n'
+    body += '\nHẹn gặp bạn tại sự kiện!\nFIT Alumni'
+    return subject, body
+
+
+def enqueue_event_reminders(windows=DEFAULT_WINDOWS, now=None, event_url=None):
+    """Enqueue reminders for events starting inside the configured windows.
+
+    Each event only falls into its smallest matching window, so an event 30
+    minutes away gets the 1h reminder and not also the 24h one. Safe to run
+    repeatedly: the dedupe key makes re-enqueueing a no-op. Commits and
+    returns the number of new outbox rows.
+    """
+    now = now or datetime.now(UTC)
+    windows = sorted(windows)
+    created = 0
+    lower = timedelta(0)
+    for window in windows:
+        label = _window_label(window)
+        rows = db.session.query(EventRegistration.id, User.name, User.email, Event) \
+            .join(Event, Event.id == EventRegistration.event_id) \
+            .join(User, User.id == EventRegistration.user_id) \
+            .filter(Event.is_published.is_(True),
+                    EventRegistration.status.in_(ACTIVE_STATUSES),
+                    Event.start_time > now + lower,
+                    Event.start_time <= now + window) \
+            .all()
+        lower = window
+
+        values = []
+        for registration_id, user_name, email, event in rows:
+            subject, body = _reminder_text(user_name, event, label, event_url(event.id) if event_url else None)
+            values.append({
+                'dedupe_key': f'{KIND_EVENT_REMINDER}:{label}:{registration_id}',
+                'kind': KIND_EVENT_REMINDER,
+                'recipient': email,
+                'subject': subject,
+                'body': body,
+                'status': 'pending',
+                'attempts': 0,
+                'next_attempt_at': now.replace(tzinfo=None),
+                'created_at': now.replace(tzinfo=None),
+            })
+        if values:
+            # Core execution on the session's connection reports the inserted row count
+            result = db.session.connection().execute(
+                sqlite_insert(OutboxEmail).on_conflict_do_nothing(index_elements=['dedupe_key']),
+                values
+            )
+            created += max(result.rowcount, 0)
+    db.session.commit()
+    return created
+
+
+def recover_interrupted(stale_after=DEFAULT_STALE_SECONDS, now=None):
+    """Hand back rows claimed more than ``stale_after`` seconds ago by a sender that stopped. Commits.
+
+    Rows it never started are requeued; the row it was sending is marked
+    failed, never resent. Returns ``(requeued, failed)``.
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=stale_after)
+    requeued = db.session.execute(
+        update(OutboxEmail)
+        .where(OutboxEmail.status == 'claimed', OutboxEmail.claimed_at < cutoff)
+        .values(status='pending', claimed_by=None, claimed_at=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    failed = db.session.execute(
+        update(OutboxEmail)
+        .where(OutboxEmail.status == 'sending', OutboxEmail.claimed_at < cutoff)
+        .values(status='failed', claimed_by=None, last_error=INTERRUPTED_ERROR)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return requeued, failed
+
+
+def _claim_batch(batch_size, now):
+    ids = [row_id for (row_id,) in db.session.query(OutboxEmail.id)
+           .filter(OutboxEmail.status == 'pending', OutboxEmail.next_attempt_at <= now)
+           .order_by(OutboxEmail.id)
+           .limit(batch_size)]
+    if not ids:
+        return None, []
+    token = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:12]}'[:64]
+    # Conditional on status so two senders never claim the same row
+    db.session.execute(
+        update(OutboxEmail)
+        .where(OutboxEmail.id.in_(ids), OutboxEmail.status == 'pending')
+        .values(status='claimed', claimed_by=token, claimed_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    batch = db.session.query(OutboxEmail.id, OutboxEmail.recipient, OutboxEmail.subject,
+                             OutboxEmail.body, OutboxEmail.attempts) \
+        .filter(OutboxEmail.claimed_by == token, OutboxEmail.status == 'claimed') \
+        .order_by(OutboxEmail.id).all()
+    return token, batch
+
+
+def _set_status(item_id, token, from_statuses, **values):
+    """Commit a status change of a row this sender still holds. Returns False if it was handed back."""
+    result = db.session.execute(
+        update(OutboxEmail)
+        .where(OutboxEmail.id == item_id, OutboxEmail.claimed_by == token,
+               OutboxEmail.status.in_(from_statuses))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _retry_values(attempts, error, now):
+    attempts += 1
+    values = {'attempts': attempts, 'last_error': str(error)[:2000], 'claimed_by': None, 'claimed_at': None}
+    if attempts >= MAX_ATTEMPTS:
+        values['status'] = 'failed'
+    else:
+        values['status'] = 'pending'
+        values['next_attempt_at'] = now + timedelta(minutes=2 ** attempts)
+    return values
+
+
+def _connection_lost(error):
+    # SMTPException derives from OSError, but only socket-level errors kill the connection
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+def drain_outbox(mail, batch_size=50, max_batches=None, sender=None):
+    """Send pending outbox emails, ``batch_size`` per SMTP connection.
+
+    Returns a dict with sent, retried and failed counts.
+    """
+    stats = {'sent': 0, 'retried': 0, 'failed': 0}
+
+    def record(item_id, token, from_statuses, values):
+        if _set_status(item_id, token, from_statuses, **values):
+            stats[{'sent': 'sent', 'failed': 'failed'}.get(values['status'], 'retried')] += 1
+
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        now = datetime.utcnow()
+        token, batch = _claim_batch(batch_size, now)
+        if not batch:
+            break
+        batches += 1
+
+        remaining = list(batch)
+        try:
+            with mail.connect() as connection:
+                while remaining:
+                    item = remaining[0]
+                    # Committed before the SMTP command, so a crash cannot lead to a second copy
+                    if not _set_status(item.id, token, ('claimed',), status='sending', claimed_at=datetime.utcnow()):
+                        remaining.pop(0)
+                        continue
+                    message = Message(subject=item.subject, recipients=[item.recipient],
+                                      body=item.body, sender=sender)
+                    try:
+                        connection.send(message)
+                    except Exception as e:
+                        if _connection_lost(e):
+                            # The rest of the batch is retried on a new connection
+                            raise
+                        logger.warning(f"Outbox email {item.id} rejected: {e}")
+                        record(item.id, token, ('sending',), _retry_values(item.attempts, e, now))
+                    else:
+                        record(item.id, token, ('sending',),
+                               {'status': 'sent', 'sent_at': datetime.utcnow(), 'attempts': item.attempts + 1})
+                    remaining.pop(0)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"SMTP connection failed, releasing {len(remaining)} outbox emails: {e}")
+            for item in remaining:
+                # The server may have accepted the message in flight, so it is not sent again
+                record(item.id, token, ('sending',), {'status': 'failed', 'attempts': item.attempts + 1,
+                                                      'last_error': INTERRUPTED_ERROR,
+                                                      'claimed_by': None, 'claimed_at': None})
+                record(item.id, token, ('claimed',), _retry_values(item.attempts, e, now))
+    return stats
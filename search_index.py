@@ -0,0 +1,246 @@
+"""Full-text indexes: recruiter-side applicant search and admin user search.
+
+Each row of the ``applicant_search`` FTS5 table mirrors one JobApplication
+(rowid == application id) together with the applicant's name, email, skills,
+education and experience, so a job's applicants can be filtered by any of
+them without scanning the profile tables on every request.
+
+``user_name_search`` indexes ``user.name`` (rowid == user id) and is kept in
+sync by triggers, so every write path, raw SQL included, updates it.
+"""
+import logging
+import re
+
+from sqlalchemy import text, select, column, table, func, or_
+
+from models import db, User, JobApplication, Skill, Education, Experience
+
+logger = logging.getLogger(__name__)
+
+APPLICANT_INDEX = 'applicant_search'
+
+# unicode61 with remove_diacritics folds "Nguyễn" and "nguyen" to the same token;
+# "đ" is folded by fold_text before indexing. job_id is indexed so a search
+# reads only the postings of one job instead of matching across all jobs.
+APPLICANT_INDEX_DDL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {APPLICANT_INDEX} USING fts5(
+    job_id,
+    user_id UNINDEXED,
+    name,
+    email,
+    cover_letter,
+    skills,
+    education,
+    experience,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+APPLICANT_TEXT_COLUMNS = ('name', 'email', 'cover_letter', 'skills', 'education', 'experience')
+
+USER_NAME_INDEX = 'user_name_search'
+
+# remove_diacritics folds "ễ" to "e", but "đ" is a separate letter in Unicode
+# with no decomposition, so text is folded to "d" before indexing and querying
+# (fold_text in Python, _FOLD_D_SQL in the triggers)
+_FOLD_D_SQL = "replace(replace({}, 'Đ', 'D'), 'đ', 'd')"
+
+USER_NAME_INDEX_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {USER_NAME_INDEX} USING fts5(
+        name,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_name_search_ai AFTER INSERT ON user BEGIN
+        INSERT INTO {USER_NAME_INDEX} (rowid, name) VALUES (new.id, {_FOLD_D_SQL.format('new.name')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_name_search_ad AFTER DELETE ON user BEGIN
+        DELETE FROM {USER_NAME_INDEX} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_name_search_au AFTER UPDATE OF name ON user BEGIN
+        DELETE FROM {USER_NAME_INDEX} WHERE rowid = old.id;
+        INSERT INTO {USER_NAME_INDEX} (rowid, name) VALUES (new.id, {_FOLD_D_SQL.format('new.name')});
+    END""",
+]
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fold_text(value):
+    """Fold "Đ"/"đ" to "D"/"d", which the FTS tokenizer's remove_diacritics leaves alone."""
+    return (value or '').replace('Đ', 'D').replace('đ', 'd')
+
+
+def ensure_applicant_index(connection=None):
+    """Create the FTS table if it does not exist yet."""
+    executor = connection if connection is not None else db.session
+    executor.execute(text(APPLICANT_INDEX_DDL))
+
+
+def _profile_documents(user_ids):
+    """Build the searchable profile text for many users with one query per table."""
+    user_ids = list(set(user_ids))
+    docs = {uid: {'name': '', 'email': '', 'skills': [], 'education': [], 'experience': []}
+            for uid in user_ids}
+    if not user_ids:
+        return docs
+
+    for uid, name, email in db.session.query(User.id, User.name, User.email).filter(User.id.in_(user_ids)):
+        docs[uid]['name'] = name or ''
+        docs[uid]['email'] = email or ''
+
+    for uid, name in db.session.query(Skill.user_id, Skill.name).filter(Skill.user_id.in_(user_ids)):
+        docs[uid]['skills'].append(name or '')
+
+    rows = db.session.query(Education.user_id, Education.school, Education.major, Education.degree) \
+        .filter(Education.user_id.in_(user_ids))
+    for uid, school, major, degree in rows:
+        docs[uid]['education'].append(' '.join(filter(None, [school, major, degree])))
+
+    rows = db.session.query(Experience.user_id, Experience.position, Experience.company, Experience.description) \
+        .filter(Experience.user_id.in_(user_ids))
+    for uid, position, company, description in rows:
+        docs[uid]['experience'].append(' '.join(filter(None, [position, company, description])))
+
+    return docs
+
+
+def index_applications(applications):
+    """Insert or refresh index rows for the given JobApplication objects."""
+    applications = [a for a in applications if a.id is not None]
+    if not applications:
+        return
+
+    docs = _profile_documents(a.user_id for a in applications)
+    remove_from_applicant_index(application_ids=[a.id for a in applications])
+    db.session.execute(
+        text(f"""INSERT INTO {APPLICANT_INDEX}
+                 (rowid, job_id, user_id, name, email, cover_letter, skills, education, experience)
+                 VALUES (:id, :job_id, :user_id, :name, :email, :cover_letter, :skills, :education, :experience)"""),
+        [{
+            'id': a.id,
+            'job_id': a.job_id,
+            'user_id': a.user_id,
+            'name': fold_text(docs[a.user_id]['name']),
+            'email': fold_text(docs[a.user_id]['email']),
+            'cover_letter': fold_text(a.cover_letter),
+            'skills': fold_text(', '.join(docs[a.user_id]['skills'])),
+            'education': fold_text('\n'.join(docs[a.user_id]['education'])),
+            'experience': fold_text('\n'.join(docs[a.user_id]['experience'])),
+        } for a in applications]
+    )
+
+
+def reindex_user(user_id):
+    """Refresh every application of a user after their profile changed."""
+    db.session.flush()
+    applications = JobApplication.query.filter_by(user_id=user_id).all()
+    index_applications(applications)
+
+
+def remove_from_applicant_index(application_ids=None, job_id=None, user_id=None, alumni_id=None, job_ids=None):
+    """Drop index rows by application id, by job or jobs, by applicant, or by the job poster."""
+    if application_ids:
+        ids = list(application_ids)
+        placeholders = ', '.join(f':id{i}' for i in range(len(ids)))
+        db.session.execute(
+            text(f"DELETE FROM {APPLICANT_INDEX} WHERE rowid IN ({placeholders})"),
+            {f'id{i}': v for i, v in enumerate(ids)}
+        )
+    if job_id is not None:
+        db.session.execute(text(f"DELETE FROM {APPLICANT_INDEX} WHERE job_id = :job_id"), {'job_id': job_id})
+    if job_ids:
+        ids = list(job_ids)
+        placeholders = ', '.join(f':job{i}' for i in range(len(ids)))
+        db.session.execute(
+            text(f"DELETE FROM {APPLICANT_INDEX} WHERE job_id IN ({placeholders})"),
+            {f'job{i}': v for i, v in enumerate(ids)}
+        )
+    if user_id is not None:
+        db.session.execute(text(f"DELETE FROM {APPLICANT_INDEX} WHERE user_id = :user_id"), {'user_id': user_id})
+    if alumni_id is not None:
+        db.session.execute(
+            text(f"DELETE FROM {APPLICANT_INDEX} WHERE job_id IN (SELECT id FROM job WHERE alumni_id = :alumni_id)"),
+            {'alumni_id': alumni_id}
+        )
+
+
+def rebuild_applicant_index(batch_size=500):
+    """Rebuild the whole index from scratch. Returns the number of indexed applications."""
+    ensure_applicant_index()
+    db.session.execute(text(f"DELETE FROM {APPLICANT_INDEX}"))
+    total = 0
+    last_id = 0
+    while True:
+        batch = JobApplication.query.filter(JobApplication.id > last_id) \
+            .order_by(JobApplication.id).limit(batch_size).all()
+        if not batch:
+            break
+        index_applications(batch)
+        total += len(batch)
+        last_id = batch[-1].id
+    db.session.commit()
+    return total
+
+
+def match_expression(search):
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    tokens = _TOKEN_RE.findall(fold_text(search))
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def applicant_search_clause(job_id, search):
+    """SQL clause restricting JobApplication rows of a job to those matching ``search``.
+
+    Returns None when the search text has no indexable words.
+    """
+    expression = match_expression(search)
+    if not expression:
+        return None
+    # The search words only count in the text columns, so "42" does not match every applicant of job 42
+    expression = f'job_id : "{int(job_id)}" AND {{{" ".join(APPLICANT_TEXT_COLUMNS)}}} : ({expression})'
+    fts = table(APPLICANT_INDEX, column('rowid'))
+    matching_ids = select(fts.c.rowid).where(
+        text(f"{APPLICANT_INDEX} MATCH :match").bindparams(match=expression)
+    )
+    return JobApplication.id.in_(matching_ids)
+
+
+def ensure_user_name_index(connection=None):
+    """Create the user name FTS table and its sync triggers if missing."""
+    executor = connection if connection is not None else db.session
+    for statement in USER_NAME_INDEX_DDL:
+        executor.execute(text(statement))
+
+
+def rebuild_user_name_index():
+    """Repopulate the user name index from the user table."""
+    ensure_user_name_index()
+    db.session.execute(text(f"DELETE FROM {USER_NAME_INDEX}"))
+    db.session.execute(text(f"INSERT INTO {USER_NAME_INDEX} (rowid, name) "
+                            f"SELECT id, {_FOLD_D_SQL.format('name')} FROM user"))
+    db.session.commit()
+
+
+def email_prefix_clause(prefix):
+    """Case-insensitive ``email LIKE 'prefix%'`` as a range on the lower(email) index."""
+    prefix = prefix.strip().lower()
+    return (func.lower(User.email) >= prefix) & (func.lower(User.email) < prefix + '\U0010ffff')
+
+
+def user_search_clause(search):
+    """Match users whose name has every word as a prefix, ignoring diacritics,
+    or whose email starts with ``search``. Returns None for empty input.
+    """
+    search = (search or '').strip()
+    if not search:
+        return None
+    if '@' in search:
+        return email_prefix_clause(search)
+
+    clauses = [email_prefix_clause(search)]
+    expression = match_expression(search)
+    if expression:
+        fts = table(USER_NAME_INDEX, column('rowid'))
+        clauses.append(User.id.in_(
+            select(fts.c.rowid).where(text(f"{USER_NAME_INDEX} MATCH :name_match").bindparams(name_match=expression))
+        ))
+    return or_(*clauses)
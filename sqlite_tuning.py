@@ -0,0 +1,86 @@
+"""Connection settings for the SQLite database.
+
+Out of the box every connection ran in rollback-journal mode with SQLite's
+default cache, so a writer locked readers out of the whole file and
+concurrent writers under gunicorn failed with "database is locked".
+``configure_engine`` registers a ``connect`` listener that runs the PRAGMAs
+in ``SQLITE_PRAGMAS`` on every new DBAPI connection:
+
+- ``journal_mode=WAL``: readers keep reading the last committed state while
+  one writer appends to the write-ahead log. The mode is stored in the
+  database file, and ``alumni.db-wal``/``alumni.db-shm`` appear next to it.
+- ``busy_timeout``: milliseconds a connection waits for the write lock
+  before giving up with "database is locked".
+- ``synchronous=NORMAL``: with WAL, commits no longer fsync; a power loss
+  can drop the last transactions but never corrupts the file.
+- ``cache_size`` (negative: KiB), ``mmap_size`` (bytes) and ``temp_store``
+  keep hot pages, memory-mapped reads and sort/temp tables in memory.
+
+A value of None leaves that PRAGMA at SQLite's default. Other databases
+are left alone.
+"""
+import logging
+import re
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# busy_timeout first, so switching the journal mode waits for other connections' locks
+PRAGMA_ORDER = ('busy_timeout', 'journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store')
+DEFAULT_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+_VALUE_RE = re.compile(r'^-?\w+$')
+
+
+def _statements(pragmas):
+    unknown = set(pragmas) - set(PRAGMA_ORDER)
+    if unknown:
+        raise ValueError(f"Unsupported SQLite PRAGMAs: {', '.join(sorted(unknown))}")
+    statements = []
+    for name in PRAGMA_ORDER:
+        value = pragmas.get(name)
+        if value is None:
+            continue
+        if not _VALUE_RE.match(str(value)):
+            raise ValueError(f'Invalid value for PRAGMA {name}: {value!r}')
+        statements.append((name, f'PRAGMA {name} = {value}'))
+    return statements
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    """Run ``pragmas`` on a raw sqlite3 connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, statement in _statements(pragmas):
+            cursor.execute(statement)
+            if name == 'journal_mode':
+                mode = cursor.fetchone()[0]
+                # In-memory databases and some network filesystems cannot use WAL
+                if mode.lower() != str(pragmas[name]).lower():
+                    logger.warning(f"SQLite kept journal_mode={mode} instead of {pragmas[name]}")
+    finally:
+        cursor.close()
+
+
+def configure_engine(engine, pragmas):
+    """Apply ``pragmas`` to every connection ``engine`` opens from now on.
+
+    Call it before the engine hands out its first connection; connections
+    already in the pool keep their settings. Invalid settings raise
+    ValueError here rather than on the first query.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = dict(pragmas or {})
+    _statements(pragmas)
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
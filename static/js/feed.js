@@ -0,0 +1,177 @@
+/**
+ * FIT-Alumni Bảng tin
+ * Thích, bình luận và xóa bài viết trên trang bảng tin (cần jQuery)
+ */
+$(document).ready(function() {
+    // Toggle like for posts
+    $('.like-btn').on('click', function() {
+        var postId = $(this).data('post-id');
+        var likeBtn = $(this);
+        var likesCountElement = likeBtn.find('.likes-count');
+
+        $.ajax({
+            url: '/social/posts/' + postId + '/toggle_like',
+            type: 'POST',
+            success: function(response) {
+                if (response.success) {
+                    // Update the like count
+                    likesCountElement.text(response.likes_count);
+
+                    // Toggle the heart icon color
+                    var heartIcon = likeBtn.find('i.fas.fa-heart');
+                    heartIcon.toggleClass('text-danger');
+                }
+            },
+            error: function(xhr) {
+                console.error('Error toggling like:', xhr.responseText);
+                alert('Có lỗi xảy ra khi thích bài viết. Vui lòng thử lại sau.');
+            }
+        });
+    });
+
+    // Comment button to focus on comment input
+    $('.comment-btn').on('click', function() {
+        var postId = $(this).data('post-id');
+        $('#comments-' + postId + ' .comment-input').focus();
+    });
+
+    // Reply to comment
+    $(document).on('click', '.comment-action-btn.reply', function() {
+        var commentId = $(this).data('comment-id');
+        var authorName = $(this).data('author');
+        var postId = $(this).data('post-id');
+        var commentInput = $('#comments-' + postId + ' .comment-input');
+
+        // Add @ mention to comment input
+        commentInput.val('@' + authorName + ' ').focus();
+    });
+
+    // Delete comment
+    $(document).on('click', '.comment-action-btn.delete', function() {
+        var commentId = $(this).data('comment-id');
+        var commentElement = $('#comment-' + commentId);
+        var postId = $(this).closest('.post-card').find('.comment-form').data('post-id');
+
+        if (confirm('Bạn có chắc chắn muốn xóa bình luận này không?')) {
+            $.ajax({
+                url: '/social/comments/' + commentId + '/delete',
+                type: 'POST',
+                success: function(response) {
+                    if (response.success) {
+                        // Remove the comment with animation
+                        commentElement.fadeOut(300, function() {
+                            $(this).remove();
+
+                            // Update comment count
+                            var postId = response.post_id;
+                            var commentCount = $('#comments-' + postId + ' .comments-container .comment-item').length;
+
+                            // Update header text
+                            $('#comments-' + postId + ' .comments-header h6').html(
+                                '<i class="fas fa-comments me-2"></i>Bình luận (' + commentCount + ')'
+                            );
+
+                            // Remove header if no comments
+                            if (commentCount === 0) {
+                                $('#comments-' + postId + ' .comments-header').remove();
+                            }
+                        });
+                    }
+                },
+                error: function(xhr) {
+                    console.error('Error deleting comment:', xhr.responseText);
+                    alert('Có lỗi xảy ra khi xóa bình luận. Vui lòng thử lại sau.');
+                }
+            });
+        }
+    });
+
+    // Submit comment form
+    $('.comment-form').on('submit', function(e) {
+        e.preventDefault();
+        var form = $(this);
+        var postId = form.data('post-id');
+        var commentInput = form.find('.comment-input');
+        var content = commentInput.val().trim();
+        var commentsContainer = $('#comments-' + postId + ' .comments-container');
+
+        if (!content) {
+            return; // Don't submit empty comments
+        }
+
+        $.ajax({
+            url: '/social/posts/' + postId + '/comments',
+            type: 'POST',
+            contentType: 'application/json',
+            data: JSON.stringify({ content: content }),
+            success: function(response) {
+                if (response.success) {
+                    // Clear the input
+                    commentInput.val('');
+
+                    // Get the count of comments
+                    var commentCount = commentsContainer.children().length + 1;
+
+                    // If this is the first comment, add the header
+                    if (commentCount === 1) {
+                        $('#comments-' + postId).prepend(`
+                            <div class="comments-header my-3">
+                                <h6 class="fw-bold"><i class="fas fa-comments me-2"></i>Bình luận (1)</h6>
+                                <div class="comments-sort">
+                                    <small class="text-muted"><i class="fas fa-sort me-1"></i>Mới nhất</small>
+                                </div>
+                            </div>
+                        `);
+                    } else {
+                        // Update the count in the header
+                        $('#comments-' + postId + ' .comments-header h6').html(
+                            '<i class="fas fa-comments me-2"></i>Bình luận (' + commentCount + ')'
+                        );
+                    }
+
+                    // Create the new comment HTML
+                    var newCommentHtml = `
+                        <div class="d-flex comment-item" id="comment-${response.comment_id}">
+                            <img src="${response.avatar_url || '/static/images/default-avatar.png'}" class="rounded-circle me-3 avatar" width="40" height="40">
+                            <div class="comment-content flex-grow-1">
+                                <div class="comment-meta">
+                                    <span class="comment-author">${response.user_name}</span>
+                                    <span class="comment-time">${response.created_at}</span>
+                                </div>
+                                <p class="comment-text">${content}</p>
+
+                                <div class="comment-actions">
+                                    <button type="button" class="comment-action-btn reply" data-comment-id="${response.comment_id}" data-author="${response.user_name}" data-post-id="${response.post_id}">
+                                        <i class="fas fa-reply me-1"></i> Trả lời
+                                    </button>
+                                    <button type="button" class="comment-action-btn delete" data-comment-id="${response.comment_id}">
+                                        <i class="fas fa-trash-alt me-1"></i> Xóa
+                                    </button>
+                                </div>
+                            </div>
+                        </div>
+                    `;
+
+                    // Add the new comment to the container with animation
+                    commentsContainer.prepend(newCommentHtml);
+                    $('#comment-' + response.comment_id).hide().fadeIn(500);
+
+                    // Scroll to the new comment
+                    commentsContainer.animate({
+                        scrollTop: 0
+                    }, 500);
+                }
+            },
+            error: function(xhr) {
+                console.error('Error adding comment:', xhr.responseText);
+                alert('Có lỗi xảy ra khi thêm bình luận. Vui lòng thử lại sau.');
+            }
+        });
+    });
+
+    // Delete post confirmation
+    $('.delete-post-confirm').on('click', function() {
+        var postId = $(this).data('post-id');
+        $('#delete-post-form-' + postId).submit();
+    });
+});
@@ -0,0 +1,64 @@
+"""Small in-process TTL cache for admin statistics.
+
+Entries are tagged with the tables they were computed from ("users", "jobs",
+"applications", ...). Write paths call ``invalidate`` with the tags they touch,
+and the TTL bounds staleness for writes that bypass the hooks, or that happen
+in another worker process, since each process keeps its own cache.
+"""
+import threading
+import time
+
+
+class StatsCache:
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._entries = {}  # key -> (expires_at, tags, value)
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key, loader, tags=(), ttl=None):
+        """Return the cached value for ``key``, calling ``loader()`` on a miss or expiry."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+
+        with self._lock:
+            # Drop the result if an invalidation ran while it was being computed
+            if generation == self._generation:
+                self._entries[key] = (now + (self.ttl if ttl is None else ttl), frozenset(tags), value)
+        return value
+
+    def invalidate(self, *tags):
+        """Drop every entry tagged with any of ``tags``."""
+        tags = set(tags)
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            self._entries = {key: entry for key, entry in self._entries.items() if not entry[1] & tags}
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def info(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0,
+                'invalidations': self.invalidations,
+                'entries': sorted(self._entries),
+                'ttl_seconds': self.ttl,
+            }
@@ -0,0 +1,277 @@
+"""Background tasks persisted in the ``task`` table and run in-process.
+
+Functions registered with ``@task('name')`` are queued with
+``enqueue('name', **kwargs)``: the call adds a Task row to the caller's
+transaction, and once that transaction commits the dispatcher thread of a
+``TaskRunner`` is woken, claims the row and runs the function on its thread
+pool inside an app context. Keyword arguments, progress and return values
+must be JSON-serializable.
+
+A task that raises is retried with exponential backoff until it has run
+``max_attempts`` times. Claims are conditional updates tagged with the
+claimer, so several processes (web workers or ``flask run-task-worker``)
+can share the table without a broker. A task whose process died while
+running is handed back once its heartbeat (claim or last progress report)
+is older than ``stale_after``.
+
+``run_pending`` runs due tasks synchronously in the calling thread, for CLI
+commands and tests.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, event, update
+
+from models import db, Task
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 30
+DEFAULT_STALE_SECONDS = 3600
+MAX_ERROR_LENGTH = 2000
+# Seconds between checks for stale tasks; each check is a write
+REQUEUE_INTERVAL_SECONDS = 60
+
+_registry = {}
+_wake = threading.Event()
+_current = threading.local()
+
+
+def task(name):
+    """Register the decorated function as the task ``name``."""
+    def register(func):
+        if name in _registry and _registry[name] is not func:
+            raise ValueError(f'Task {name} is already registered')
+        _registry[name] = func
+        return func
+    return register
+
+
+def _wake_runners(session):
+    _wake.set()
+
+
+def enqueue(name, delay=None, max_attempts=DEFAULT_MAX_ATTEMPTS, created_by=None, **kwargs):
+    """Queue the task ``name`` with ``kwargs``. Does not commit; returns the flushed Task.
+
+    Runners are woken when the current transaction commits. ``delay`` (a
+    timedelta) postpones the first run.
+    """
+    if name not in _registry:
+        raise LookupError(f'Unknown task {name}')
+    item = Task(
+        name=name,
+        payload=json.dumps(kwargs),
+        max_attempts=max_attempts,
+        run_after=datetime.utcnow() + (delay or timedelta(0)),
+        created_by=created_by,
+    )
+    db.session.add(item)
+    db.session.flush()
+    event.listen(db.session(), 'after_commit', _wake_runners, once=True)
+    return item
+
+
+def report_progress(progress):
+    """Store ``progress`` on the task running in this thread and refresh its heartbeat. Commits.
+
+    Does nothing outside a task, so task functions can also be called directly.
+    """
+    task_id = getattr(_current, 'task_id', None)
+    if task_id is None:
+        return
+    db.session.execute(
+        update(Task).where(Task.id == task_id)
+        .values(progress=json.dumps(progress), heartbeat_at=datetime.utcnow())
+    )
+    db.session.commit()
+
+
+def task_status(item):
+    """JSON-ready view of a Task for status polling."""
+    def timestamp(value):
+        return value.isoformat() if value else None
+
+    return {
+        'id': item.id,
+        'name': item.name,
+        'status': item.status,
+        'attempts': item.attempts,
+        'max_attempts': item.max_attempts,
+        'progress': json.loads(item.progress) if item.progress else None,
+        'result': json.loads(item.result) if item.result else None,
+        'error': item.last_error,
+        'created_at': timestamp(item.created_at),
+        'started_at': timestamp(item.started_at),
+        'finished_at': timestamp(item.finished_at),
+    }
+
+
+def _claim(limit, claimer):
+    now = datetime.utcnow()
+    ids = [task_id for (task_id,) in db.session.query(Task.id)
+           .filter(Task.status == 'pending', Task.run_after <= now)
+           .order_by(Task.run_after, Task.id)
+           .limit(limit)]
+    if not ids:
+        return []
+    token = f'{claimer}:{uuid.uuid4().hex[:12]}'
+    # Conditional on status so two claimers never take the same row
+    db.session.execute(
+        update(Task)
+        .where(Task.id.in_(ids), Task.status == 'pending')
+        .values(status='running', claimed_by=token, attempts=Task.attempts + 1,
+                started_at=now, heartbeat_at=now, last_error=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return db.session.query(Task.id, Task.name, Task.payload, Task.attempts, Task.max_attempts) \
+        .filter(Task.claimed_by == token, Task.status == 'running') \
+        .order_by(Task.id).all()
+
+
+def _finish(task_id, values):
+    db.session.execute(update(Task).where(Task.id == task_id).values(**values))
+    db.session.commit()
+
+
+def _execute(task_id, name, payload, attempts, max_attempts):
+    """Run one claimed task and record its outcome. Returns 'succeeded', 'retried' or 'failed'."""
+    func = _registry.get(name)
+    _current.task_id = task_id
+    try:
+        if func is None:
+            raise LookupError(f'Unknown task {name}')
+        result = func(**json.loads(payload))
+    except Exception as e:
+        db.session.rollback()
+        now = datetime.utcnow()
+        error = f'{type(e).__name__}: {e}'[:MAX_ERROR_LENGTH]
+        if func is None or attempts >= max_attempts:
+            logger.error(f"Task {task_id} ({name}) failed after {attempts} attempts: {error}", exc_info=True)
+            _finish(task_id, {'status': 'failed', 'last_error': error, 'finished_at': now})
+            return 'failed'
+        logger.warning(f"Task {task_id} ({name}) failed, retrying: {error}")
+        _finish(task_id, {'status': 'pending', 'last_error': error, 'claimed_by': None,
+                          'run_after': now + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (attempts - 1))})
+        return 'retried'
+    finally:
+        _current.task_id = None
+    _finish(task_id, {'status': 'succeeded', 'result': json.dumps(result), 'finished_at': datetime.utcnow()})
+    return 'succeeded'
+
+
+def requeue_stale(stale_after=DEFAULT_STALE_SECONDS):
+    """Hand back running tasks whose heartbeat is older than ``stale_after`` seconds. Commits.
+
+    Their process is assumed dead; tasks out of attempts are marked failed.
+    Returns the number of tasks changed.
+    """
+    now = datetime.utcnow()
+    out_of_attempts = Task.attempts >= Task.max_attempts
+    result = db.session.execute(
+        update(Task)
+        .where(Task.status == 'running', Task.heartbeat_at < now - timedelta(seconds=stale_after))
+        .values(status=case((out_of_attempts, 'failed'), else_='pending'),
+                finished_at=case((out_of_attempts, now), else_=None),
+                claimed_by=None,
+                last_error='Interrupted: the process running it stopped')
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def _claimer_id():
+    return f'{socket.gethostname()}:{os.getpid()}'[:48]
+
+
+def run_pending(max_tasks=None):
+    """Run due tasks one by one in the calling thread until none is left.
+
+    Needs an app context. Returns a dict with succeeded, retried and failed counts.
+    """
+    stats = {'succeeded': 0, 'retried': 0, 'failed': 0}
+    ran = 0
+    while max_tasks is None or ran < max_tasks:
+        claimed = _claim(1, _claimer_id())
+        if not claimed:
+            break
+        stats[_execute(*claimed[0])] += 1
+        ran += 1
+    return stats
+
+
+class TaskRunner:
+    """Dispatcher thread feeding due tasks to a thread pool."""
+
+    def __init__(self, app, workers=2, poll_interval=5.0, stale_after=DEFAULT_STALE_SECONDS):
+        self.app = app
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pool = None
+        self._next_requeue = 0
+
+    def start(self):
+        """Start the dispatcher unless it is running. Cheap enough to call per request."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._pool = self._pool or ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='task')
+                self._thread = threading.Thread(target=self.run_forever, name='task-dispatcher', daemon=True)
+                self._thread.start()
+
+    def run_forever(self):
+        """Dispatch tasks until the process exits."""
+        self._pool = self._pool or ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='task')
+        while True:
+            try:
+                with self.app.app_context():
+                    if time.monotonic() >= self._next_requeue:
+                        requeue_stale(self.stale_after)
+                        self._next_requeue = time.monotonic() + REQUEUE_INTERVAL_SECONDS
+                    self._dispatch()
+            except Exception as e:
+                logger.error(f"Task dispatch failed: {e}", exc_info=True)
+            _wake.wait(self.poll_interval)
+            _wake.clear()
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                free = self.workers - self._in_flight
+            if free <= 0:
+                return
+            claimed = _claim(free, _claimer_id())
+            if not claimed:
+                return
+            with self._lock:
+                self._in_flight += len(claimed)
+            for row in claimed:
+                self._pool.submit(self._run_one, tuple(row))
+
+    def _run_one(self, row):
+        try:
+            with self.app.app_context():
+                _execute(*row)
+        except Exception as e:
+            # Recording the outcome failed; the heartbeat hands the task back later
+            logger.error(f"Task {row[0]} could not be recorded: {e}", exc_info=True)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            # A slot is free for the next due task
+            _wake.set()
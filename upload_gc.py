@@ -0,0 +1,166 @@
+"""Garbage collection of uploaded files no database row references.
+
+Routes remove a replaced or deleted upload after their commit, but a crash
+between ``save_upload`` and the commit, an older code path or a purge that
+never ran leaves files behind, along with ``.incoming-*``/``.upload-*.part``
+temporaries of interrupted uploads. ``collect_orphans`` scans each upload
+folder, checks the names against the columns that store them in batched
+``IN`` queries and removes the unreferenced ones, with their WebP variants
+and MediaBlob rows. Cached external images count only while a post still
+links their URL.
+
+It is safe to run next to the app: only files last modified before the grace
+period are candidates, so an upload whose row is not committed yet is never
+one, and each file's age is checked again right before it is removed, so a
+shared image written again since the scan stays. A download that already
+opened a removed file keeps reading it.
+"""
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+
+from models import db, Profile, Job, Event, Post, JobApplication, MediaBlob, ExternalImage
+from images import IMAGE_FOLDERS, VARIANT_DIR, variant_paths
+from image_proxy import release_unlinked
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRACE_SECONDS = 24 * 3600
+QUERY_BATCH_SIZE = 500
+# folder under the upload folder: [(column holding its filenames, prefix stored before the filename)]
+REFERENCES = {
+    'avatars': [(Profile.avatar, '')],
+    'company_logos': [(Job.company_logo, '')],
+    'events': [(Event.image, '')],
+    # Cached copies of external post images live next to uploaded ones; rows
+    # of URLs no post links any more are dropped before the scan
+    'posts': [(Post.image_url, 'uploads/posts/'), (ExternalImage.path, 'posts/')],
+    'resumes': [(JobApplication.resume_path, '')],
+}
+# Kept in git so the folders exist in a fresh checkout
+KEEP_FILES = {'placeholder.txt', '.gitkeep'}
+
+
+def _old_files(directory, cutoff):
+    """Files directly in ``directory`` last modified before ``cutoff``: {name: size}."""
+    found = {}
+    if not os.path.isdir(directory):
+        return found
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name in KEEP_FILES or not entry.is_file(follow_symlinks=False):
+                continue
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime < cutoff:
+                found[entry.name] = stat.st_size
+    return found
+
+
+def _referenced(column, prefix, names):
+    """The subset of ``names`` some row stores in ``column``."""
+    names = list(names)
+    referenced = set()
+    for start in range(0, len(names), QUERY_BATCH_SIZE):
+        batch = [prefix + name for name in names[start:start + QUERY_BATCH_SIZE]]
+        referenced.update(value[len(prefix):] for value in
+                          db.session.scalars(select(column).where(column.in_(batch)).distinct()))
+    return referenced
+
+
+def _remove(path, cutoff, dry_run):
+    """Remove ``path`` if it is still older than ``cutoff``. Returns the bytes freed, or None when kept."""
+    try:
+        stat = os.stat(path)
+        # Written again since the scan, e.g. the same image uploaded for a new row
+        if stat.st_mtime >= cutoff:
+            return None
+        if not dry_run:
+            os.remove(path)
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logger.warning(f"Could not remove orphaned upload {path}: {e}")
+        return None
+    return stat.st_size
+
+
+def _orphaned_variants(directory, cutoff):
+    """Old variant files whose original is gone."""
+    variant_dir = os.path.join(directory, VARIANT_DIR)
+    variants = _old_files(variant_dir, cutoff)
+    if not variants:
+        return []
+    with os.scandir(directory) as entries:
+        stems = {os.path.splitext(entry.name)[0] for entry in entries if entry.is_file(follow_symlinks=False)}
+    # <stem>.<size>.webp
+    return [os.path.join(variant_dir, name) for name in variants if name.rsplit('.', 2)[0] not in stems]
+
+
+def collect_orphans(upload_folder, grace_seconds=DEFAULT_GRACE_SECONDS, dry_run=False, directories=None):
+    """Remove unreferenced uploads older than ``grace_seconds``. Commits.
+
+    ``directories`` maps folders kept outside ``upload_folder`` (resumes) to
+    where they are.
+
+    Returns ``{'folders': {folder: stats}, 'total': stats}`` where stats holds
+    ``scanned`` (old enough to be candidates), ``removed`` and ``bytes`` freed,
+    variants included. With ``dry_run`` nothing is removed and the counts say
+    what would have been.
+    """
+    cutoff = time.time() - grace_seconds
+    # The released files are then unreferenced, so the scan below removes them
+    release_unlinked(upload_folder, datetime.utcnow() - timedelta(seconds=grace_seconds))
+    folders = {}
+    total = {'scanned': 0, 'removed': 0, 'bytes': 0}
+    released_blobs = []
+    for folder, columns in REFERENCES.items():
+        directory = (directories or {}).get(folder) or os.path.join(upload_folder, folder)
+        candidates = _old_files(directory, cutoff)
+        orphans = set(candidates)
+        for column, prefix in columns:
+            orphans -= _referenced(column, prefix, orphans)
+        stats = {'scanned': len(candidates), 'removed': 0, 'bytes': 0}
+
+        removed = []
+        for name in sorted(orphans):
+            freed = _remove(os.path.join(directory, name), cutoff, dry_run)
+            if freed is not None:
+                removed.append(name)
+                stats['removed'] += 1
+                stats['bytes'] += freed
+
+        if folder in IMAGE_FOLDERS:
+            released_blobs.extend(f'{folder}/{name}' for name in removed)
+            if dry_run:
+                stale_variants = [path for name in removed for path in variant_paths(os.path.join(directory, name))]
+            else:
+                stale_variants = _orphaned_variants(directory, cutoff)
+            for path in stale_variants:
+                freed = _remove(path, cutoff, dry_run)
+                if freed is not None:
+                    stats['removed'] += 1
+                    stats['bytes'] += freed
+
+        folders[folder] = stats
+        for key in total:
+            total[key] += stats[key]
+
+    if released_blobs and not dry_run:
+        for start in range(0, len(released_blobs), QUERY_BATCH_SIZE):
+            db.session.execute(delete(MediaBlob).where(
+                MediaBlob.path.in_(released_blobs[start:start + QUERY_BATCH_SIZE])))
+    # Also ends the read transaction the scan held; a dry run keeps the released external images
+    if dry_run:
+        db.session.rollback()
+    else:
+        db.session.commit()
+
+    if total['removed'] and not dry_run:
+        logger.info(f"Removed {total['removed']} orphaned upload files, {total['bytes']} bytes")
+    return {'folders': folders, 'total': total}
@@ -0,0 +1,89 @@
+"""Serving uploaded files with validators browsers and proxies can cache on.
+
+Every response carries an ETag derived from the file's content (hashed once
+per file version and remembered by path, mtime and size). URLs built with
+``upload_version`` carry ``?v=<first characters of that hash>``; a request
+whose ``v`` matches the file on disk is answered with a year-long immutable
+Cache-Control, anything else with ``no-cache`` so the browser revalidates and
+gets a 304.
+
+Range requests are answered by ``send_file``. With ``UPLOAD_ACCEL_REDIRECT_PREFIX``
+set, Flask only authorizes and sets headers, and nginx serves the bytes from
+the internal location named by ``X-Accel-Redirect``; Flask's own
+``USE_X_SENDFILE`` does the same for Apache/lighttpd.
+"""
+import hashlib
+import mimetypes
+import os
+from functools import lru_cache
+from urllib.parse import quote
+
+from flask import abort, current_app, request, send_file
+from werkzeug.security import safe_join
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+VERSION_LENGTH = 12
+_HASH_CHUNK = 64 * 1024
+
+
+@lru_cache(maxsize=8192)
+def _content_hash(path, mtime_ns, size):
+    # mtime and size are part of the key, so a replaced file is hashed again
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_etag(path, stat=None):
+    stat = stat or os.stat(path)
+    return _content_hash(path, stat.st_mtime_ns, stat.st_size)
+
+
+def upload_version(upload_folder, filename):
+    """Short content hash for the ``v`` URL parameter, or None when the file is missing."""
+    path = safe_join(upload_folder, filename)
+    try:
+        return content_etag(path)[:VERSION_LENGTH] if path else None
+    except OSError:
+        return None
+
+
+def send_upload(upload_folder, filename, private=False, accel_config='UPLOAD_ACCEL_REDIRECT_PREFIX'):
+    """Response for one uploaded file, 404 when it does not exist.
+
+    ``private`` files (resumes) are never stored by shared caches.
+    ``accel_config`` names the setting with the nginx location for ``upload_folder``.
+    """
+    path = safe_join(upload_folder, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    stat = os.stat(path)
+    etag = content_etag(path, stat)
+
+    accel_prefix = current_app.config.get(accel_config)
+    if accel_prefix:
+        response = current_app.response_class(
+            mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{quote(filename)}"
+        response.set_etag(etag)
+        # Answers If-None-Match with 304 here; nginx handles Range on the real bytes
+        response.make_conditional(request)
+    else:
+        response = send_file(path, conditional=True, etag=etag, max_age=None)
+
+    cache_control = response.cache_control
+    if private:
+        cache_control.private = True
+        cache_control.no_cache = True
+    elif request.args.get('v') == etag[:VERSION_LENGTH]:
+        # send_file marks every response no-cache when no max_age is given
+        cache_control.no_cache = None
+        cache_control.public = True
+        cache_control.max_age = IMMUTABLE_MAX_AGE
+        cache_control.immutable = True
+    else:
+        cache_control.public = True
+        cache_control.no_cache = True
+    return response
@@ -0,0 +1,133 @@
+"""Streaming intake of uploaded files.
+
+``save_upload`` copies an upload to a temporary file next to its destination
+in fixed-size chunks, so at most one chunk is held in memory however large the
+file is. While copying it enforces the byte limit of the upload's kind and
+checks the leading bytes against the signature of the file's extension; the
+temporary file is only renamed into place once the whole upload passed.
+
+``MAX_CONTENT_LENGTH`` still caps the request as a whole; the limits here are
+per file and lower.
+"""
+import filecmp
+import os
+import shutil
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+
+# kind: (allowed extensions, max bytes)
+UPLOAD_KINDS = {
+    'image': ({'png', 'jpg', 'jpeg', 'gif'}, 5 * 1024 * 1024),
+    'resume': ({'pdf', 'doc', 'docx'}, 10 * 1024 * 1024),
+    # Images image_proxy.py fetches from other sites for posts
+    'remote_image': ({'png', 'jpg', 'jpeg', 'gif', 'webp'}, 5 * 1024 * 1024),
+}
+
+# Leading bytes each extension must start with
+_SIGNATURES = {
+    'png': (b'\x89PNG\r\n\x1a\n',),
+    'jpg': (b'\xff\xd8\xff',),
+    'jpeg': (b'\xff\xd8\xff',),
+    'gif': (b'GIF87a', b'GIF89a'),
+    # RIFF container; bytes 8-12 are 'WEBP'
+    'webp': (b'RIFF',),
+    'pdf': (b'%PDF-',),
+    # Word 97-2003 files are OLE compound documents, .docx files are zip archives
+    'doc': (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',),
+    'docx': (b'PK\x03\x04',),
+}
+_SNIFF_BYTES = max(len(sig) for sigs in _SIGNATURES.values() for sig in sigs)
+
+
+class UploadRejected(ValueError):
+    """The upload was refused; the message is shown to the user."""
+
+
+def _extension(filename):
+    return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+
+
+def _format_size(max_bytes):
+    return f'{max_bytes // (1024 * 1024)}MB'
+
+
+def save_upload(file, path, kind, extensions=None, chunk_size=CHUNK_SIZE, digest=None):
+    """Stream an uploaded ``FileStorage`` to ``path``. Returns the number of bytes written.
+
+    ``extensions`` narrows the kind's allowed extensions; ``digest`` (a hashlib
+    object) is fed every chunk on the way. Raises UploadRejected when the
+    extension, size or content does not fit the kind; nothing is left on disk
+    in that case.
+    """
+    allowed, max_bytes = UPLOAD_KINDS[kind]
+    if extensions is not None:
+        allowed = allowed & set(extensions)
+    extension = _extension(file.filename or '')
+    if extension not in allowed:
+        raise UploadRejected(f'Định dạng file không hợp lệ. Chỉ chấp nhận {", ".join(sorted(allowed)).upper()}')
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # Same directory as the destination, so the final rename is atomic
+    fd, tmp_path = tempfile.mkstemp(prefix='.upload-', suffix='.part', dir=directory)
+    try:
+        written = 0
+        head = b''
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file.stream.read(chunk_size)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadRejected(f'File không được vượt quá {_format_size(max_bytes)}')
+                if len(head) < _SNIFF_BYTES:
+                    head += chunk[:_SNIFF_BYTES - len(head)]
+                    # A short first read could end before the signature does
+                    if len(head) >= _SNIFF_BYTES and not head.startswith(_SIGNATURES[extension]):
+                        raise UploadRejected('Nội dung file không khớp với định dạng của nó')
+                out.write(chunk)
+                if digest is not None:
+                    digest.update(chunk)
+        if not written:
+            raise UploadRejected('File rỗng')
+        if len(head) < _SNIFF_BYTES and not head.startswith(_SIGNATURES[extension]):
+            raise UploadRejected('Nội dung file không khớp với định dạng của nó')
+        os.replace(tmp_path, path)
+        return written
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def move_files(source_dir, target_dir):
+    """Move the files directly in ``source_dir`` into ``target_dir``, keeping their names.
+
+    A file whose name is taken in ``target_dir`` by identical bytes is just
+    removed; one taken by different bytes stays where it is. Hidden files
+    (upload temporaries) are skipped. Returns ``(moved, kept_names)``.
+    """
+    moved, kept = 0, []
+    if not os.path.isdir(source_dir):
+        return moved, kept
+    os.makedirs(target_dir, exist_ok=True)
+    with os.scandir(source_dir) as entries:
+        names = sorted(entry.name for entry in entries
+                       if entry.is_file(follow_symlinks=False) and not entry.name.startswith('.'))
+    for name in names:
+        source, target = os.path.join(source_dir, name), os.path.join(target_dir, name)
+        if os.path.exists(target):
+            if filecmp.cmp(source, target, shallow=False):
+                os.remove(source)
+                moved += 1
+            else:
+                kept.append(name)
+            continue
+        # Copies and removes when the folders are on different filesystems
+        shutil.move(source, target)
+        moved += 1
+    return moved, kept
@@ -0,0 +1,170 @@
+"""Delete a user and everything they own with set-based statements.
+
+``delete_user_data`` issues a fixed number of DELETE ... WHERE ... IN (subquery)
+statements, however many posts, likes or applications the user has, and runs
+inside the caller's transaction. Files on disk are only collected here; the
+caller hands them to ``schedule_file_purge`` after the commit so a rollback
+never loses an upload and the request doesn't wait on the filesystem. The
+purge is a ``purge_files`` task, so it survives a restart and is retried.
+Because it runs later, the purge checks each image in the media store again
+and keeps it if the same bytes were uploaded in the meantime.
+"""
+import logging
+import os
+import time
+
+from flask import current_app
+from sqlalchemy import delete, select, or_, text
+
+from models import (
+    db, User, Profile, Post, Comment, Job, JobApplication, JobSignatureBand, post_likes,
+    Education, Experience, Skill, Event, EventRegistration, MediaBlob
+)
+from registrations import ACTIVE_STATUSES, recount_registrations, promote_waitlist
+from search_index import remove_from_applicant_index
+from images import variant_paths, is_image
+from media_store import release as release_media, post_image_path, MEDIA_FOLDERS
+from tasks import task, enqueue
+
+logger = logging.getLogger(__name__)
+
+# Store files written this recently may belong to an upload that has not committed yet
+RECENT_WRITE_SECONDS = 300
+
+
+def _owned_files(user_id, upload_folder, resume_folder):
+    """Paths of every upload that disappears with the user.
+
+    Images are shared through the media store, so they are released and only
+    the ones no other row uses are returned.
+    """
+    user_jobs = select(Job.id).where(Job.alumni_id == user_id)
+    media = []
+    for (avatar,) in db.session.query(Profile.avatar).filter(Profile.user_id == user_id, Profile.avatar.isnot(None)):
+        media.append(f'avatars/{avatar}')
+    for (image_url,) in db.session.query(Post.image_url).filter(Post.user_id == user_id, Post.image_url.isnot(None)):
+        # Posts may link external images; only uploaded ones are in the store
+        media.append(post_image_path(image_url))
+    for (logo,) in db.session.query(Job.company_logo).filter(Job.alumni_id == user_id, Job.company_logo.isnot(None)):
+        media.append(f'company_logos/{logo}')
+    for (image,) in db.session.query(Event.image).filter(Event.creator_id == user_id, Event.image.isnot(None)):
+        media.append(f'events/{image}')
+    paths = release_media(upload_folder, media)
+    for (resume,) in db.session.query(JobApplication.resume_path).filter(
+            or_(JobApplication.user_id == user_id, JobApplication.job_id.in_(user_jobs)),
+            JobApplication.resume_path.isnot(None)):
+        paths.append(os.path.join(resume_folder, resume))
+    return paths
+
+
+def delete_user_data(user_id, upload_folder, resume_folder):
+    """Delete a user with their posts, likes, comments, jobs, applications, events and profile.
+
+    Seats the user held on other people's events are released and handed to
+    their waitlists. Does not commit. Returns the file paths to purge.
+    """
+    paths = _owned_files(user_id, upload_folder, resume_folder)
+
+    user_posts = select(Post.id).where(Post.user_id == user_id)
+    user_jobs = select(Job.id).where(Job.alumni_id == user_id)
+    user_events = select(Event.id).where(Event.creator_id == user_id)
+
+    # Events that lose one of their seats, other than the user's own events
+    freed_events = [event_id for (event_id,) in db.session.query(EventRegistration.event_id).filter(
+        EventRegistration.user_id == user_id,
+        EventRegistration.status.in_(ACTIVE_STATUSES),
+        EventRegistration.event_id.notin_(user_events)
+    )]
+
+    remove_from_applicant_index(user_id=user_id, alumni_id=user_id)
+    statements = [
+        delete(post_likes).where(or_(post_likes.c.user_id == user_id, post_likes.c.post_id.in_(user_posts))),
+        delete(Comment).where(or_(Comment.user_id == user_id, Comment.post_id.in_(user_posts))),
+        delete(Post).where(Post.user_id == user_id),
+        delete(JobApplication).where(or_(JobApplication.user_id == user_id, JobApplication.job_id.in_(user_jobs))),
+        delete(JobSignatureBand).where(JobSignatureBand.job_id.in_(user_jobs)),
+        delete(Job).where(Job.alumni_id == user_id),
+        delete(EventRegistration).where(or_(EventRegistration.user_id == user_id,
+                                            EventRegistration.event_id.in_(user_events))),
+        delete(Event).where(Event.creator_id == user_id),
+        delete(Skill).where(Skill.user_id == user_id),
+        delete(Education).where(Education.user_id == user_id),
+        delete(Experience).where(Experience.user_id == user_id),
+        delete(Profile).where(Profile.user_id == user_id),
+        delete(User).where(User.id == user_id),
+    ]
+    for statement in statements:
+        db.session.execute(statement.execution_options(synchronize_session=False))
+
+    if freed_events:
+        recount_registrations(event_ids=freed_events)
+        for event_id in freed_events:
+            promote_waitlist(event_id)
+    return paths
+
+
+def _store_path(path, upload_folder):
+    """Media store path of an absolute or upload-folder path, or None for files outside the store."""
+    relative = os.path.relpath(os.path.abspath(path), os.path.abspath(upload_folder)).replace(os.sep, '/')
+    folder = relative.split('/', 1)[0]
+    return relative if folder in MEDIA_FOLDERS and '/' in relative else None
+
+
+def _written_since(path, cutoff):
+    try:
+        return os.stat(path).st_mtime >= cutoff
+    except FileNotFoundError:
+        return False
+
+
+@task('purge_files')
+def purge_files(paths):
+    """Remove files from disk, ignoring ones that are already gone. Returns the number removed.
+
+    Resized variants of images are removed along with their original. A
+    media store file is kept when a media_blob row references it again, or
+    when it was written in the last RECENT_WRITE_SECONDS; the upload GC
+    removes it later if it stays unreferenced.
+    """
+    stored = {path: _store_path(path, current_app.config['UPLOAD_FOLDER']) for path in paths}
+    store_paths = [p for p in stored.values() if p]
+    live = set()
+    if store_paths:
+        if db.engine.dialect.name == 'sqlite':
+            # Held until the commit below, so no upload can reference a file between the check and its removal
+            db.session.execute(text('BEGIN IMMEDIATE'))
+        live = set(db.session.scalars(
+            select(MediaBlob.path).where(MediaBlob.path.in_(store_paths), MediaBlob.ref_count > 0)))
+
+    removed = 0
+    candidates = 0
+    cutoff = time.time() - RECENT_WRITE_SECONDS
+    try:
+        for path, store_path in stored.items():
+            if store_path is not None and (store_path in live or _written_since(path, cutoff)):
+                logger.info(f"Kept {path}: uploaded again since its purge was scheduled")
+                continue
+            for file_path in [path] + (variant_paths(path) if is_image(path) else []):
+                candidates += 1
+                try:
+                    os.remove(file_path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"Could not purge {file_path}: {e}")
+    finally:
+        db.session.commit()
+    if removed:
+        logger.info(f"Purged {removed} of {candidates} files")
+    return removed
+
+
+def schedule_file_purge(paths):
+    """Queue a background purge of ``paths`` and commit it. Call after the deleting transaction committed."""
+    paths = list(paths)
+    if paths:
+        item = enqueue('purge_files', paths=paths)
+        db.session.commit()
+        return item
+    return None
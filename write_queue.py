@@ -0,0 +1,172 @@
+"""Optional single writer for small, hot database writes.
+
+SQLite lets one connection write at a time, even in WAL mode. When many
+request threads like posts, comment or register at once, each waits for the
+write lock and pays for its own commit. With ``WRITE_QUEUE_ENABLED`` those
+routes hand a write function to ``WriteQueue.run`` instead. One writer
+thread per process takes every job queued so far (up to ``max_batch``). It
+runs them in one ``BEGIN IMMEDIATE`` transaction, each inside a savepoint,
+and commits once. The request thread waits on a future for the function's
+return value. Batches form on their own while the previous commit is in
+progress, so an idle site sees no added delay.
+
+A write function uses ``db.session`` and must not commit. Its return
+value should be plain data, since ORM objects belong to the writer's
+session. An exception rolls back that job's savepoint only and is re-raised
+in the request thread. When the queue is disabled, ``run`` calls the
+function in the caller's session and commits, via ``write_now``, so routes
+read the same either way.
+"""
+import logging
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from models import db
+from sqlite_tuning import configure_engine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH = 64
+DEFAULT_TIMEOUT_SECONDS = 10.0
+
+
+def write_now(func, *args, **kwargs):
+    """Run ``func`` in the calling thread's session and commit. Rolls back and re-raises on error."""
+    try:
+        result = func(*args, **kwargs)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return result
+
+
+class _Job:
+    __slots__ = ('func', 'args', 'kwargs', 'future', 'result', 'error')
+
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.result = None
+        self.error = None
+
+
+class WriteQueue:
+    """Writer thread that group-commits submitted write functions."""
+
+    def __init__(self, app, enabled=False, max_batch=DEFAULT_MAX_BATCH, timeout=DEFAULT_TIMEOUT_SECONDS):
+        self.app = app
+        self.enabled = enabled
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._engine = None
+        self.batches = 0
+        self.jobs = 0
+
+    def start(self):
+        """Start the writer thread unless it is running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run_forever, name='db-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue ``func(*args, **kwargs)`` for the writer thread. Returns a Future."""
+        self.start()
+        job = _Job(func, args, kwargs)
+        self._queue.put(job)
+        return job.future
+
+    def run(self, func, *args, **kwargs):
+        """Run a write function and return its result: on the writer thread when enabled, here otherwise.
+
+        Raises what ``func`` raised. Raises concurrent.futures.TimeoutError
+        when the job did not start within ``timeout`` seconds; it is then
+        cancelled and never runs. A job already running is waited for.
+        """
+        if not self.enabled:
+            return write_now(func, *args, **kwargs)
+        future = self.submit(func, *args, **kwargs)
+        try:
+            return future.result(self.timeout)
+        except FutureTimeout:
+            if future.cancel():
+                raise
+            return future.result()
+
+    def _run_forever(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            batch = [job for job in batch if job.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                with self.app.app_context():
+                    db.session.registry.set(self._session())
+                    self._write(batch)
+            except Exception as e:
+                logger.error(f"Writer thread failed: {e}", exc_info=True)
+                for job in batch:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+
+    def _session(self):
+        """Session on the writer's own single-connection engine.
+
+        Request threads keep their pooled connection while they wait on the
+        writer, so with a busy pool the writer could not check one out of it.
+        """
+        if self._engine is None:
+            self._engine = create_engine(db.engine.url, pool_size=1, max_overflow=0)
+            configure_engine(self._engine, self.app.config.get('SQLITE_PRAGMAS'))
+        return Session(bind=self._engine)
+
+    def _write(self, batch):
+        try:
+            self._commit(batch)
+        except Exception as e:
+            db.session.rollback()
+            if len(batch) == 1:
+                batch[0].future.set_exception(e)
+                return
+            # One job broke the commit itself; the rest should not fail with it
+            logger.warning(f"Group commit of {len(batch)} writes failed, retrying one by one: {e}")
+            for job in batch:
+                self._write([job])
+            return
+        for job in batch:
+            if job.error is not None:
+                job.future.set_exception(job.error)
+            else:
+                job.future.set_result(job.result)
+
+    def _commit(self, batch):
+        if db.engine.dialect.name == 'sqlite':
+            # Take the write lock up front, so reads in a job cannot go stale before its writes
+            db.session.execute(text('BEGIN IMMEDIATE'))
+        for job in batch:
+            job.result = job.error = None
+            try:
+                with db.session.begin_nested():
+                    job.result = job.func(*job.args, **job.kwargs)
+            except Exception as e:
+                job.error = e
+        db.session.commit()
+        self.batches += 1
+        self.jobs += len(batch)